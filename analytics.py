@@ -0,0 +1,128 @@
+"""交叉分析引擎：每道题的答卷以紧凑形式（compact.py）缓存，交叉表与卡方检验在按需展开的布尔矩阵上完成
+
+各选项的总次数不在这里统计，由 storage 在写入时维护的聚合表直接读出。
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+import compact
+
+
+# 交叉分析中配置外取值（“其它”填写内容）合并后的列名
+OTHER_LABEL = "其它（填写）"
+
+# float32 能精确表示的最大连续整数
+FLOAT32_EXACT = 2 ** 24
+
+
+def encode_responses(response_ids, groups, questions):
+    """逐题编码全部答卷（compact.CompactQuestion），供交叉分析反复使用
+
+    response_ids 为全部答卷 id 升序数组（决定行顺序），groups 为
+    [(question_id, option, 选择了该选项的答卷 id 数组), ...]。
+    列按题目配置的选项顺序排列，配置外的取值合并为 OTHER_LABEL 一列。
+    返回 {question_id: (编码, labels)}。
+    """
+    by_question = {}
+    for question_id, option, ids in groups:
+        by_question.setdefault(question_id, []).append((option, ids))
+    encoded = {}
+    for q in questions:
+        compact_question = compact.CompactQuestion.from_groups(q, response_ids, by_question.get(q['id'], ()))
+        labels = list(compact_question.options)
+        if compact_question.has_other:
+            labels.append(OTHER_LABEL)
+        encoded[q['id']] = (compact_question, labels)
+    return encoded
+
+
+def filter_mask(encoded, question_id, selected_options):
+    """选择了 selected_options 中任一选项的答卷（布尔向量）"""
+    compact_question, labels = encoded[question_id]
+    mask = np.zeros(len(compact_question), dtype=bool)
+    for option in selected_options:
+        if option in labels:
+            mask |= compact_question.column(labels.index(option))
+    return mask
+
+
+def crosstab(encoded, row_question, column_question, mask=None):
+    """两道题的交叉计数表（行题选项 × 列题选项），展开为布尔矩阵后相乘一次算出
+
+    多选题中一份答卷会同时计入多个单元格。mask 为按答卷筛选的布尔向量。
+    """
+    row_compact, row_labels = encoded[row_question]
+    column_compact, column_labels = encoded[column_question]
+    row_columns = row_compact.columns()
+    column_columns = column_compact.columns()
+    if mask is not None:
+        row_columns = row_columns[:, mask]
+        column_columns = column_columns[:, mask]
+    # 浮点矩阵乘法走 BLAS；计数不超过答卷数，低于 2^24 时 float32 也是精确整数
+    dtype = np.float32 if len(row_compact) < FLOAT32_EXACT else np.float64
+    table = row_columns.astype(dtype) @ column_columns.astype(dtype).T
+    return pd.DataFrame(table.astype(np.int64), index=row_labels, columns=column_labels)
+
+
+def crosstab_percentages(table, mode):
+    """把计数表换算为百分比：mode 为 row / column / total"""
+    if mode == "row":
+        return table.div(table.sum(axis=1).replace(0, np.nan), axis=0) * 100
+    if mode == "column":
+        return table.div(table.sum(axis=0).replace(0, np.nan), axis=1) * 100
+    total = table.to_numpy().sum()
+    return table / total * 100 if total else table * np.nan
+
+
+def _upper_gamma_regularized(a, x):
+    """正则化上不完全伽马函数 Q(a, x)（级数/连分式，参见 Numerical Recipes gammq）"""
+    if x <= 0:
+        return 1.0
+    log_prefix = -x + a * math.log(x) - math.lgamma(a)
+    if x < a + 1:
+        # 级数求 P(a, x)
+        term = total = 1.0 / a
+        n = a
+        for _ in range(1000):
+            n += 1
+            term *= x / n
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_prefix))
+    # Lentz 连分式求 Q(a, x)
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(log_prefix) * h
+
+
+def chi_square(table):
+    """独立性卡方检验，返回 (chi2, 自由度, p 值)；全零的行列不参与计算
+
+    有效行或列不足 2 个时返回 (nan, 0, nan)。
+    """
+    observed = np.asarray(table, dtype=np.float64)
+    observed = observed[observed.sum(axis=1) > 0][:, observed.sum(axis=0) > 0]
+    if observed.shape[0] < 2 or observed.shape[1] < 2:
+        return float("nan"), 0, float("nan")
+    expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / observed.sum()
+    statistic = float(((observed - expected) ** 2 / expected).sum())
+    dof = (observed.shape[0] - 1) * (observed.shape[1] - 1)
+    return statistic, dof, _upper_gamma_regularized(dof / 2, statistic / 2)
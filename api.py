@@ -0,0 +1,243 @@
+"""答卷接入 API：不经过 Streamlit 页面，一次 HTTP 请求提交一份或一批答卷（ASGI，starlette + uvicorn）
+
+用法：
+    python api.py                          # 默认监听 127.0.0.1:8600
+    python api.py --host 0.0.0.0 --port 8600
+
+接口：
+    POST /responses[?survey=<名称>]        提交答卷，问卷选择规则同页面（见 surveys.py）；
+                                           带 test_run=<名称> 时标记为测试答卷，可在页面按批次删除
+    GET  /metrics                          本进程的 Prometheus 指标（数据库仪表按 survey / backend 标签区分）
+
+浏览器端前端跨域提交时，用环境变量 SURVEY_API_CORS_ORIGINS 列出允许的来源。
+
+请求体为一份答卷、答卷数组，或 {"responses": [...]}。每份答卷写作
+{"answers": {题目 id: 答案}, "other_inputs": {题目 id: 其它填写内容}}（React 前端即按此提交），
+也可以直接把题目 id 作为顶层字段（其中 id / created_at / submit_time 会被忽略）。
+校验规则与问卷页面相同（validation.py）；一批中有任何一份不合法时整批不写入，返回 422 与逐份的错误。
+成功返回 201 与 {"ids": [...], "config_version": ...}；写入确认超时返回 504，此时答卷可能已经保存，
+不要直接重试（503 为未写入，可以重试）。
+"""
+import argparse
+import contextlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+import backends
+import config
+import metrics
+import storage
+import surveys
+import validation
+import writer
+
+# 默认监听地址与端口
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8600
+
+# 允许跨域提交的前端来源（逗号分隔，如 http://localhost:3000），为空则不开启 CORS
+CORS_ORIGINS_ENV = "SURVEY_API_CORS_ORIGINS"
+
+# 单次请求最多提交的答卷数
+MAX_BATCH = 500
+
+# 测试批次标记的查询参数名（与页面 URL 参数相同）
+TEST_RUN_PARAM = "test_run"
+
+# 平铺写法中不属于题目、直接忽略的字段
+IGNORED_FIELDS = ("id", "created_at", "submit_time")
+
+
+class SurveyService:
+    """一份问卷在本进程中的配置监视器与存储后端，首次访问时创建"""
+
+    def __init__(self, tenant):
+        self.tenant = tenant
+        self.watcher = config.ConfigWatcher(
+            tenant.config_file,
+            on_change=lambda compiled: storage.record_config_version(
+                tenant.db_file, compiled["version"], compiled["questions_json"]
+            )
+        )
+        self._backend = None
+        self._backend_key = None
+        self._lock = threading.Lock()
+
+    def backend(self, survey):
+        """按当前配置中的 storage 设置取后端；设置变化（配置热更新）时重新创建"""
+        key = backends.backend_settings(survey["app_config"], self.tenant.db_file, self.tenant.slug)
+        with self._lock:
+            if key != self._backend_key:
+                self._backend = backends.open_backend(*key)
+                self._backend_key = key
+                metrics.register_database_gauges(self.tenant.slug, self._backend)
+            return self._backend
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_service(tenant):
+    with _services_lock:
+        service = _services.get(tenant.db_file)
+        if service is None:
+            service = _services[tenant.db_file] = SurveyService(tenant)
+        return service
+
+
+def _submissions(payload):
+    """请求体 -> 答卷列表"""
+    if isinstance(payload, dict) and "responses" in payload:
+        payload = payload["responses"]
+    if isinstance(payload, dict):
+        return [payload]
+    if isinstance(payload, list):
+        return payload
+    raise validation.ValidationError(["请求体应为答卷对象、答卷数组或 {\"responses\": [...]}"])
+
+
+def _validate(survey, submission):
+    """校验一份答卷，返回 (规范化答案, 错误列表)"""
+    if not isinstance(submission, dict):
+        return None, ["答卷应为对象"]
+    if "answers" in submission:
+        answers, other_inputs = submission["answers"], submission.get("other_inputs")
+    else:
+        answers = {key: value for key, value in submission.items()
+                   if key not in IGNORED_FIELDS and key != "other_inputs"}
+        other_inputs = submission.get("other_inputs")
+    try:
+        return validation.validate_submission(survey, answers, other_inputs), []
+    except validation.ValidationError as e:
+        return None, e.messages
+
+
+def _store(service, survey, answer_list, test_run=None):
+    """写入已校验的答卷，返回记录 id 列表（在线程池中执行：SQLite 等待落盘、PostgreSQL 建连都会阻塞）"""
+    backend = service.backend(survey)
+    submit_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = []
+    for answers in answer_list:
+        answers['submit_time'] = submit_time
+        rows.append((answers, submit_time, survey["version"], test_run))
+    return backend.save_many(rows)
+
+
+def _error(status, message):
+    return JSONResponse({"error": message}, status_code=status)
+
+
+async def submit_responses(request):
+    tenant = surveys.resolve(request.query_params.get(surveys.SURVEY_PARAM))
+    if tenant is None:
+        return _error(404, "问卷不存在")
+    try:
+        payload = json.loads(await request.body())
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return _error(400, "请求体不是合法的 JSON")
+    try:
+        submissions = _submissions(payload)
+    except validation.ValidationError as e:
+        return _error(400, str(e))
+    if not submissions:
+        return _error(400, "没有答卷")
+    if len(submissions) > MAX_BATCH:
+        return _error(413, f"单次最多提交 {MAX_BATCH} 份答卷")
+
+    service = await run_in_threadpool(get_service, tenant)
+    survey = service.watcher.current
+    if survey is None or not survey["questions"]:
+        return _error(503, service.watcher.error or "问卷配置不可用")
+
+    answer_list = []
+    errors = []
+    for index, submission in enumerate(submissions):
+        answers, messages = _validate(survey, submission)
+        if messages:
+            errors.append({"index": index, "errors": messages})
+        else:
+            answer_list.append(answers)
+    if errors:
+        metrics.VALIDATION_ERRORS.inc(len(errors), step="api")
+        return JSONResponse({"errors": errors}, status_code=422)
+
+    start = time.perf_counter()
+    try:
+        ids = await run_in_threadpool(
+            _store, service, survey, answer_list, request.query_params.get(TEST_RUN_PARAM)
+        )
+    except writer.CommitTimeoutError as e:
+        # 答卷可能稍后才落盘，返回 504 而不是可重试的 503
+        metrics.SUBMISSIONS.inc(len(answer_list), result="error")
+        return _error(504, str(e))
+    except Exception as e:
+        metrics.SUBMISSIONS.inc(len(answer_list), result="error")
+        return _error(503, f"写入失败，请稍后重试：{e}")
+    finally:
+        metrics.SAVE_LATENCY.observe(time.perf_counter() - start)
+    metrics.SUBMISSIONS.inc(len(ids), result="success")
+    return JSONResponse({"ids": ids, "config_version": survey["version"]}, status_code=201)
+
+
+async def metrics_endpoint(request):
+    return Response(metrics.REGISTRY.expose(), media_type=metrics.CONTENT_TYPE)
+
+
+def _middleware():
+    origins = [origin.strip() for origin in os.environ.get(CORS_ORIGINS_ENV, "").split(",") if origin.strip()]
+    if not origins:
+        return []
+    return [Middleware(CORSMiddleware, allow_origins=origins, allow_methods=["POST"], allow_headers=["Content-Type"])]
+
+
+def _open_default_backend():
+    service = get_service(surveys.DEFAULT_TENANT)
+    survey = service.watcher.current
+    if survey is not None:
+        service.backend(survey)
+
+
+@contextlib.asynccontextmanager
+async def _lifespan(app):
+    # 启动时先打开默认问卷的存储后端，/metrics 从第一次抓取起就带数据库仪表；
+    # 打开失败（如 PostgreSQL 暂时连不上）不影响启动，提交时会再次尝试并返回错误
+    try:
+        await run_in_threadpool(_open_default_backend)
+    except Exception:
+        pass
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/responses", submit_responses, methods=["POST"]),
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+    ],
+    middleware=_middleware(),
+    lifespan=_lifespan,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=DEFAULT_HOST, help="监听地址")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,60 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
-import os
-import sqlite3
-import json
+from datetime import datetime, timedelta
+import secrets
+import time
+
+import analytics
+import backends
+import cache
+import config
+import export
+import maintenance
+import metrics
+import perf
+import report
+import storage
+import surveys
+import validation
+import writer
+
+# 整个脚本一次重跑的耗时（与作答片段的局部重跑对比）
+SCRIPT_TIMER = perf.Timer("script_run")
+
+# 性能页开启“录制下一次重跑”后，对本次脚本运行做 cProfile 采样
+PROFILER = perf.start_profile() if st.session_state.get("profile_armed") else None
+
+# 本次访问的问卷（URL 参数 ?survey=<名称>，不带参数为默认问卷）
+TENANT = surveys.resolve(st.query_params.get(surveys.SURVEY_PARAM))
+if TENANT is None:
+    st.set_page_config(page_title="问卷不存在", page_icon="📚", layout="centered")
+    st.error("⚠️ 问卷不存在，请检查链接是否完整")
+    st.stop()
+
+# 数据库文件路径（每份问卷独立）
+DB_FILE = TENANT.db_file
+
+# 配置监视器（每份问卷一个）：文件变化后自动校验并切换版本，新版本随即存档到该问卷的数据库
+@st.cache_resource
+def get_config_watcher(config_file=config.CONFIG_FILE, db_file=storage.DB_FILE):
+    return config.ConfigWatcher(
+        config_file,
+        on_change=lambda compiled: storage.record_config_version(
+            db_file, compiled["version"], compiled["questions_json"]
+        ),
+        load_version=lambda version: storage.fetch_config_version(db_file, version)
+    )
 
 # 加载配置文件
 def load_config():
-    """加载问卷配置文件，不存在则返回None"""
-    try:
-        with open("survey_config.json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return None
-    except json.JSONDecodeError:
-        return None
+    """当前生效的问卷配置，不存在则返回None；最近一次修改不合法时记录错误信息"""
+    global CONFIG_ERROR
+    with perf.timed("config_load"):
+        watcher = get_config_watcher(TENANT.config_file, DB_FILE)
+        CONFIG_ERROR = watcher.error
+        return watcher.current
 
+CONFIG_ERROR = None
 CONFIG = load_config()
 
 # 设置页面配置
@@ -32,8 +71,20 @@ else:
         layout="centered"
     )
 
-# 数据库文件路径
-DB_FILE = "survey_data.db"
+if CONFIG_ERROR and CONFIG is None:
+    st.error(f"⚠️ 配置文件有误，已使用默认题目：{CONFIG_ERROR}")
+
+# 查看数据页面可选的每页条数
+PAGE_SIZES = [20, 50, 100, 200]
+
+# 续答令牌在 URL 中的参数名
+RESUME_PARAM = "resume"
+
+# 过期草稿清理间隔（秒）
+DRAFT_PURGE_INTERVAL = 3600
+
+# 测试批次标记在 URL 中的参数名：带 ?test_run=<名称> 提交的答卷可在删除页面按批次一次删除
+TEST_RUN_PARAM = "test_run"
 
 # 定义问卷题目（默认回退）
 BASE_QUESTIONS = [
@@ -191,31 +242,110 @@ BASE_QUESTIONS = [
         }
     ]
 
+# 默认问卷（编译后的只读结构，进程内只编译一次，不随每次重跑重新编译）
+@st.cache_resource
+def get_default_survey():
+    return config.compile_config({"questions": BASE_QUESTIONS})
+
+# 读取编译后的问卷（优先使用配置文件中的题目）
+def get_survey():
+    if CONFIG and CONFIG["questions"]:
+        return CONFIG
+    return get_default_survey()
+
 # 读取配置中的问卷题目（优先使用配置文件）
 def get_questions():
-    if CONFIG and "questions" in CONFIG:
-        return CONFIG["questions"]
-    return BASE_QUESTIONS
+    return get_survey()["questions"]
+
+# 当前会话作答使用的问卷
+def get_session_survey():
+    """开始作答时锁定问卷版本，配置热更新不影响正在作答的用户
+
+    锁定的版本已找不到（存档中也没有）时，原有的作答进度属于另一套题目，清空后用当前版本重新开始。
+    """
+    version = st.session_state.get("config_version")
+    survey = get_survey()
+    if version is None or version == survey["version"]:
+        st.session_state.config_version = survey["version"]
+        return survey
+    pinned = get_config_watcher(TENANT.config_file, DB_FILE).get(version)
+    if pinned is not None:
+        return pinned
+    st.session_state.current_question = 0
+    st.session_state.answers = {}
+    st.session_state.other_inputs = {}
+    st.session_state.config_version = survey["version"]
+    st.session_state.survey_reset = True
+    return survey
 
 # 初始化数据库
 def init_database():
-    """初始化SQLite数据库，创建表结构"""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    # 创建表，使用 JSON 存储答案（更灵活）
-    c.execute('''CREATE TABLE IF NOT EXISTS survey_responses
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  submit_time TEXT NOT NULL,
-                  answers TEXT NOT NULL,
-                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-    
-    conn.commit()
-    conn.close()
+    """初始化SQLite数据库，创建表结构（由连接池在首次使用时完成）"""
+    storage.get_pool(DB_FILE)
 
 # 初始化数据库
 init_database()
 
+# 默认问卷的 app_config：进程级设置（指标端口、共享缓存）以它为准，与当前访问哪份问卷无关
+def get_process_config():
+    default = get_config_watcher(config.CONFIG_FILE, storage.DB_FILE).current
+    return default.get("app_config", {}) if default else {}
+
+# 指标端点（进程内唯一）：Prometheus 文本格式，端口可在配置中用 metrics_port 修改，0 为关闭
+@st.cache_resource
+def get_metrics_server():
+    app_config = get_process_config()
+    port = app_config.get("metrics_port", metrics.DEFAULT_PORT)
+    if not port:
+        return None
+    try:
+        return metrics.start_server(app_config.get("metrics_host", metrics.DEFAULT_HOST), port)
+    except OSError:
+        # 端口被占用（如同一台机器上多个实例）时不影响问卷本身
+        return None
+
+get_metrics_server()
+
+# 读缓存（进程内所有会话、所有问卷共享），TTL 与总内存上限在默认问卷的配置中调整
+@st.cache_resource
+def get_data_cache():
+    app_config = get_process_config()
+    return cache.VersionedCache(
+        ttl=app_config.get("cache_ttl", cache.DEFAULT_TTL),
+        max_bytes=app_config.get("cache_total_mb", max(
+            cache.DEFAULT_TOTAL_MB, app_config.get("cache_max_mb", cache.DEFAULT_MAX_MB)
+        )) * 1024 * 1024
+    )
+
+# 当前问卷的缓存分区：以数据库文件为分区名，内存上限取该问卷配置的 cache_max_mb
+def get_survey_cache():
+    app_config = CONFIG.get("app_config", {}) if CONFIG else {}
+    data_cache = get_data_cache()
+    data_cache.set_partition_limit(DB_FILE, app_config.get("cache_max_mb", cache.DEFAULT_MAX_MB) * 1024 * 1024)
+    return data_cache
+
+# 答卷存储后端（每个进程每种设置一个），按问卷配置中的 storage 选择，默认本地 SQLite
+@st.cache_resource
+def open_backend(name, target):
+    return backends.open_backend(name, target)
+
+def get_backend_settings():
+    app_config = CONFIG.get("app_config", {}) if CONFIG else {}
+    return backends.backend_settings(app_config, DB_FILE, TENANT.slug)
+
+def get_backend():
+    settings = get_backend_settings()
+    backend = open_backend(*settings)
+    # 已删除答卷的后台清理线程（每个后端一个）
+    maintenance.get_maintenance(settings, backend)
+    register_backend_gauges(TENANT.slug, settings, backend)
+    return backend
+
+# 每份问卷的存储后端登记一次指标仪表（配置热更新换了后端时重新登记）
+@st.cache_resource
+def register_backend_gauges(slug, settings, _backend):
+    metrics.register_database_gauges(slug, _backend)
+
 # 初始化Session State
 def init_session_state():
     if "current_question" not in st.session_state:
@@ -227,104 +357,187 @@ def init_session_state():
     if "submitted" not in st.session_state:
         st.session_state.submitted = False
 
+# 同一会话换到另一份问卷时丢弃原问卷的作答状态（草稿令牌与版本号都属于原问卷）
+def switch_survey():
+    if st.session_state.get("survey_slug", TENANT.slug) != TENANT.slug:
+        for key in ("current_question", "answers", "other_inputs", "submitted",
+                    "config_version", "draft_token", "nav_error"):
+            st.session_state.pop(key, None)
+    st.session_state.survey_slug = TENANT.slug
+
+switch_survey()
 init_session_state()
 
-# 保存数据到数据库
-def save_to_database(answers, submit_time):
-    """将问卷答案保存到SQLite数据库"""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    # 将答案字典转换为JSON字符串存储
-    answers_json = json.dumps(answers, ensure_ascii=False)
-    
-    c.execute('''INSERT INTO survey_responses (submit_time, answers)
-                 VALUES (?, ?)''', (submit_time, answers_json))
-    
-    conn.commit()
-    conn.close()
-
-# 从数据库读取所有数据
-def load_from_database():
-    """从数据库读取所有问卷数据"""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    c.execute('''SELECT id, submit_time, answers, created_at 
-                 FROM survey_responses 
-                 ORDER BY created_at DESC''')
-    
-    rows = c.fetchall()
-    conn.close()
-    
-    # 转换为DataFrame格式
-    data = []
-    questions = get_questions()
-    question_ids = ["id", "submit_time"] + [q["id"] for q in questions]
-    
-    for row in rows:
-        record = {"id": row[0], "submit_time": row[1], "created_at": row[3]}
-        answers = json.loads(row[2])
-        record.update(answers)
-        data.append(record)
-    
-    if data:
-        df = pd.DataFrame(data)
-        return df
+# 过期草稿清理（进程内最多每小时一次）
+@st.cache_resource
+def get_draft_purge_state():
+    return {"last": 0.0}
+
+def maybe_purge_drafts():
+    state = get_draft_purge_state()
+    now = time.monotonic()
+    if now - state["last"] >= DRAFT_PURGE_INTERVAL:
+        state["last"] = now
+        storage.purge_expired_drafts(DB_FILE)
+
+# 恢复作答草稿
+def resume_draft():
+    """会话首次进入问卷时：URL 带续答令牌则恢复草稿，否则生成新令牌写入 URL"""
+    if st.session_state.get("draft_token"):
+        return
+    token = st.query_params.get(RESUME_PARAM)
+    if token:
+        draft = storage.load_draft(DB_FILE, token)
+        if draft:
+            st.session_state.config_version = draft["config_version"]
+            st.session_state.current_question = draft["current_question"]
+            st.session_state.answers = draft["answers"]
+            st.session_state.other_inputs = draft["other_inputs"]
     else:
-        return pd.DataFrame(columns=question_ids)
+        token = secrets.token_urlsafe(12)
+        st.query_params[RESUME_PARAM] = token
+    st.session_state.draft_token = token
+    maybe_purge_drafts()
+
+# 保存作答草稿
+def checkpoint_draft():
+    """切换题目时保存草稿；单次点选只改内存状态，不写数据库"""
+    storage.save_draft(
+        DB_FILE,
+        st.session_state.draft_token,
+        st.session_state.get("config_version"),
+        st.session_state.current_question,
+        st.session_state.answers,
+        st.session_state.other_inputs
+    )
+
+# 保存数据到数据库
+def save_to_database(answers, submit_time, config_version=None, test_run=None):
+    """将问卷答案写入存储后端（SQLite 经后台写线程批量落盘），确认写入后返回记录id"""
+    start = time.perf_counter()
+    try:
+        record_id = get_backend().save(answers, submit_time, config_version, test_run)
+    except Exception:
+        metrics.SUBMISSIONS.inc(result="error")
+        raise
+    finally:
+        metrics.SAVE_LATENCY.observe(time.perf_counter() - start)
+    metrics.SUBMISSIONS.inc(result="success")
+    return record_id
+
+# 读取答卷并记录耗时（只统计实际查询数据库的情况，不含缓存命中）
+def timed_load(kind, loader):
+    start = time.perf_counter()
+    try:
+        return loader()
+    finally:
+        metrics.LOAD_LATENCY.observe(time.perf_counter() - start, kind=kind)
+
+# 读取聚合统计
+def load_option_counts():
+    """读取每题每个选项的累计次数（来自聚合表，不扫描原始答案）"""
+    return get_survey_cache().get_or_load(
+        ("option_counts", DB_FILE),
+        get_backend().data_version(),
+        lambda: get_backend().option_counts(),
+        partition=DB_FILE
+    )
+
+# 按页读取数据
+def load_page(after, page_size):
+    """读取一页数据，多取一行用来判断是否还有下一页"""
+    return get_survey_cache().get_or_load(
+        ("page", DB_FILE, get_survey()["version"], after, page_size),
+        get_backend().data_version(),
+        lambda: timed_load("page", lambda: get_backend().fetch_frame(
+            get_questions(), after=after, limit=page_size + 1
+        )),
+        partition=DB_FILE
+    )
 
 # 从数据库删除数据
-def delete_from_database(record_ids):
-    """从数据库删除指定的记录"""
-    if not record_ids:
-        return False
+def delete_from_database(record_ids=None, description="", **filters):
+    """软删除指定 id 或符合筛选条件的记录（保留期内可在“最近删除”中撤销），返回删除条数"""
+    if record_ids is not None and len(record_ids) == 0:
+        return 0
     
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
+    _, deleted_count = get_backend().delete(record_ids, description, **filters)
+    metrics.DELETES.inc(deleted_count)
+    # 版本号已随删除递增，这里再显式清空本问卷的缓存，保证本进程立即看到删除结果
+    get_data_cache().invalidate(partition=DB_FILE)
+    return deleted_count
+
+# 撤销一次删除
+def restore_deleted(batch_id):
+    restored = get_backend().restore(batch_id)
+    metrics.RESTORES.inc(restored)
+    get_data_cache().invalidate(partition=DB_FILE)
+    return restored
+
+# 批量删除的筛选条件
+def delete_filter_form():
+    """提交日期、某题的答案、测试批次，返回 (筛选条件, 说明)；一个条件都没选时筛选条件为空"""
+    filters = {}
+    parts = []
+    date_range = st.date_input("提交日期范围", value=[], key="delete_date_range")
+    if len(date_range) == 2:
+        filters["submit_from"], filters["submit_to"] = date_range_bounds(date_range)
+        parts.append(f"提交日期 {date_range[0]} ~ {date_range[1]}")
     
-    try:
-        # 构建删除SQL，支持批量删除
-        placeholders = ','.join(['?'] * len(record_ids))
-        c.execute(f'DELETE FROM survey_responses WHERE id IN ({placeholders})', record_ids)
-        conn.commit()
-        deleted_count = c.rowcount
-        conn.close()
-        return deleted_count > 0
-    except Exception as e:
-        conn.rollback()
-        conn.close()
-        raise e
+    by_id = {q['id']: q for q in get_questions() if q.get('options')}
+    col1, col2 = st.columns(2)
+    with col1:
+        question_id = st.selectbox(
+            "题目", [None] + list(by_id), key="delete_question",
+            format_func=lambda qid: "不限" if qid is None else by_id[qid]['text']
+        )
+        question = by_id.get(question_id)
+    with col2:
+        option = st.selectbox(
+            "答案", question['options'] if question else [], key="delete_option", disabled=question is None
+        )
+    if question is not None and option is not None:
+        filters["question_id"], filters["option"] = question['id'], option
+        parts.append(f"{question['text']} = {option}")
+    
+    test_run_choices = ["不限", "全部测试答卷"] + get_backend().test_runs()
+    test_run = st.selectbox(f"测试批次（带 ?{TEST_RUN_PARAM}= 提交的答卷）", test_run_choices, key="delete_test_run")
+    if test_run == "全部测试答卷":
+        filters["test_run"] = storage.ANY_TEST_RUN
+        parts.append("全部测试答卷")
+    elif test_run != "不限":
+        filters["test_run"] = test_run
+        parts.append(f"测试批次 {test_run}")
+    return filters, "；".join(parts)
 
-# 处理“其它”选项的辅助方法
-def is_other_option(option):
-    if not isinstance(option, str):
-        return False
-    return "______" in option or option.strip().startswith("其它")
+# 最近删除（可撤销）
+def deleted_batches_panel():
+    batches = get_backend().delete_batches()
+    if not batches:
+        return
+    with st.expander(f"↩️ 最近删除（{storage.DELETE_RETENTION_HOURS} 小时内可撤销）"):
+        for batch in batches:
+            col1, col2 = st.columns([5, 1])
+            with col1:
+                st.write(f"{batch['deleted_at']} (UTC) | {batch['description'] or '未注明'} | {batch['count']} 条")
+            with col2:
+                if st.button("撤销", key=f"restore_batch_{batch['id']}"):
+                    try:
+                        restore_deleted(batch['id'])
+                        st.session_state.page_cursors = [None]
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"撤销时出错: {str(e)}")
 
+# 处理“其它”选项的辅助方法
 def normalize_answer(question, raw_answer):
-    """将包含“其它”选项的答案替换为填写内容"""
-    if question['type'] == 'single':
-        if is_other_option(raw_answer):
-            other_text = st.session_state.other_inputs.get(question['id'], "").strip()
-            return f"其它：{other_text}" if other_text else "其它："
-        return raw_answer
-    if question['type'] == 'multi':
-        normalized = []
-        for option in raw_answer:
-            if is_other_option(option):
-                other_text = st.session_state.other_inputs.get(question['id'], "").strip()
-                normalized.append(f"其它：{other_text}" if other_text else "其它：")
-            else:
-                normalized.append(option)
-        return normalized
-    return raw_answer
+    """将包含“其它”选项的答案替换为填写内容（规则见 validation.py，接入 API 共用）"""
+    return validation.normalize_answer(
+        question, raw_answer, st.session_state.other_inputs.get(question['id'], "")
+    )
 
 # 问卷主体
 def survey_interface():
-    questions = get_questions()
-    total_questions = len(questions)
-    
     # 从配置读取标题，如果没有则使用默认值
     app_title = "📚 AI智能体赋能教学调研"
     if CONFIG and 'app_config' in CONFIG and 'title' in CONFIG['app_config']:
@@ -338,109 +551,153 @@ def survey_interface():
             st.session_state.current_question = 0
             st.session_state.answers = {}
             st.session_state.submitted = False
+            # 重新作答时使用最新版本的问卷
+            st.session_state.config_version = get_survey()["version"]
             st.rerun()
     else:
-        # 显示当前题目
-        current_idx = st.session_state.current_question
-        if 0 <= current_idx < total_questions:
-            q = questions[current_idx]
-            
-            # 进度指示
-            st.progress((current_idx + 1) / total_questions)
-            st.write(f"**问题 {current_idx + 1}/{total_questions}**")
-            
-            st.write(f"**{q['text']}**")
-            
-            # 单选或多选题
-            if q['type'] == 'single':
-                # 单选题
-                current_answer = st.session_state.answers.get(q['id'])
-                index = q['options'].index(current_answer) if current_answer in q['options'] else None
-                answer = st.radio(
-                    "请选择",
-                    options=q['options'],
-                    index=index,
-                    key=q['id'],
-                    horizontal=False
+        # 恢复掉线前的作答进度
+        resume_draft()
+        question_fragment()
+
+# 翻页回调：在重跑之前修改状态，点击一次只重跑一次
+def go_previous_question():
+    st.session_state.current_question -= 1
+    checkpoint_draft()
+
+def go_next_question(q):
+    # 验证当前题是否已回答
+    if q['type'] == 'single' and st.session_state.answers.get(q['id']) is None:
+        st.session_state.nav_error = "请选择一个答案"
+        metrics.VALIDATION_ERRORS.inc(step="next")
+        return
+    st.session_state.current_question += 1
+    checkpoint_draft()
+
+# 单题作答区域：点选选项与翻页只重跑本片段，不重跑侧边栏与页面其它部分
+@st.fragment
+def question_fragment():
+    with perf.timed("question_fragment"):
+        render_question()
+
+def render_question():
+    survey = get_session_survey()
+    questions = survey["questions"]
+    total_questions = len(questions)
+    if st.session_state.pop("survey_reset", False):
+        st.info("问卷已更新，之前的作答进度无法继续，请从第一题重新作答")
+    
+    # 显示当前题目
+    current_idx = st.session_state.current_question
+    if 0 <= current_idx < total_questions:
+        q = questions[current_idx]
+        
+        # 进度指示
+        st.progress((current_idx + 1) / total_questions)
+        st.write(f"**问题 {current_idx + 1}/{total_questions}**")
+        
+        st.write(f"**{q['text']}**")
+        
+        # 单选或多选题
+        if q['type'] == 'single':
+            # 单选题
+            current_answer = st.session_state.answers.get(q['id'])
+            index = q['option_index'].get(current_answer)
+            answer = st.radio(
+                "请选择",
+                options=q['options'],
+                index=index,
+                key=q['id'],
+                horizontal=False
+            )
+            st.session_state.answers[q['id']] = answer
+            if validation.is_other_option(answer):
+                other_text = st.text_input(
+                    "请填写其它内容",
+                    value=st.session_state.other_inputs.get(q['id'], ""),
+                    key=f"{q['id']}_other_input"
                 )
-                st.session_state.answers[q['id']] = answer
-                if is_other_option(answer):
-                    other_text = st.text_input(
-                        "请填写其它内容",
-                        value=st.session_state.other_inputs.get(q['id'], ""),
-                        key=f"{q['id']}_other_input"
-                    )
-                    st.session_state.other_inputs[q['id']] = other_text
-            elif q['type'] == 'multi':
-                # 多选题
-                selected = st.session_state.answers.get(q['id'], [])
-                for option in q['options']:
-                    if st.checkbox(option, option in selected, key=f"{q['id']}_{option}"):
-                        if option not in selected:
-                            selected.append(option)
-                    elif option in selected:
-                        selected.remove(option)
-                st.session_state.answers[q['id']] = selected
-                if any(is_other_option(option) for option in selected):
-                    other_text = st.text_input(
-                        "请填写其它内容",
-                        value=st.session_state.other_inputs.get(q['id'], ""),
-                        key=f"{q['id']}_other_input"
-                    )
-                    st.session_state.other_inputs[q['id']] = other_text
-            
-            # 导航按钮
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                if current_idx > 0:
-                    if st.button("上一题"):
-                        st.session_state.current_question -= 1
-                        st.rerun()
-            
-            with col2:
-                if current_idx < total_questions - 1:
-                    if st.button("下一题"):
-                        # 验证当前题是否已回答
-                        if q['type'] == 'single' and st.session_state.answers.get(q['id']) is None:
-                            st.error("请选择一个答案")
-                        else:
-                            st.session_state.current_question += 1
-                            st.rerun()
-                else:
-                    # 最后一题，显示提交按钮
-                    if st.button("提交", type="primary"):
-                        # 验证所有单选题是否已回答
-                        missing_answers = []
+                st.session_state.other_inputs[q['id']] = other_text
+        elif q['type'] == 'multi':
+            # 多选题
+            selected = st.session_state.answers.get(q['id'], [])
+            selected_set = set(selected)
+            for option in q['options']:
+                if st.checkbox(option, option in selected_set, key=f"{q['id']}_{option}"):
+                    if option not in selected_set:
+                        selected.append(option)
+                elif option in selected_set:
+                    selected.remove(option)
+            st.session_state.answers[q['id']] = selected
+            if any(validation.is_other_option(option) for option in selected):
+                other_text = st.text_input(
+                    "请填写其它内容",
+                    value=st.session_state.other_inputs.get(q['id'], ""),
+                    key=f"{q['id']}_other_input"
+                )
+                st.session_state.other_inputs[q['id']] = other_text
+        
+        # 导航按钮
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if current_idx > 0:
+                st.button("上一题", on_click=go_previous_question)
+        
+        with col2:
+            if current_idx < total_questions - 1:
+                st.button("下一题", on_click=go_next_question, args=(q,))
+                nav_error = st.session_state.pop("nav_error", None)
+                if nav_error:
+                    st.error(nav_error)
+            else:
+                # 最后一题，显示提交按钮
+                if st.button("提交", type="primary"):
+                    # 验证所有单选题是否已回答
+                    missing_answers = validation.missing_answers(questions, st.session_state.answers)
+                    
+                    if missing_answers:
+                        metrics.VALIDATION_ERRORS.inc(step="submit")
+                        st.error(f"请回答所有问题")
+                    else:
+                        # 记录当前时间
+                        submit_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                        
+                        # 准备答案数据（保持原始格式）
+                        answers = {}
                         for q in questions:
-                            if q['type'] == 'single' and st.session_state.answers.get(q['id']) is None:
-                                missing_answers.append(q['text'])
+                            if q['type'] == 'single':
+                                answers[q['id']] = normalize_answer(q, st.session_state.answers[q['id']])
+                            elif q['type'] == 'multi':
+                                # 多选题保存为列表（没有翻到过的多选题视为未选）
+                                answers[q['id']] = normalize_answer(q, st.session_state.answers.get(q['id'], []))
                         
-                        if missing_answers:
-                            st.error(f"请回答所有问题")
+                        # 添加提交时间到答案中
+                        answers['submit_time'] = submit_time
+                        
+                        # 保存到数据库
+                        try:
+                            save_to_database(answers, submit_time, survey["version"],
+                                             st.query_params.get(TEST_RUN_PARAM))
+                        except writer.CommitTimeoutError as e:
+                            # 答卷可能稍后才落盘，不能提示重试
+                            st.warning(str(e))
+                        except Exception as e:
+                            st.error(f"提交失败，请稍后重试: {str(e)}")
                         else:
-                            # 记录当前时间
-                            submit_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                            
-                            # 准备答案数据（保持原始格式）
-                            answers = {}
-                            for q in questions:
-                                if q['type'] == 'single':
-                                    answers[q['id']] = normalize_answer(q, st.session_state.answers[q['id']])
-                                elif q['type'] == 'multi':
-                                    # 多选题保存为列表
-                                    answers[q['id']] = normalize_answer(q, st.session_state.answers[q['id']])
-                            
-                            # 添加提交时间到答案中
-                            answers['submit_time'] = submit_time
-                            
-                            # 保存到数据库
-                            save_to_database(answers, submit_time)
-                            
-                            # 标记为已提交
+                            # 标记为已提交，草稿不再需要
                             st.session_state.submitted = True
+                            storage.delete_draft(DB_FILE, st.session_state.draft_token)
+                            st.session_state.draft_token = None
+                            st.query_params.pop(RESUME_PARAM, None)
                             st.rerun()
 
+# 日期范围转为提交时间区间
+def date_range_bounds(date_range):
+    """把 st.date_input 选出的 (开始, 结束) 日期转为提交时间闭区间，未选完整时返回 (None, None)"""
+    if len(date_range) != 2:
+        return None, None
+    return f"{date_range[0]} 00:00:00", f"{date_range[1]} 23:59:59"
+
 # 数据查看页面
 def data_viewer():
     """数据查看和管理页面"""
@@ -458,24 +715,30 @@ def data_viewer():
         st.warning("请输入正确的密码以查看数据")
         return
     
+    # 配置热更新状态
+    st.caption(f"当前问卷版本：{get_survey()['version']}")
+    if CONFIG_ERROR and CONFIG is not None:
+        st.warning(f"⚠️ 配置文件最近一次修改未生效，仍在使用上一个版本：{CONFIG_ERROR}")
+    
     # 加载数据
     try:
-        df = load_from_database()
+        total = get_backend().response_count()
         
-        if df.empty:
+        if total == 0:
             st.info("暂无数据，请等待问卷提交")
+            # 全部删除后仍可撤销
+            deleted_batches_panel()
             return
         
         # 统计信息
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("总提交数", len(df))
+            st.metric("总提交数", total)
         with col2:
-            if 'submit_time' in df.columns:
-                latest = df['submit_time'].iloc[0] if len(df) > 0 else "无"
-                st.metric("最新提交", latest[:10] if isinstance(latest, str) else latest)
+            latest = get_backend().latest_submit_time() or "无"
+            st.metric("最新提交", latest[:10] if isinstance(latest, str) else latest)
         with col3:
-            st.metric("数据库文件", DB_FILE)
+            st.metric("数据库文件", DB_FILE if get_backend().name == backends.BACKEND_SQLITE else "PostgreSQL")
         
         st.divider()
         
@@ -485,13 +748,19 @@ def data_viewer():
         # 导出和删除功能
         col1, col2, col3 = st.columns([1, 1, 3])
         with col1:
-            csv = df.to_csv(index=False, encoding="utf-8-sig")
-            st.download_button(
-                label="📥 导出CSV",
-                data=csv,
-                file_name=f"survey_data_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
+            # 点击下载时才分块读取数据库生成文件，平时不占内存
+            with st.popover("📥 导出"):
+                export_format = st.selectbox("导出格式", list(export.EXPORT_FORMATS), key="export_format")
+                export_range = st.date_input("提交日期范围（留空导出全部）", value=[], key="export_date_range")
+                submit_from, submit_to = date_range_bounds(export_range)
+                extension, mime = export.EXPORT_FORMATS[export_format]
+                questions = get_questions()
+                st.download_button(
+                    label=f"📥 导出{export_format}",
+                    data=lambda: export.export_responses(get_backend(), questions, export_format, submit_from, submit_to),
+                    file_name=f"survey_data_{datetime.now().strftime('%Y%m%d')}.{extension}",
+                    mime=mime
+                )
         
         # 删除功能
         with col2:
@@ -502,28 +771,45 @@ def data_viewer():
                 st.session_state.delete_mode = not st.session_state.delete_mode
                 st.rerun()
         
+        # 每页条数
+        with col3:
+            page_size = st.selectbox("每页条数", PAGE_SIZES, key="page_size")
+        
+        # 翻页游标：每页起点之前一行的 (created_at, id)，第一页为 None
+        if st.session_state.get("page_cursors_size") != page_size:
+            st.session_state.page_cursors = [None]
+            st.session_state.page_cursors_size = page_size
+        page_df = load_page(st.session_state.page_cursors[-1], page_size)
+        has_next = len(page_df) > page_size
+        page_df = page_df.iloc[:page_size]
+        
         # 显示数据表（带选择功能）
         if st.session_state.delete_mode:
-            st.info("🔴 删除模式已开启：勾选要删除的记录，然后点击下方删除按钮")
+            st.info("🔴 删除模式已开启：勾选要删除的记录（仅当前页），或按条件批量删除；删除的记录在保留期内可撤销")
             # 添加多选框
             if 'selected_rows' not in st.session_state:
                 st.session_state.selected_rows = []
             
-            # 显示复选框列表
-            selected_ids = []
-            for idx, row in df.iterrows():
-                checkbox_key = f"delete_checkbox_{row['id']}"
+            if st.button("☑️ 全选本页"):
+                for record_id in page_df['id']:
+                    if record_id not in st.session_state.selected_rows:
+                        st.session_state.selected_rows.append(record_id)
+                    st.session_state[f"delete_checkbox_{record_id}"] = True
+                st.rerun()
+            
+            # 显示复选框列表（只为当前页创建）
+            for record_id, submit_time in zip(page_df['id'], page_df['submit_time']):
+                checkbox_key = f"delete_checkbox_{record_id}"
                 if st.checkbox(
-                    f"ID: {row['id']} | {row.get('submit_time', 'N/A')}",
+                    f"ID: {record_id} | {submit_time}",
                     key=checkbox_key,
-                    value=row['id'] in st.session_state.selected_rows
+                    value=record_id in st.session_state.selected_rows
                 ):
-                    if row['id'] not in st.session_state.selected_rows:
-                        st.session_state.selected_rows.append(row['id'])
-                    selected_ids.append(row['id'])
+                    if record_id not in st.session_state.selected_rows:
+                        st.session_state.selected_rows.append(record_id)
                 else:
-                    if row['id'] in st.session_state.selected_rows:
-                        st.session_state.selected_rows.remove(row['id'])
+                    if record_id in st.session_state.selected_rows:
+                        st.session_state.selected_rows.remove(record_id)
             
             # 显示要删除的记录预览
             if st.session_state.selected_rows:
@@ -532,75 +818,86 @@ def data_viewer():
                 # 删除按钮
                 if st.button("⚠️ 确认删除选中记录", type="primary"):
                     try:
-                        deleted = delete_from_database(st.session_state.selected_rows)
+                        deleted = delete_from_database(
+                            st.session_state.selected_rows, f"勾选的 {len(st.session_state.selected_rows)} 条记录"
+                        )
                         if deleted:
-                            st.success(f"成功删除 {len(st.session_state.selected_rows)} 条记录")
+                            st.success(f"成功删除 {deleted} 条记录")
                             st.session_state.selected_rows = []
                             st.session_state.delete_mode = False
+                            st.session_state.page_cursors = [None]
                             st.rerun()
                         else:
                             st.error("删除失败")
                     except Exception as e:
                         st.error(f"删除时出错: {str(e)}")
             
-            # 显示完整数据表（只读）
-            st.dataframe(df.drop(columns=['id']), use_container_width=True, height=300)
+            # 按条件批量删除（筛选与删除都在 SQL 中执行，不需要逐条勾选）
+            with st.expander("🔎 按条件批量删除"):
+                filters, description = delete_filter_form()
+                if filters:
+                    matched = get_backend().count(**filters)
+                    st.warning(f"符合条件的记录共 {matched} 条")
+                    if matched and st.button("⚠️ 删除符合条件的全部记录"):
+                        try:
+                            if delete_from_database(description=description, **filters):
+                                st.session_state.selected_rows = []
+                                st.session_state.page_cursors = [None]
+                                st.rerun()
+                            else:
+                                st.error("删除失败")
+                        except Exception as e:
+                            st.error(f"删除时出错: {str(e)}")
+            
+            deleted_batches_panel()
+            
+            # 显示当前页数据（只读）
+            st.dataframe(page_df.drop(columns=['id']), use_container_width=True, height=300)
         else:
-            # 正常模式：显示数据表
-            st.dataframe(df.drop(columns=['id']), use_container_width=True, height=400)
+            # 正常模式：显示当前页数据
+            st.dataframe(page_df.drop(columns=['id']), use_container_width=True, height=400)
+        
+        # 翻页
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if len(st.session_state.page_cursors) > 1 and st.button("上一页"):
+                st.session_state.page_cursors.pop()
+                st.rerun()
+        with col2:
+            page_no = len(st.session_state.page_cursors)
+            page_count = max(1, -(-total // page_size))
+            st.write(f"第 {page_no} / {page_count} 页")
+        with col3:
+            if has_next and st.button("下一页"):
+                last = page_df.iloc[-1]
+                st.session_state.page_cursors.append((last['created_at'], int(last['id'])))
+                st.rerun()
         
         # 简单的统计分析
         st.divider()
         st.subheader("📈 快速统计")
         
-        # 显示所有单选题和多选题的统计
+        # 显示所有单选题和多选题的统计（读取聚合表）
         questions = get_questions()
+        option_counts = load_option_counts()
         
         for q in questions:
-            if q['id'] not in df.columns:
-                continue
-                
             st.write(f"**{q['text']}**")
             
-            # 处理单选题
-            if q['type'] == 'single':
-                counts = df[q['id']].value_counts()
-                if len(counts) > 0:
-                    # 显示为柱状图
-                    st.bar_chart(counts)
-                    # 也显示详细数值
-                    count_df = pd.DataFrame({
-                        '选项': counts.index,
-                        '数量': counts.values
-                    })
-                    st.dataframe(count_df, use_container_width=True, hide_index=True)
-                else:
-                    st.info("暂无数据")
-            
-            # 处理多选题（统计每个选项被选择的次数）
-            elif q['type'] == 'multi':
-                option_counts = {}
-                for _, row in df.iterrows():
-                    answer = row[q['id']]
-                    if isinstance(answer, list):
-                        for opt in answer:
-                            option_counts[opt] = option_counts.get(opt, 0) + 1
-                    elif isinstance(answer, str) and answer:
-                        # 处理可能是字符串格式的多选答案
-                        options = [opt.strip() for opt in answer.split(';') if opt.strip()]
-                        for opt in options:
-                            option_counts[opt] = option_counts.get(opt, 0) + 1
-                
-                if option_counts:
-                    counts_series = pd.Series(option_counts).sort_values(ascending=False)
+            counts = option_counts.get(q['id'], {})
+            if counts:
+                counts_series = pd.Series(counts)
+                # 显示为柱状图
+                with perf.timed("chart_render"):
                     st.bar_chart(counts_series)
-                    count_df = pd.DataFrame({
-                        '选项': counts_series.index,
-                        '选择次数': counts_series.values
-                    })
-                    st.dataframe(count_df, use_container_width=True, hide_index=True)
-                else:
-                    st.info("暂无数据")
+                # 也显示详细数值
+                count_df = pd.DataFrame({
+                    '选项': counts_series.index,
+                    '数量' if q['type'] == 'single' else '选择次数': counts_series.values
+                })
+                st.dataframe(count_df, use_container_width=True, hide_index=True)
+            else:
+                st.info("暂无数据")
             
             st.write("---")
         
@@ -609,160 +906,19 @@ def data_viewer():
         st.info("如果数据库文件不存在，请先提交一份问卷")
 
 # 数据分析报告生成
-def generate_analysis_report(df):
-    """生成数据分析报告"""
-    questions = get_questions()
-    report = []
-    
-    # 总览
-    report.append("=" * 60)
-    report.append("📊 问卷数据分析报告")
-    report.append("=" * 60)
-    report.append(f"\n总样本数：{len(df)} 份")
-    report.append(f"生成时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-    
-    # 分类统计
-    teaching_questions = []
-    paper_questions = []
-    grant_questions = []
-    other_questions = []
-    
-    for q in questions:
-        q_text = q['text'].lower()
-        if '教学' in q_text:
-            teaching_questions.append(q)
-        elif '论文' in q_text or '写作' in q_text:
-            paper_questions.append(q)
-        elif '课题' in q_text or '申报' in q_text:
-            grant_questions.append(q)
-        else:
-            other_questions.append(q)
-    
-    # 教学方向分析
-    if teaching_questions:
-        report.append("\n" + "=" * 60)
-        report.append("📚 教学方向分析")
-        report.append("=" * 60 + "\n")
-        
-        for q in teaching_questions:
-            if q['id'] not in df.columns:
-                continue
-            report.append(f"\n{q['text']}")
-            report.append("-" * 60)
-            
-            if q['type'] == 'single':
-                counts = df[q['id']].value_counts()
-                for option, count in counts.items():
-                    percentage = (count / len(df)) * 100
-                    report.append(f"  {option}: {count}人 ({percentage:.1f}%)")
-            elif q['type'] == 'multi':
-                option_counts = {}
-                for _, row in df.iterrows():
-                    answer = row[q['id']]
-                    if isinstance(answer, list):
-                        for opt in answer:
-                            option_counts[opt] = option_counts.get(opt, 0) + 1
-                    elif isinstance(answer, str) and answer:
-                        options = [opt.strip() for opt in answer.split(';') if opt.strip()]
-                        for opt in options:
-                            option_counts[opt] = option_counts.get(opt, 0) + 1
-                
-                sorted_options = sorted(option_counts.items(), key=lambda x: x[1], reverse=True)
-                for option, count in sorted_options:
-                    percentage = (count / len(df)) * 100
-                    report.append(f"  {option}: {count}次 ({percentage:.1f}%)")
-    
-    # 论文/写作方向分析
-    if paper_questions:
-        report.append("\n\n" + "=" * 60)
-        report.append("📝 论文/写作方向分析")
-        report.append("=" * 60 + "\n")
-        
-        for q in paper_questions:
-            if q['id'] not in df.columns:
-                continue
-            report.append(f"\n{q['text']}")
-            report.append("-" * 60)
-            
-            if q['type'] == 'single':
-                counts = df[q['id']].value_counts()
-                for option, count in counts.items():
-                    percentage = (count / len(df)) * 100
-                    report.append(f"  {option}: {count}人 ({percentage:.1f}%)")
-            elif q['type'] == 'multi':
-                option_counts = {}
-                for _, row in df.iterrows():
-                    answer = row[q['id']]
-                    if isinstance(answer, list):
-                        for opt in answer:
-                            option_counts[opt] = option_counts.get(opt, 0) + 1
-                    elif isinstance(answer, str) and answer:
-                        options = [opt.strip() for opt in answer.split(';') if opt.strip()]
-                        for opt in options:
-                            option_counts[opt] = option_counts.get(opt, 0) + 1
-                
-                sorted_options = sorted(option_counts.items(), key=lambda x: x[1], reverse=True)
-                for option, count in sorted_options:
-                    percentage = (count / len(df)) * 100
-                    report.append(f"  {option}: {count}次 ({percentage:.1f}%)")
-    
-    # 课题申报方向分析
-    if grant_questions:
-        report.append("\n\n" + "=" * 60)
-        report.append("📋 课题申报方向分析")
-        report.append("=" * 60 + "\n")
-        
-        for q in grant_questions:
-            if q['id'] not in df.columns:
-                continue
-            report.append(f"\n{q['text']}")
-            report.append("-" * 60)
-            
-            if q['type'] == 'single':
-                counts = df[q['id']].value_counts()
-                for option, count in counts.items():
-                    percentage = (count / len(df)) * 100
-                    report.append(f"  {option}: {count}人 ({percentage:.1f}%)")
-            elif q['type'] == 'multi':
-                option_counts = {}
-                for _, row in df.iterrows():
-                    answer = row[q['id']]
-                    if isinstance(answer, list):
-                        for opt in answer:
-                            option_counts[opt] = option_counts.get(opt, 0) + 1
-                    elif isinstance(answer, str) and answer:
-                        options = [opt.strip() for opt in answer.split(';') if opt.strip()]
-                        for opt in options:
-                            option_counts[opt] = option_counts.get(opt, 0) + 1
-                
-                sorted_options = sorted(option_counts.items(), key=lambda x: x[1], reverse=True)
-                for option, count in sorted_options:
-                    percentage = (count / len(df)) * 100
-                    report.append(f"  {option}: {count}次 ({percentage:.1f}%)")
-    
-    # 关键决策问题
-    decision_questions = [q for q in questions if '优先' in q['text'] or '关键' in q['text']]
-    if decision_questions:
-        report.append("\n\n" + "=" * 60)
-        report.append("🎯 关键决策分析")
-        report.append("=" * 60 + "\n")
-        
-        for q in decision_questions:
-            if q['id'] not in df.columns:
-                continue
-            report.append(f"\n{q['text']}")
-            report.append("-" * 60)
-            
-            counts = df[q['id']].value_counts()
-            for option, count in counts.items():
-                percentage = (count / len(df)) * 100
-                report.append(f"  {option}: {count}人 ({percentage:.1f}%)")
-    
-    report.append("\n" + "=" * 60)
-    report.append("报告生成完成")
-    report.append("=" * 60)
-    
-    return "\n".join(report)
+def generate_analysis_report(option_counts, total):
+    """根据聚合计数生成数据分析报告"""
+    return report.build_report(get_survey(), option_counts, total)
+
+# 读取分析报告
+def load_analysis_report():
+    """按 (数据版本, 问卷版本) 缓存整份报告，没有新数据时打开报告页不再重新生成"""
+    return get_survey_cache().get_or_load(
+        ("report", DB_FILE, get_survey()["version"]),
+        get_backend().data_version(),
+        lambda: generate_analysis_report(load_option_counts(), get_backend().response_count()),
+        partition=DB_FILE
+    )
 
 # 数据分析报告页面
 def analysis_report():
@@ -780,130 +936,351 @@ def analysis_report():
         st.warning("请输入正确的密码以查看分析报告")
         return
     
-    # 加载数据
+    # 加载聚合统计（不读取原始答案）
     try:
-        df = load_from_database()
+        total = get_backend().response_count()
         
-        if df.empty:
+        if total == 0:
             st.info("暂无数据，请等待问卷提交")
             return
         
-        # 生成报告
-        report_text = generate_analysis_report(df)
-        
-        # 显示报告
-        st.subheader("📊 完整分析报告")
-        st.text_area("分析报告", report_text, height=600, disabled=False, key="report_display")
-        
-        # 下载报告
-        st.download_button(
-            label="📥 下载分析报告（TXT）",
-            data=report_text,
-            file_name=f"survey_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-            mime="text/plain"
+        # 选中的标签页才执行（交叉分析需要读取全部答案，不在报告页顺带计算）
+        report_tab, crosstab_tab, trend_tab = st.tabs(
+            ["📊 分析报告", "🔀 交叉分析", "📅 时间趋势"], key="analysis_tab", on_change="rerun"
         )
-        
-        # 简化版可视化展示
-        st.divider()
-        st.subheader("📊 核心发现速览")
-        
-        questions = get_questions()
-        
-        # 教学方向偏好
-        teaching_key = None
-        for q in questions:
-            if '教学' in q['text'] and '期待' in q['text'] and q['type'] == 'multi':
-                teaching_key = q['id']
-                break
-        
-        if teaching_key and teaching_key in df.columns:
-            st.write("**📚 教学方向偏好**")
-            option_counts = {}
-            for _, row in df.iterrows():
-                answer = row[teaching_key]
-                if isinstance(answer, list):
-                    for opt in answer:
-                        option_counts[opt] = option_counts.get(opt, 0) + 1
-                elif isinstance(answer, str) and answer:
-                    options = [opt.strip() for opt in answer.split(';') if opt.strip()]
-                    for opt in options:
-                        option_counts[opt] = option_counts.get(opt, 0) + 1
-            
-            if option_counts:
-                counts_series = pd.Series(option_counts).sort_values(ascending=False).head(5)
-                st.bar_chart(counts_series)
-        
-        # 论文方向偏好
-        paper_key = None
-        for q in questions:
-            if '论文' in q['text'] and '期待' in q['text'] and q['type'] == 'multi':
-                paper_key = q['id']
-                break
-        
-        if paper_key and paper_key in df.columns:
-            st.write("**📝 论文/写作方向偏好**")
-            option_counts = {}
-            for _, row in df.iterrows():
-                answer = row[paper_key]
-                if isinstance(answer, list):
-                    for opt in answer:
-                        option_counts[opt] = option_counts.get(opt, 0) + 1
-                elif isinstance(answer, str) and answer:
-                    options = [opt.strip() for opt in answer.split(';') if opt.strip()]
-                    for opt in options:
-                        option_counts[opt] = option_counts.get(opt, 0) + 1
-            
-            if option_counts:
-                counts_series = pd.Series(option_counts).sort_values(ascending=False).head(5)
-                st.bar_chart(counts_series)
-        
-        # 课题申报方向偏好
-        grant_key = None
-        for q in questions:
-            if '课题' in q['text'] and '期待' in q['text'] and q['type'] == 'multi':
-                grant_key = q['id']
-                break
-        
-        if grant_key and grant_key in df.columns:
-            st.write("**📋 课题申报方向偏好**")
-            option_counts = {}
-            for _, row in df.iterrows():
-                answer = row[grant_key]
-                if isinstance(answer, list):
-                    for opt in answer:
-                        option_counts[opt] = option_counts.get(opt, 0) + 1
-                elif isinstance(answer, str) and answer:
-                    options = [opt.strip() for opt in answer.split(';') if opt.strip()]
-                    for opt in options:
-                        option_counts[opt] = option_counts.get(opt, 0) + 1
-            
-            if option_counts:
-                counts_series = pd.Series(option_counts).sort_values(ascending=False).head(5)
-                st.bar_chart(counts_series)
-        
-        # 优先级决策
-        priority_key = None
-        for q in questions:
-            if '优先' in q['text'] and q['type'] == 'single':
-                priority_key = q['id']
-                break
-        
-        if priority_key and priority_key in df.columns:
-            st.write("**🎯 开发优先级决策**")
-            counts = df[priority_key].value_counts()
-            st.bar_chart(counts)
+        if report_tab.open:
+            with report_tab:
+                option_counts = load_option_counts()
+                
+                # 生成报告（数据未变化时直接使用缓存）
+                report_text = load_analysis_report()
+                
+                # 显示报告
+                st.subheader("📊 完整分析报告")
+                st.text_area("分析报告", report_text, height=600, disabled=False, key="report_display")
+                
+                # 下载报告
+                st.download_button(
+                    label="📥 下载分析报告（TXT）",
+                    data=report_text,
+                    file_name=f"survey_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+                    mime="text/plain"
+                )
+                
+                # 简化版可视化展示
+                st.divider()
+                st.subheader("📊 核心发现速览")
+                
+                highlights = get_survey()["highlights"]
+                
+                # 教学方向偏好
+                teaching_key = highlights["teaching"]
+                
+                if teaching_key and option_counts.get(teaching_key):
+                    st.write("**📚 教学方向偏好**")
+                    counts_series = pd.Series(option_counts[teaching_key]).head(5)
+                    with perf.timed("chart_render"):
+                        st.bar_chart(counts_series)
+                
+                # 论文方向偏好
+                paper_key = highlights["paper"]
+                
+                if paper_key and option_counts.get(paper_key):
+                    st.write("**📝 论文/写作方向偏好**")
+                    counts_series = pd.Series(option_counts[paper_key]).head(5)
+                    with perf.timed("chart_render"):
+                        st.bar_chart(counts_series)
+                
+                # 课题申报方向偏好
+                grant_key = highlights["grant"]
+                
+                if grant_key and option_counts.get(grant_key):
+                    st.write("**📋 课题申报方向偏好**")
+                    counts_series = pd.Series(option_counts[grant_key]).head(5)
+                    with perf.timed("chart_render"):
+                        st.bar_chart(counts_series)
+                
+                # 优先级决策
+                priority_key = highlights["priority"]
+                
+                if priority_key and option_counts.get(priority_key):
+                    st.write("**🎯 开发优先级决策**")
+                    counts = pd.Series(option_counts[priority_key])
+                    with perf.timed("chart_render"):
+                        st.bar_chart(counts)
+                
+        if crosstab_tab.open:
+            with crosstab_tab:
+                crosstab_panel()
+        if trend_tab.open:
+            with trend_tab:
+                time_trend_panel()
         
     except Exception as e:
         st.error(f"生成报告时出错: {str(e)}")
         st.info("如果数据库文件不存在，请先提交一份问卷")
 
+# 读取交叉分析用的答卷编码
+def load_encoded_responses():
+    """全部答卷逐题紧凑编码（按数据版本缓存），每次交叉查询都在内存中完成"""
+    return get_survey_cache().get_or_load(
+        ("encoded", DB_FILE, get_survey()["version"]),
+        get_backend().data_version(),
+        lambda: timed_load("encoded", lambda: analytics.encode_responses(
+            *storage.fetch_answer_groups(DB_FILE), get_questions()
+        )),
+        partition=DB_FILE
+    )
+
+# 交叉分析
+def crosstab_panel():
+    """任选两道题做交叉表（可按另一道题的选项筛选答卷），附卡方独立性检验"""
+    if get_backend().name != backends.BACKEND_SQLITE:
+        st.info("交叉分析目前只支持本地 SQLite 存储")
+        return
+    questions = get_questions()
+    by_id = {q['id']: q for q in questions}
+    question_ids = list(by_id)
+    
+    def question_label(question_id):
+        return by_id[question_id]['text']
+    
+    # 默认：第一道多选题 × 第一道单选题（按身份/习惯分组看需求）
+    default_row = next((i for i, q in enumerate(questions) if q['type'] == 'multi'), 0)
+    default_column = next((i for i, q in enumerate(questions) if q['type'] == 'single'), 0)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        row_question = st.selectbox("行：题目", question_ids, index=default_row,
+                                    format_func=question_label, key="crosstab_row")
+    with col2:
+        column_question = st.selectbox("列：分组题目", question_ids, index=default_column,
+                                       format_func=question_label, key="crosstab_column")
+    if row_question == column_question:
+        st.warning("请选择两道不同的题目")
+        return
+    
+    encoded = load_encoded_responses()
+    
+    # 按另一道题的选项筛选答卷
+    mask = None
+    col1, col2 = st.columns(2)
+    with col1:
+        filter_question = st.selectbox(
+            "筛选：题目", [None] + question_ids,
+            format_func=lambda q: "不筛选" if q is None else question_label(q),
+            key="crosstab_filter"
+        )
+    if filter_question is not None:
+        with col2:
+            filter_options = st.multiselect(
+                "只看选择了以下任一选项的答卷", encoded[filter_question][1], key="crosstab_filter_options"
+            )
+        if filter_options:
+            mask = analytics.filter_mask(encoded, filter_question, filter_options)
+    
+    mode = st.radio("显示", ["计数", "行百分比", "列百分比", "总体百分比"], horizontal=True, key="crosstab_mode")
+    
+    start = time.perf_counter()
+    with perf.timed("crosstab"):
+        table = analytics.crosstab(encoded, row_question, column_question, mask)
+        statistic, dof, p_value = analytics.chi_square(table)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    
+    sample_size = int(mask.sum()) if mask is not None else len(encoded[row_question][0])
+    st.caption(f"样本：{sample_size} 份答卷，计算耗时 {elapsed_ms:.1f} ms")
+    
+    if mode == "计数":
+        st.dataframe(table, use_container_width=True)
+    else:
+        percentage_mode = {"行百分比": "row", "列百分比": "column", "总体百分比": "total"}[mode]
+        st.dataframe(analytics.crosstab_percentages(table, percentage_mode).round(1), use_container_width=True)
+    
+    # 卡方检验
+    if dof == 0:
+        st.info("有效的行或列不足两个，无法做卡方检验")
+    else:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("χ²", f"{statistic:.2f}")
+        col2.metric("自由度", dof)
+        col3.metric("p 值", f"{p_value:.4f}")
+        if p_value < 0.05:
+            st.success("在 0.05 水平上显著：两道题的回答分布存在关联")
+        else:
+            st.info("在 0.05 水平上不显著：未发现两道题的回答分布存在关联")
+    if by_id[row_question]['type'] == 'multi' or by_id[column_question]['type'] == 'multi':
+        st.caption("多选题中一份答卷会计入多个单元格，卡方检验结果仅供参考")
+
+# 时间趋势
+def time_trend_panel():
+    """提交速度与答案分布随时间的变化（只查询时间汇总表，不扫描答卷）"""
+    if get_backend().name != backends.BACKEND_SQLITE:
+        st.info("时间趋势目前只支持本地 SQLite 存储")
+        return
+    now = datetime.now()
+    col1, col2, col3 = st.columns(3)
+    today = storage.fetch_submission_series(
+        DB_FILE, storage.ROLLUP_DAY, start=now.strftime("%Y-%m-%d"), end=now.strftime("%Y-%m-%d")
+    )
+    last_24h = storage.fetch_submission_series(
+        DB_FILE, storage.ROLLUP_HOUR, start=(now - timedelta(hours=23)).strftime("%Y-%m-%d %H:00")
+    )
+    daily = storage.fetch_submission_series(DB_FILE, storage.ROLLUP_DAY)
+    col1.metric("今日提交", int(today['count'].sum()))
+    col2.metric("最近24小时", int(last_24h['count'].sum()))
+    col3.metric("有提交的天数", len(daily))
+    if daily.empty:
+        st.info("暂无数据")
+        return
+    
+    # 提交速度
+    st.subheader("提交速度")
+    granularity = st.radio("粒度", ["按天", "按小时"], horizontal=True, key="trend_granularity")
+    if granularity == "按天":
+        series = daily
+        frequency = "D"
+    else:
+        series = storage.fetch_submission_series(DB_FILE, storage.ROLLUP_HOUR)
+        frequency = "h"
+    # 无法解析的提交时间（如导入的非标准格式）不参与作图；没有提交的时段补 0
+    buckets = pd.to_datetime(series['bucket'], errors='coerce')
+    counts = pd.Series(series['count'].to_numpy(), index=buckets)[buckets.notna().to_numpy()]
+    counts = counts.resample(frequency).sum()
+    with perf.timed("chart_render"):
+        st.bar_chart(counts)
+        st.caption("累计提交")
+        st.line_chart(counts.cumsum())
+    
+    # 答案分布随时间的变化
+    st.subheader("答案分布变化")
+    questions = get_questions()
+    by_id = {q['id']: q for q in questions}
+    question_id = st.selectbox("题目", list(by_id), format_func=lambda q: by_id[q]['text'], key="trend_question")
+    window = st.slider("平滑窗口（天）", 1, 14, 7, key="trend_window")
+    trend = storage.fetch_option_trend(DB_FILE, question_id)
+    if trend.empty:
+        st.info("该题暂无数据")
+        return
+    option_counts = trend.pivot_table(index='day', columns='option', values='count', aggfunc='sum', fill_value=0)
+    day_totals = daily.set_index('bucket')['count']
+    option_counts.index = pd.to_datetime(option_counts.index, errors='coerce')
+    day_totals.index = pd.to_datetime(day_totals.index, errors='coerce')
+    option_counts = option_counts[option_counts.index.notna()].resample("D").sum()
+    day_totals = day_totals[day_totals.index.notna()].resample("D").sum().reindex(option_counts.index, fill_value=0)
+    # 各选项占当天答卷数的百分比（多选题各项之和可超过 100%），按窗口滚动合计后再相除
+    shares = option_counts.rolling(window, min_periods=1).sum().div(
+        day_totals.rolling(window, min_periods=1).sum().replace(0, float("nan")), axis=0
+    ) * 100
+    with perf.timed("chart_render"):
+        st.line_chart(shares)
+    st.caption("纵轴为选择该选项的答卷占比（%），按平滑窗口内的合计计算")
+
+# 开启单次重跑采样
+def arm_profile():
+    st.session_state.profile_armed = True
+    st.session_state.pop("profile_result", None)
+
+def performance_panel():
+    """性能页面：热点路径计时与单次重跑采样（仅管理员）"""
+    st.title("⏱️ 性能")
+    
+    # 带着采样结果回到本页：结束录制
+    if st.session_state.get("profile_armed") and "profile_result" in st.session_state:
+        st.session_state.profile_armed = False
+    
+    # 密码保护
+    password = st.sidebar.text_input("请输入访问密码", type="password", key="perf_password")
+    
+    correct_password = "admin123"
+    if CONFIG and 'app_config' in CONFIG and 'password' in CONFIG['app_config']:
+        correct_password = CONFIG['app_config']['password']
+        
+    if password != correct_password:
+        st.warning("请输入正确的密码以查看性能数据")
+        return
+    
+    # 热点路径计时（本进程所有会话，最近的样本）
+    st.subheader("热点路径计时")
+    stats = perf.REGISTRY.stats()
+    if stats:
+        timing_df = pd.DataFrame([
+            {
+                '计时项': name,
+                '次数': item['count'],
+                '平均(ms)': round(item['wall_mean_ms'], 2),
+                'p50(ms)': round(item['wall_p50_ms'], 2),
+                'p95(ms)': round(item['wall_p95_ms'], 2),
+                'CPU平均(ms)': round(item['cpu_mean_ms'], 2),
+            }
+            for name, item in sorted(stats.items())
+        ])
+        st.dataframe(timing_df, use_container_width=True, hide_index=True)
+    else:
+        st.info("暂无计时数据")
+    st.button("清空计时", on_click=perf.REGISTRY.reset)
+    
+    cache_stats = get_data_cache().stats()
+    st.caption(
+        f"数据缓存：{cache_stats['entries']} 项，{cache_stats['bytes'] / 1024 / 1024:.1f} MB，"
+        f"命中 {cache_stats['hits']} 次，未命中 {cache_stats['misses']} 次；"
+        f"本问卷占用 {cache_stats['partitions'].get(DB_FILE, 0) / 1024 / 1024:.1f} MB"
+    )
+    budget_stats = storage.BUDGET.stats()
+    st.caption(
+        f"数据库连接：{budget_stats['used']} / {budget_stats['limit']}，"
+        f"{budget_stats['pools']} 个数据库"
+    )
+    worker = maintenance.get_maintenance(get_backend_settings(), get_backend())
+    if worker.last_run is None:
+        st.caption("已删除答卷清理：本进程尚未执行")
+    else:
+        purged, reclaimed = worker.last_result or (0, 0)
+        st.caption(
+            f"已删除答卷清理：上次 {datetime.fromtimestamp(worker.last_run).strftime('%Y-%m-%d %H:%M:%S')}，"
+            f"物理删除 {purged} 份，回收 {reclaimed} 页" + (f"；出错：{worker.error}" if worker.error else "")
+        )
+    
+    # 单次重跑采样
+    st.subheader("单次重跑采样（cProfile）")
+    if st.session_state.get("profile_armed"):
+        st.info("已开启：切换到要分析的页面并操作，回到本页时保留离开期间最后一次重跑的采样")
+    else:
+        st.button("录制下一次重跑", on_click=arm_profile)
+    
+    result = st.session_state.get("profile_result")
+    if result:
+        st.caption(f"采样页面：{result['page']}，时间：{result['time']}")
+        st.download_button(
+            label="📥 下载 .prof 文件",
+            data=result['data'],
+            file_name=f"rerun_{result['time'].replace(' ', '_').replace(':', '')}.prof",
+            mime="application/octet-stream"
+        )
+        st.code(result['summary'])
+
 # 主应用逻辑
 # 侧边栏导航
-page = st.sidebar.selectbox("选择页面", ["📝 填写问卷", "📊 查看数据", "📈 数据分析报告"])
+PERF_PAGE = "⏱️ 性能"
+page = st.sidebar.selectbox("选择页面", ["📝 填写问卷", "📊 查看数据", "📈 数据分析报告", PERF_PAGE])
 
-if page == "📝 填写问卷":
-    survey_interface()
-elif page == "📊 查看数据":
-    data_viewer()
-else:
-    analysis_report()
\ No newline at end of file
+try:
+    if page == "📝 填写问卷":
+        survey_interface()
+    elif page == "📊 查看数据":
+        data_viewer()
+    elif page == PERF_PAGE:
+        performance_panel()
+    else:
+        analysis_report()
+finally:
+    SCRIPT_TIMER.stop()
+    if PROFILER is not None:
+        profile_data, profile_summary = perf.finish_profile(PROFILER)
+        # 离开性能页期间每次重跑都覆盖结果，回到性能页时保留的是最后一次
+        if page != PERF_PAGE:
+            st.session_state.profile_result = {
+                "page": page,
+                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "data": profile_data,
+                "summary": profile_summary,
+            }
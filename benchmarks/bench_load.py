@@ -0,0 +1,193 @@
+"""并发作答压测：模拟大量受访者同时打开链接、逐题作答并提交
+
+用法：
+    python benchmarks/bench_load.py --users 300 --concurrency 16
+
+在临时目录中运行（DB_FILE 指向临时数据库，不影响本地数据）。每个受访者一个
+streamlit AppTest 会话，驱动 survey_interface 走完全部题目并提交。AppTest 依赖
+进程级的运行时状态，不能在同一进程的多个线程中同时运行，因此并发由进程池提供：
+每个工作进程依次服务多位受访者，进程之间经由同一个 SQLite 文件争用写锁。
+
+报告：
+- 各步骤（打开 / 选择 / 下一题 / 提交）耗时的 p50 / p95 / p99
+- 每秒成功提交数、错误率（异常、页面报错、库中行数与成功数不符）
+- 锁等待：探针线程周期性执行 BEGIN IMMEDIATE，记录获取写锁所等待的时间
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import storage  # noqa: E402
+
+APP = os.path.join(ROOT, "app.py")
+
+# 锁探针的采样间隔（秒）
+PROBE_INTERVAL = 0.05
+
+# 报告中的步骤顺序
+STEPS = ("打开", "选择", "下一题", "提交")
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def timed_step(latencies, name, action):
+    start = time.perf_counter()
+    at = action()
+    latencies.append((name, time.perf_counter() - start))
+    if at.exception:
+        raise RuntimeError(f"{name}：{at.exception[0].message}")
+    return at
+
+
+def click(at, label):
+    for button in at.button:
+        if button.label == label:
+            return button.click().run()
+    raise RuntimeError(f"未找到按钮：{label}")
+
+
+def init_worker(workdir):
+    """工作进程初始化：切换到临时目录，使 DB_FILE 与配置文件指向临时副本"""
+    logging.disable(logging.WARNING)
+    os.chdir(workdir)
+
+
+def respondent(questions, user):
+    """一个受访者：打开页面，逐题作答，最后提交；返回 (各步骤耗时, 错误信息)"""
+    latencies = []
+    try:
+        at = timed_step(latencies, "打开", lambda: AppTest.from_file(APP, default_timeout=120).run())
+        for i, q in enumerate(questions):
+            if q['type'] == 'single':
+                option = q['options'][(user + i) % len(q['options'])]
+                timed_step(latencies, "选择", lambda: at.radio[0].set_value(option).run())
+            else:
+                timed_step(latencies, "选择", lambda: at.checkbox[(user + i) % len(at.checkbox)].check().run())
+            label = "提交" if i == len(questions) - 1 else "下一题"
+            timed_step(latencies, label, lambda: click(at, label))
+        if at.error or not at.success:
+            raise RuntimeError(f"提交未成功：{[e.value for e in at.error]}")
+    except Exception as e:
+        return latencies, str(e)
+    return latencies, None
+
+
+class LockProbe(threading.Thread):
+    """周期性获取一次写锁（BEGIN IMMEDIATE）并立即释放，记录等待时间"""
+
+    def __init__(self, db_file):
+        super().__init__(name="lock-probe", daemon=True)
+        self.db_file = db_file
+        self.waits = []
+        self.timeouts = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        conn = storage.connect(self.db_file)
+        conn.isolation_level = None
+        try:
+            while not self._stop_event.wait(PROBE_INTERVAL):
+                start = time.perf_counter()
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                except sqlite3.OperationalError:
+                    self.timeouts += 1
+                    continue
+                self.waits.append(time.perf_counter() - start)
+                conn.execute("ROLLBACK")
+        finally:
+            conn.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=300, help="受访者总数")
+    parser.add_argument("--concurrency", type=int, default=16, help="同时作答的受访者数（工作进程数）")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with open(os.path.join(ROOT, "survey_config.json"), "r", encoding="utf-8") as f:
+        questions = json.load(f)["questions"]
+
+    workdir = tempfile.mkdtemp()
+    shutil.copy(os.path.join(ROOT, "survey_config.json"), workdir)
+    db_file = os.path.join(workdir, storage.DB_FILE)
+    try:
+        # 先建好表结构，探针与各进程面对同一个已初始化的数据库
+        conn = storage.connect(db_file)
+        storage.init_schema(conn)
+        conn.close()
+
+        latencies = {step: [] for step in STEPS}
+        errors = []
+        probe = LockProbe(db_file)
+        # AppTest 会把 app.py 注册为工作进程的 __main__，任务函数须按模块名引用
+        import bench_load
+        # spawn：不把探针线程等状态 fork 进工作进程
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=args.concurrency, mp_context=context,
+                                 initializer=bench_load.init_worker, initargs=(workdir,)) as pool:
+            # 进程启动与首次导入不计入结果
+            list(pool.map(bench_load.init_worker, [workdir] * args.concurrency))
+            probe.start()
+            start = time.perf_counter()
+            futures = [pool.submit(bench_load.respondent, questions, user) for user in range(args.users)]
+            for future in futures:
+                steps, error = future.result()
+                for name, seconds in steps:
+                    latencies[name].append(seconds)
+                if error:
+                    errors.append(error)
+            elapsed = time.perf_counter() - start
+        probe.stop()
+        submitted = args.users - len(errors)
+        stored = storage.fetch_response_count(db_file)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{args.users} 位受访者，并发 {args.concurrency}，{len(questions)} 道题，用时 {elapsed:.1f} 秒")
+    print(f"{'步骤':<6}{'次数':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for step in STEPS:
+        values = latencies[step]
+        print(f"{step:<6}{len(values):>8}"
+              f"{percentile(values, 0.50) * 1000:>10.1f}"
+              f"{percentile(values, 0.95) * 1000:>10.1f}"
+              f"{percentile(values, 0.99) * 1000:>10.1f}")
+    print(f"提交吞吐: {submitted / elapsed:.2f} 份/秒（成功 {submitted}，库中 {stored}）")
+    print(f"错误率:   {len(errors) / args.users:.1%}（{len(errors)} 位受访者）")
+    for message in sorted(set(errors))[:5]:
+        print(f"  - {message}")
+    if probe.waits:
+        print(f"锁等待:   {len(probe.waits)} 次探测，p50 {percentile(probe.waits, 0.50) * 1000:.2f} ms，"
+              f"p99 {percentile(probe.waits, 0.99) * 1000:.2f} ms，"
+              f"最大 {max(probe.waits) * 1000:.2f} ms，超时 {probe.timeouts} 次")
+    if stored != submitted:
+        print("警告：库中答卷数与成功提交数不一致")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""答卷内存占用对比：对象型 DataFrame、逐格布尔矩阵与紧凑表示（compact.CompactQuestion）
+
+用法：
+    python benchmarks/bench_memory.py                  # 默认 10 万份答卷
+    python benchmarks/bench_memory.py --size 300000
+
+按 survey_config.json 随机生成答卷写入临时 SQLite，然后分别统计：
+- DataFrame：整表读出为对象型 DataFrame（fetch_responses_frame），deep memory_usage；
+- 布尔矩阵：交叉分析原先缓存的 (答卷 × 选项) 布尔矩阵，nbytes；
+- 紧凑表示：交叉分析现在缓存的逐题编码（analytics.encode_responses），nbytes。
+最后校验紧凑表示还原后与 DataFrame 一致（多选题按选项集合比较），内存按每 10 万份答卷折算。
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analytics  # noqa: E402
+import storage  # noqa: E402
+from bench_suite import load_questions, seed_database  # noqa: E402
+
+PER = 100000
+
+
+def same_content(frame, encoded, questions):
+    """紧凑表示逐题还原后与 DataFrame 比较；多选题的选项顺序不计"""
+    frame = frame.sort_values("id")
+    for q in questions:
+        restored = encoded[q['id']][0].values()
+        stored = frame[q['id']].tolist()
+        if q['type'] == 'multi':
+            restored = [sorted(value) for value in restored]
+            stored = [sorted(value) for value in stored]
+        if restored != stored:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=PER, help="答卷数")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    questions = load_questions()
+    workdir = tempfile.mkdtemp()
+    db_file = os.path.join(workdir, "bench_memory.db")
+    try:
+        seed_database(db_file, questions, args.size)
+        start = time.perf_counter()
+        frame = storage.fetch_responses_frame(db_file, questions)
+        frame_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        encoded = analytics.encode_responses(*storage.fetch_answer_groups(db_file), questions)
+        compact_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        matrices = [compact_question.columns() for compact_question, _ in encoded.values()]
+        matrix_seconds = time.perf_counter() - start
+
+        frame_bytes = int(frame.memory_usage(index=True, deep=True).sum())
+        matrix_bytes = sum(matrix.nbytes for matrix in matrices)
+        compact_bytes = sum(compact_question.nbytes for compact_question, _ in encoded.values())
+        lossless = same_content(frame, encoded, questions)
+        storage.get_pool(db_file).close_all()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    scale = PER / args.size
+    print(f"{args.size} 份答卷，{len(questions)} 道题；内存按每 {PER // 10000} 万份折算")
+    print(f"{'表示':<12}{'常驻(MB)':>12}{'构建(s)':>10}")
+    print(f"{'DataFrame':<12}{frame_bytes * scale / 1e6:>12.1f}{frame_seconds:>10.2f}")
+    print(f"{'布尔矩阵':<12}{matrix_bytes * scale / 1e6:>12.1f}{'':>10}")
+    print(f"{'紧凑表示':<12}{compact_bytes * scale / 1e6:>12.1f}{compact_seconds:>10.2f}")
+    print(f"比 DataFrame 小 {frame_bytes / compact_bytes:.0f}x，比布尔矩阵小 {matrix_bytes / compact_bytes:.1f}x；"
+          f"全部题目展开为布尔矩阵 {matrix_seconds * 1000:.0f} ms")
+    print(f"无损还原: {'是' if lossless else '否'}")
+    if not lossless:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""作答页重跑开销基准：整页重跑 vs 作答片段（st.fragment）局部重跑
+
+用法：
+    python benchmarks/bench_rerun.py --rounds 5
+
+在临时目录中用 streamlit AppTest 反复“选择选项 → 下一题 → 上一题”，
+读取 perf 计时表中 script_run（整个脚本）与 question_fragment（作答片段）的耗时。
+AppTest 每次交互都会跑完整个脚本，因此片段耗时即浏览器中局部重跑时服务端的实际开销；
+旧版每次翻页还要 st.rerun() 再跑一遍整页，按 2 次整页重跑估算。
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import perf  # noqa: E402
+
+APP = os.path.join(ROOT, "app.py")
+
+
+def click(at, label):
+    for button in at.button:
+        if button.label == label:
+            return button.click().run()
+    raise RuntimeError(f"未找到按钮：{label}")
+
+
+def run_rounds(rounds):
+    with open(os.path.join(ROOT, "survey_config.json"), "r", encoding="utf-8") as f:
+        questions = json.load(f)["questions"]
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    clicks = 0
+    for _ in range(rounds):
+        for q in questions[:-1]:
+            if q['type'] == 'single':
+                at.radio[0].set_value(q['options'][0]).run()
+            else:
+                at.checkbox[0].check().run()
+            click(at, "下一题")
+            clicks += 2
+        for _ in questions[:-1]:
+            click(at, "上一题")
+            clicks += 1
+        if at.exception:
+            raise RuntimeError(at.exception)
+    return clicks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5, help="从第一题翻到最后一题再翻回的轮数")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    workdir = tempfile.mkdtemp()
+    shutil.copy(os.path.join(ROOT, "survey_config.json"), workdir)
+    os.chdir(workdir)
+    try:
+        # 预热：建库、编译配置、启动后台线程
+        run_rounds(1)
+        perf.REGISTRY.reset()
+        clicks = run_rounds(args.rounds)
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    stats = perf.REGISTRY.stats()
+    script = stats["script_run"]
+    fragment = stats["question_fragment"]
+    print(f"{clicks} 次交互（每轮：逐题选择 + 下一题，再逐题上一题）")
+    print(f"整页重跑 script_run:         平均 {script['wall_mean_ms']:7.2f} ms  p95 {script['wall_p95_ms']:7.2f} ms")
+    print(f"作答片段 question_fragment:  平均 {fragment['wall_mean_ms']:7.2f} ms  p95 {fragment['wall_p95_ms']:7.2f} ms")
+    navigation = 2 * script['wall_mean_ms']
+    print(f"每次选择：旧版 {script['wall_mean_ms']:7.2f} ms → 片段 {fragment['wall_mean_ms']:7.2f} ms")
+    print(f"每次翻页：旧版 {navigation:7.2f} ms（整页 + st.rerun）→ 片段 {fragment['wall_mean_ms']:7.2f} ms"
+          f"  （减少 {1 - fragment['wall_mean_ms'] / navigation:.0%}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""存储层并发写入基准：模拟 N 个 Streamlit 会话同时提交问卷
+
+用法：
+    python benchmarks/bench_storage.py --sessions 16 --seconds 5
+
+每个会话一个线程（与 Streamlit 每会话一个脚本线程一致），循环调用
+storage.insert_response；同时对比旧实现（每次 sqlite3.connect + 回滚日志模式）
+以及后台批量写入队列（writer.SubmissionWriter，确认时已 fsync）。
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+import writer  # noqa: E402
+
+SAMPLE_ANSWERS = {
+    "role_focus": "教学任务为主",
+    "ai_freq": "经常使用",
+    "teaching_pain": ["PPT课件制作/美化", "批改作业/实验报告"],
+    "teaching_wish": ["一键生成精美PPT课件", "自动出题与智能组卷"],
+    "submit_time": "2026-01-01 00:00:00",
+}
+
+
+def legacy_insert(db_file, answers, submit_time):
+    """旧实现：每次调用单独建连接"""
+    import json
+    conn = sqlite3.connect(db_file)
+    c = conn.cursor()
+    c.execute('''INSERT INTO survey_responses (submit_time, answers)
+                 VALUES (?, ?)''', (submit_time, json.dumps(answers, ensure_ascii=False)))
+    conn.commit()
+    conn.close()
+
+
+def run(insert, db_file, sessions, seconds):
+    stop = time.perf_counter() + seconds
+    counts = [0] * sessions
+    errors = [0] * sessions
+
+    def worker(i):
+        while time.perf_counter() < stop:
+            try:
+                insert(db_file, SAMPLE_ANSWERS, SAMPLE_ANSWERS["submit_time"])
+                counts[i] += 1
+            except sqlite3.OperationalError:
+                errors[i] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return sum(counts) / elapsed, sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=16, help="并发会话数")
+    parser.add_argument("--seconds", type=float, default=5.0, help="每轮持续时间")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = os.path.join(tmp, "legacy.db")
+        conn = sqlite3.connect(legacy_db)
+        conn.execute(storage.SQL_CREATE_RESPONSES)
+        conn.close()
+        rate, errors = run(legacy_insert, legacy_db, args.sessions, args.seconds)
+        print(f"旧实现（逐次连接/回滚日志）: {rate:8.1f} 条/秒  锁错误 {errors}")
+
+        pooled_db = os.path.join(tmp, "pooled.db")
+        rate, errors = run(storage.insert_response, pooled_db, args.sessions, args.seconds)
+        print(f"连接池（WAL）:              {rate:8.1f} 条/秒  锁错误 {errors}")
+        storage.get_pool(pooled_db).close_all()
+
+        queued_db = os.path.join(tmp, "queued.db")
+        queued = writer.SubmissionWriter(queued_db)
+
+        def queued_insert(db_file, answers, submit_time):
+            queued.submit(answers, submit_time).result(timeout=writer.SUBMIT_TIMEOUT)
+
+        rate, errors = run(queued_insert, queued_db, args.sessions, args.seconds)
+        queued.close()
+        print(f"后台批量写入（FULL 同步）:  {rate:8.1f} 条/秒  锁错误 {errors}")
+
+
+if __name__ == "__main__":
+    main()
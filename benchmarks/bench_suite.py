@@ -0,0 +1,255 @@
+"""热点路径微基准：存储读写、报告数据与交叉分析，按规模对比已保存的基线
+
+用法：
+    python benchmarks/bench_suite.py                      # 默认 1k / 10k / 100k
+    python benchmarks/bench_suite.py --sizes 1000000      # 100 万份答卷（生成较慢）
+    python benchmarks/bench_suite.py --check              # 与基线比较，退步即退出码 1
+    python benchmarks/bench_suite.py --save               # 把本次结果写入基线
+    SURVEY_BENCHMARK=1 python -m pytest -q tests/test_benchmarks.py   # 1k 规模，在 pytest / CI 中检查退步
+
+按 survey_config.json 随机生成答卷，写入临时 SQLite 后逐项计时。每项先预热一次，
+再重复 --repeat 次取中位数；同时记录本次各次耗时的离散程度（中位数绝对偏差），
+超过基线的幅度同时大于比例容差与本次抖动时才算退步。
+
+- save：BATCH 份答卷由 SAVE_CONCURRENCY 个线程并发经存储后端提交（save_to_database 的路径：
+  SQLiteBackend.save -> 后台写入队列 -> 等待落盘确认）
+- load：整表读出为 DataFrame（SQLiteBackend.fetch_frame）
+- delete：按 id 软删除一批答卷并回退聚合计数（delete_from_database 的路径，SQLiteBackend.delete）
+- report：读取聚合计数与答卷总数并生成完整文本报告（generate_analysis_report 的路径，report.build_report；
+  每次计时前清空逐题文本块的记忆化缓存，计的是完整生成而不是缓存命中）
+- encode：按 (题目, 选项) 分组读取答卷 id 并逐题紧凑编码（交叉分析的缓存内容，见 compact.py）
+- crosstab：在编码结果上计算全部题目两两交叉表与卡方检验（每对的平均耗时）
+
+基线与机器相关，更换环境后应先 --save 重新生成。
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analytics  # noqa: E402
+import backends  # noqa: E402
+import config  # noqa: E402
+import report  # noqa: E402
+import storage  # noqa: E402
+import writer  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+# 默认重复次数（取中位数）
+DEFAULT_REPEAT = 7
+
+# 超过基线的比例达到该值视为退步：同一台机器前后两次运行整体可相差 50% 以上，
+# 只拦截成倍的退步（复杂度变化、缓存失效、绕过批量写入等）
+DEFAULT_TOLERANCE = 1.0
+
+# 绝对差值低于该值（秒）时不算退步，避免毫秒级项目被计时抖动误报
+NOISE_FLOOR = 0.01
+
+# 超出基线的部分还须大于本次中位数绝对偏差的这么多倍，才不归为计时抖动
+NOISE_SPREADS = 3
+
+# 每次 save / delete 处理的答卷数
+BATCH = 200
+
+# save 并发提交的线程数（模拟同时提交的多个会话）
+SAVE_CONCURRENCY = 16
+
+# 生成数据时每个事务写入的答卷数
+SEED_CHUNK = 5000
+
+
+def load_questions():
+    with open(os.path.join(ROOT, "survey_config.json"), "r", encoding="utf-8") as f:
+        return json.load(f)["questions"]
+
+
+def generate_answers(questions, rng):
+    answers = {}
+    for q in questions:
+        if q['type'] == 'single':
+            answers[q['id']] = rng.choice(q['options'])
+        else:
+            answers[q['id']] = rng.sample(q['options'], rng.randint(0, min(3, len(q['options']))))
+    answers['submit_time'] = f"2026-01-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00"
+    return answers
+
+
+def seed_database(db_file, questions, size, seed=0):
+    """生成 size 份答卷，分事务写入"""
+    rng = random.Random(seed)
+    conn = storage.connect(db_file)
+    storage.init_schema(conn)
+    for start in range(0, size, SEED_CHUNK):
+        with conn:
+            for _ in range(min(SEED_CHUNK, size - start)):
+                answers = generate_answers(questions, rng)
+                storage.write_response(conn, answers, answers['submit_time'])
+    conn.close()
+
+
+class Timing:
+    """一项的计时结果：中位数与中位数绝对偏差（秒）"""
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.median = statistics.median(samples)
+        self.spread = statistics.median(abs(sample - self.median) for sample in samples)
+
+    def scaled(self, factor):
+        return Timing([sample * factor for sample in self.samples])
+
+
+def median_of(repeat, func, setup=None):
+    """预热一次后重复 repeat 次，返回 Timing；setup 的耗时不计入"""
+    samples = []
+    for i in range(repeat + 1):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        func(state)
+        if i:
+            samples.append(time.perf_counter() - start)
+    return Timing(samples)
+
+
+def bench_size(questions, size, repeat, workdir):
+    """返回 {"项目@规模": Timing}"""
+    db_file = os.path.join(workdir, f"bench_{size}.db")
+    seed_database(db_file, questions, size)
+    rng = random.Random(size)
+    results = {}
+    backend = backends.open_backend(*backends.backend_settings({}, db_file))
+
+    def new_answers():
+        return [generate_answers(questions, rng) for _ in range(BATCH)]
+
+    def save(answer_list):
+        with ThreadPoolExecutor(SAVE_CONCURRENCY) as pool:
+            list(pool.map(lambda answers: backend.save(answers, answers['submit_time']), answer_list))
+
+    results["save"] = median_of(repeat, save, setup=new_answers)
+    writer.get_writer(db_file).close()
+
+    def load(_):
+        backend.fetch_frame(questions)
+
+    results["load"] = median_of(repeat, load)
+
+    def oldest_ids():
+        return backend.fetch_ids()[:BATCH]
+
+    def delete(record_ids):
+        backend.delete(record_ids)
+
+    results["delete"] = median_of(repeat, delete, setup=oldest_ids)
+
+    survey = config.read_config(os.path.join(ROOT, config.CONFIG_FILE))
+
+    def build_report(_):
+        report.build_report(survey, backend.option_counts(), backend.response_count())
+
+    results["report"] = median_of(repeat, build_report, setup=report.render_question.cache_clear)
+
+    def encode(_):
+        return analytics.encode_responses(*storage.fetch_answer_groups(db_file), questions)
+
+    results["encode"] = median_of(repeat, encode)
+
+    encoded = encode(None)
+    pairs = [(a['id'], b['id']) for a in questions for b in questions if a['id'] != b['id']]
+
+    def crosstab(_):
+        for row_question, column_question in pairs:
+            analytics.chi_square(analytics.crosstab(encoded, row_question, column_question))
+
+    results["crosstab"] = median_of(repeat, crosstab).scaled(1 / len(pairs))
+
+    storage.get_pool(db_file).close_all()
+    return {f"{name}@{size}": timing for name, timing in results.items()}
+
+
+def run(sizes, repeat=DEFAULT_REPEAT):
+    """在临时目录中按各规模生成数据并计时，返回 {"项目@规模": Timing}"""
+    questions = load_questions()
+    workdir = tempfile.mkdtemp()
+    results = {}
+    try:
+        for size in sizes:
+            results.update(bench_size(questions, size, repeat, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_regression(timing, base, tolerance):
+    """超过基线的部分同时大于比例容差、绝对噪声下限与本次抖动时才算退步"""
+    excess = timing.median - base
+    return excess > max(base * tolerance, NOISE_FLOOR, NOISE_SPREADS * timing.spread)
+
+
+def compare(results, baseline, tolerance):
+    """打印对比表，返回退步的项目"""
+    regressions = []
+    print(f"{'项目':<16}{'本次(ms)':>12}{'抖动(ms)':>10}{'基线(ms)':>12}{'变化':>10}")
+    for name, timing in results.items():
+        current = f"{name:<16}{timing.median * 1000:>12.2f}{timing.spread * 1000:>10.2f}"
+        base = baseline.get(name)
+        if base is None:
+            print(f"{current}{'-':>12}{'-':>10}")
+            continue
+        flag = ""
+        if is_regression(timing, base, tolerance):
+            regressions.append(name)
+            flag = "  ← 退步"
+        print(f"{current}{base * 1000:>12.2f}{timing.median / base - 1:>+10.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="答卷规模")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="每项重复次数（取中位数）")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="允许超过基线的比例，默认 1.0 即慢一倍")
+    parser.add_argument("--check", action="store_true", help="有退步时以退出码 1 结束")
+    parser.add_argument("--save", action="store_true", help="把本次结果合并写入基线文件")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    results = run(args.sizes, args.repeat)
+    baseline = load_baseline()
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save:
+        baseline.update({name: timing.median for name, timing in results.items()})
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(baseline.items())), f, indent=2)
+            f.write("\n")
+        print(f"基线已写入 {BASELINE_FILE}")
+    if regressions:
+        print(f"退步（超过基线 {args.tolerance:.0%}）：{', '.join(regressions)}")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""按数据版本失效的内存缓存：版本号变化即失效，另有 TTL 与内存上限兜底
+
+托管多份问卷时所有问卷共享一个缓存，条目按问卷分区（partition），
+各分区可单独设置内存上限，超出时只淘汰本分区最久未用的条目。
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# 默认缓存有效期（秒）：即使版本号未变，超过该时间也重新读取
+DEFAULT_TTL = 300
+
+# 默认内存上限（MB）
+DEFAULT_MAX_MB = 64
+
+# 多问卷共享缓存的默认总内存上限（MB）
+DEFAULT_TOTAL_MB = 256
+
+
+def estimate_size(value):
+    """估算缓存值占用的字节数"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(getattr(value, "nbytes", None), int):
+        # 自带内存统计的对象（如 compact.CompactQuestion）
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class VersionedCache:
+    """键值缓存：命中要求版本号一致且未过期，超出内存上限时按 LRU 淘汰"""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._partition_bytes = {}
+        self._partition_limits = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def set_partition_limit(self, partition, max_bytes):
+        """设置分区的内存上限（字节），超出部分立即淘汰"""
+        with self._lock:
+            self._partition_limits[partition] = max_bytes
+            self._evict(partition)
+
+    def get_or_load(self, key, version, loader, partition=None):
+        """命中则返回缓存值，否则调用 loader() 读取并缓存到 partition 分区
+
+        缓存值被多个会话共享，调用方不能就地修改返回的对象。
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                cached_version, expires, value = entry[:3]
+                if cached_version == version and now < expires:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+        value = loader()
+        self.put(key, version, value, partition)
+        return value
+
+    def put(self, key, version, value, partition=None):
+        size = estimate_size(value)
+        with self._lock:
+            self._remove(key)
+            if size > min(self.max_bytes, self._partition_limits.get(partition, self.max_bytes)):
+                return
+            self._entries[key] = (version, time.monotonic() + self.ttl, value, size, partition)
+            self._bytes += size
+            self._partition_bytes[partition] = self._partition_bytes.get(partition, 0) + size
+            self._evict(partition)
+
+    def _evict(self, partition):
+        """先把分区压回其上限，再把总量压回 max_bytes（均按 LRU）"""
+        limit = self._partition_limits.get(partition)
+        if limit is not None and self._partition_bytes.get(partition, 0) > limit:
+            for key in [k for k, entry in self._entries.items() if entry[4] == partition]:
+                if self._partition_bytes[partition] <= limit:
+                    break
+                self._remove(key)
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[3]
+            self._partition_bytes[entry[4]] -= entry[3]
+
+    def invalidate(self, key=None, partition=None):
+        """清除指定键或指定分区；都不传则清空全部"""
+        with self._lock:
+            if key is not None:
+                self._remove(key)
+            elif partition is not None:
+                for k in [k for k, entry in self._entries.items() if entry[4] == partition]:
+                    self._remove(k)
+            else:
+                self._entries.clear()
+                self._bytes = 0
+                self._partition_bytes.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "partitions": {p: b for p, b in self._partition_bytes.items() if b},
+            }
@@ -0,0 +1,110 @@
+"""答卷的紧凑内存表示：单选题存分类编码，多选题存按位压缩的位图，可无损还原为选项文本
+
+交叉分析缓存的是全部答卷，按 (答卷 × 选项) 布尔矩阵保存时每个单元格占一个字节。这里逐题改为：
+
+- 单选题：一个整数编码数组，编码即题目配置中的选项序号，-1 为未作答；
+- 多选题：一个 (答卷数 × ⌈(选项数 + 1) / 8⌉) 的 uint8 位图（np.packbits），位序即配置的选项顺序；
+- 配置外的取值（“其它”填写内容）：单选题编码为选项数、多选题置最后一位，原文按答卷稀疏保存。
+
+需要时再按题展开为布尔矩阵（columns / column）或还原为选项文本（values）。
+还原的多选答案按配置的选项顺序排列，配置外的取值在后。
+"""
+import sys
+
+import numpy as np
+
+
+def _code_dtype(count):
+    """能容纳 0..count 及 -1 的最小整数类型"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if count <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def locate(response_ids, ids):
+    """答卷 id -> 行号；不在 response_ids（升序）中的 id 被丢弃"""
+    rows = np.searchsorted(response_ids, ids)
+    found = rows < len(response_ids)
+    found[found] = response_ids[rows[found]] == ids[found]
+    return rows[found]
+
+
+class CompactQuestion:
+    """一道题全部答卷的紧凑编码，用 from_groups 构造"""
+
+    def __init__(self, options, multi, size):
+        self.options = tuple(options)
+        self.multi = multi
+        self.size = size
+        # 配置外取值所在的行与原文（行号升序）
+        self.other_rows = np.empty(0, dtype=np.int64)
+        self.other_values = np.empty(0, dtype=object)
+        if multi:
+            self.bits = np.zeros((size, (len(self.options) + 8) // 8), dtype=np.uint8)
+        else:
+            self.codes = np.full(size, -1, dtype=_code_dtype(len(self.options)))
+
+    @classmethod
+    def from_groups(cls, question, response_ids, groups):
+        """groups 为该题的 [(选项, 选择了该选项的答卷 id 数组), ...]，response_ids 为全部答卷 id 升序数组"""
+        compact = cls(question.get('options', ()), question['type'] == 'multi', len(response_ids))
+        index = {option: i for i, option in enumerate(compact.options)}
+        other_rows, other_values = [], []
+        for option, ids in groups:
+            rows = locate(response_ids, ids)
+            column = index.get(option)
+            if column is None:
+                column = len(compact.options)
+                other_rows.append(rows)
+                other_values.append(np.full(len(rows), option, dtype=object))
+            if compact.multi:
+                compact.bits[rows, column // 8] |= np.uint8(0x80 >> (column % 8))
+            else:
+                compact.codes[rows] = column
+        if other_rows:
+            rows = np.concatenate(other_rows)
+            order = np.argsort(rows, kind="stable")
+            compact.other_rows = rows[order]
+            compact.other_values = np.concatenate(other_values)[order]
+        return compact
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def has_other(self):
+        return len(self.other_rows) > 0
+
+    @property
+    def nbytes(self):
+        values = sum(sys.getsizeof(value) for value in set(self.other_values))
+        encoded = self.bits if self.multi else self.codes
+        return int(encoded.nbytes + self.other_rows.nbytes + self.other_values.nbytes + values)
+
+    def column(self, index):
+        """第 index 个选项（index 为选项数时即配置外取值）的布尔向量"""
+        if self.multi:
+            return (self.bits[:, index // 8] & np.uint8(0x80 >> (index % 8))) != 0
+        return self.codes == index
+
+    def columns(self):
+        """(选项 × 答卷) 布尔矩阵，每行是一个选项的 column；有配置外取值时末尾多一行"""
+        matrix = np.empty((len(self.options) + self.has_other, self.size), dtype=bool)
+        for index in range(len(matrix)):
+            matrix[index] = self.column(index)
+        return matrix
+
+    def values(self):
+        """还原为每份答卷的答案：单选为选项文本（未作答为 None），多选为选项列表"""
+        if not self.multi:
+            table = np.array(self.options + (None, None), dtype=object)
+            values = table[self.codes]
+            values[self.other_rows] = self.other_values
+            return values.tolist()
+        rows, columns = np.nonzero(np.unpackbits(self.bits, axis=1, count=len(self.options)))
+        bounds = np.searchsorted(rows, np.arange(self.size + 1))
+        values = [[self.options[j] for j in columns[start:end]] for start, end in zip(bounds[:-1], bounds[1:])]
+        for row, value in zip(self.other_rows.tolist(), self.other_values):
+            values[row].append(value)
+        return values
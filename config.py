@@ -0,0 +1,241 @@
+"""问卷配置编译与热更新：校验 survey_config.json、预先建立题目索引，文件变化时原子切换版本"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+
+import perf
+
+# 默认配置文件路径
+CONFIG_FILE = "survey_config.json"
+
+# 支持的题型
+QUESTION_TYPES = ("single", "multi")
+
+# 题目文本中用于分类/挑选图表的关键词
+TAG_KEYWORDS = ("教学", "论文", "写作", "课题", "申报", "期待", "优先", "关键")
+
+# 报告中的分类顺序
+CATEGORIES = ("teaching", "paper", "grant", "other")
+
+# 配置文件检查间隔（秒）
+WATCH_INTERVAL = 2
+
+# 内存中保留的历史版本数：仍在作答的用户继续使用开始时的版本，更早的版本从存档（load_version）重新编译
+MAX_VERSIONS = 16
+
+# 题目文本开头的栏目标记，如 "3. [教学] ..."
+SECTION_PATTERN = re.compile(r"\[(.+?)\]")
+
+
+class ConfigError(ValueError):
+    """配置文件格式或内容不合法"""
+
+
+def _question_category(text):
+    """与分析报告一致的分类规则：教学 > 论文/写作 > 课题/申报 > 其他"""
+    text = text.lower()
+    if '教学' in text:
+        return "teaching"
+    if '论文' in text or '写作' in text:
+        return "paper"
+    if '课题' in text or '申报' in text:
+        return "grant"
+    return "other"
+
+
+def compile_question(raw, number):
+    """校验一道题并生成只读结构，附带选项索引、选项集合与分类标签"""
+    where = f"第 {number} 题"
+    if not isinstance(raw, dict):
+        raise ConfigError(f"{where}：应为对象，实际为 {type(raw).__name__}")
+    question_id = raw.get("id")
+    if not isinstance(question_id, str) or not question_id.strip():
+        raise ConfigError(f"{where}：缺少 id 或 id 不是非空字符串")
+    where = f"{where}（{question_id}）"
+    text = raw.get("text")
+    if not isinstance(text, str) or not text.strip():
+        raise ConfigError(f"{where}：缺少 text 或 text 不是非空字符串")
+    question_type = raw.get("type")
+    if question_type not in QUESTION_TYPES:
+        raise ConfigError(f"{where}：type 必须是 {' 或 '.join(QUESTION_TYPES)}，实际为 {question_type!r}")
+    options = raw.get("options")
+    if not isinstance(options, list) or not options:
+        raise ConfigError(f"{where}：options 必须是非空数组")
+    for option in options:
+        if not isinstance(option, str) or not option:
+            raise ConfigError(f"{where}：选项必须是非空字符串，实际为 {option!r}")
+    duplicates = sorted({option for option in options if options.count(option) > 1})
+    if duplicates:
+        raise ConfigError(f"{where}：选项重复：{'、'.join(duplicates)}")
+
+    section = SECTION_PATTERN.search(text)
+    tags = frozenset(keyword for keyword in TAG_KEYWORDS if keyword in text)
+    return MappingProxyType({
+        **raw,
+        "options": tuple(options),
+        "option_index": MappingProxyType({option: i for i, option in enumerate(options)}),
+        "option_set": frozenset(options),
+        "section": section.group(1) if section else None,
+        "category": _question_category(text),
+        "tags": tags,
+        "is_decision": "优先" in tags or "关键" in tags,
+    })
+
+
+def _first_question(questions, *tags, question_type=None):
+    """第一道同时包含所有关键词（且题型匹配）的题目 id"""
+    for q in questions:
+        if all(tag in q["tags"] for tag in tags) and (question_type is None or q["type"] == question_type):
+            return q["id"]
+    return None
+
+
+def compile_config(raw, version=None):
+    """校验整份配置并编译为只读结构
+
+    未提供 questions 时题目元组为空，由调用方决定回退题目。
+    返回的映射包含 app_config、questions（题目元组）、by_id（id -> 题目）、
+    categories（分类 -> 题目元组）、decision_questions、highlights（速览图表用的题目 id）
+    以及 version（配置内容摘要）和 questions_json（题目原文，用于随答卷存档）。
+    """
+    if not isinstance(raw, dict):
+        raise ConfigError("配置文件顶层应为对象")
+    app_config = raw.get("app_config", {})
+    if not isinstance(app_config, dict):
+        raise ConfigError("app_config 应为对象")
+    raw_questions = raw.get("questions", [])
+    if not isinstance(raw_questions, list) or ("questions" in raw and not raw_questions):
+        raise ConfigError("questions 必须是非空数组")
+
+    questions = tuple(compile_question(q, i) for i, q in enumerate(raw_questions, start=1))
+    by_id = {}
+    for q in questions:
+        if q["id"] in by_id:
+            raise ConfigError(f"题目 id 重复：{q['id']}")
+        by_id[q["id"]] = q
+
+    if version is None:
+        payload = json.dumps(raw, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        version = hashlib.sha1(payload).hexdigest()[:12]
+    return MappingProxyType({
+        "app_config": MappingProxyType(dict(app_config)),
+        "questions": questions,
+        "by_id": MappingProxyType(by_id),
+        "categories": MappingProxyType({
+            category: tuple(q for q in questions if q["category"] == category)
+            for category in CATEGORIES
+        }),
+        "decision_questions": tuple(q for q in questions if q["is_decision"]),
+        "highlights": MappingProxyType({
+            "teaching": _first_question(questions, "教学", "期待", question_type="multi"),
+            "paper": _first_question(questions, "论文", "期待", question_type="multi"),
+            "grant": _first_question(questions, "课题", "期待", question_type="multi"),
+            "priority": _first_question(questions, "优先", question_type="single"),
+        }),
+        "version": version,
+        "questions_json": json.dumps(raw_questions, ensure_ascii=False),
+    })
+
+
+def read_config(path=CONFIG_FILE):
+    """读取并编译配置文件；内容不合法时抛出 ConfigError"""
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            with perf.timed("json_decode"):
+                raw = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ConfigError(f"{path} 不是合法的 JSON：第 {e.lineno} 行第 {e.colno} 列，{e.msg}") from e
+    return compile_config(raw)
+
+
+class ConfigWatcher:
+    """监视配置文件：修改时间变化后重新编译，校验通过才原子切换为当前版本
+
+    校验失败时保留上一个可用版本并记录 error；历史版本按 version 保留，
+    供开始作答时锁定了旧版本的会话继续使用。内存中没有的版本（进程重启或已淘汰）
+    通过 load_version(version) 取回存档的题目 JSON 重新编译。
+    """
+
+    def __init__(self, path=CONFIG_FILE, interval=WATCH_INTERVAL, on_change=None, load_version=None):
+        self.path = path
+        self.interval = interval
+        self.on_change = on_change
+        self.load_version = load_version
+        self.current = None
+        self.error = None
+        self._mtime_ns = None
+        self._versions = OrderedDict()
+        self._lock = threading.Lock()
+        self.check()
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+
+    def check(self):
+        """检查一次文件，切换了版本时返回 True"""
+        with self._lock:
+            try:
+                mtime_ns = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                mtime_ns = None
+            if mtime_ns == self._mtime_ns:
+                return False
+            self._mtime_ns = mtime_ns
+            if mtime_ns is None:
+                # 文件被删除：继续使用上一个版本
+                if self.current is not None:
+                    self.error = f"{self.path} 不存在，继续使用版本 {self.current['version']}"
+                return False
+            try:
+                compiled = read_config(self.path)
+            except (ConfigError, OSError) as e:
+                self.error = str(e)
+                return False
+            self.error = None
+            if self.current is not None and compiled["version"] == self.current["version"]:
+                return False
+            self._remember(compiled)
+            self.current = compiled
+        if self.on_change is not None:
+            self.on_change(compiled)
+        return True
+
+    def _remember(self, compiled):
+        self._versions[compiled["version"]] = compiled
+        self._versions.move_to_end(compiled["version"])
+        while len(self._versions) > MAX_VERSIONS:
+            self._versions.popitem(last=False)
+
+    def get(self, version):
+        """按版本号取编译好的配置；内存中没有时从存档重新编译，存档中也没有时返回 None"""
+        with self._lock:
+            compiled = self._versions.get(version)
+            if compiled is not None:
+                self._versions.move_to_end(version)
+                return compiled
+            app_config = dict(self.current["app_config"]) if self.current is not None else {}
+        questions_json = self.load_version(version) if self.load_version is not None else None
+        if questions_json is None:
+            return None
+        # 存档只有题目，app_config 使用当前版本的
+        try:
+            compiled = compile_config({"app_config": app_config, "questions": json.loads(questions_json)},
+                                      version=version)
+        except (ConfigError, json.JSONDecodeError):
+            return None
+        with self._lock:
+            self._remember(compiled)
+        return compiled
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception:
+                # 监视线程不能因为一次异常退出
+                pass
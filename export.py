@@ -0,0 +1,127 @@
+"""数据导出：按需生成文件，分块从存储后端读取，不在内存中拼出整张表
+
+文件先写入临时文件（超过 SPOOL_MAX_SIZE 落盘），最后一次性读出为 bytes：
+st.download_button 的数据只接受 str / bytes / BytesIO / 普通文件对象，不接受临时文件对象。
+"""
+import tempfile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# 每次从数据库读取的答卷数
+EXPORT_CHUNK_SIZE = 2000
+
+# 生成中的导出文件超过该大小后落到临时磁盘文件（字节）
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# CSV/XLSX 中多选答案的拼接方式（与旧版 survey_data.csv 一致）
+MULTI_JOINER = "; "
+
+# 支持的导出格式：名称 -> (扩展名, MIME 类型)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def iter_response_chunks(backend, questions, chunk_size=EXPORT_CHUNK_SIZE,
+                         submit_from=None, submit_to=None):
+    """按 (created_at, id) 游标分块读取答卷，每次产出一个 DataFrame（backend 见 backends.py）"""
+    after = None
+    while True:
+        chunk = backend.fetch_frame(
+            questions, after=after, limit=chunk_size,
+            submit_from=submit_from, submit_to=submit_to
+        )
+        if chunk.empty:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk.iloc[-1]
+        after = (last['created_at'], int(last['id']))
+
+
+def _flatten_multi(chunk, questions):
+    """多选列表拼接为字符串，便于写入 CSV/Excel"""
+    chunk = chunk.copy()
+    for q in questions:
+        if q['type'] == 'multi' and q['id'] in chunk.columns:
+            chunk[q['id']] = [MULTI_JOINER.join(value) for value in chunk[q['id']]]
+    return chunk
+
+
+def _read_all(f):
+    """读出临时文件的全部内容并关闭（落盘的临时文件随之删除）"""
+    with f:
+        f.seek(0)
+        return f.read()
+
+
+def write_csv(chunks, questions):
+    """写出带 BOM 的 UTF-8 CSV（Excel 可直接打开），返回文件内容 bytes"""
+    f = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    first = True
+    for chunk in chunks:
+        text = _flatten_multi(chunk, questions).to_csv(index=False, header=first)
+        f.write(text.encode("utf-8-sig" if first else "utf-8"))
+        first = False
+    return _read_all(f)
+
+
+def write_xlsx(chunks, questions):
+    """以 openpyxl 只写模式逐行写出 Excel，返回文件内容 bytes"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("survey_data")
+    first = True
+    for chunk in chunks:
+        chunk = _flatten_multi(chunk, questions)
+        if first:
+            sheet.append(list(chunk.columns))
+            first = False
+        for row in chunk.itertuples(index=False):
+            sheet.append([None if value != value else value for value in row])
+    f = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    workbook.save(f)
+    return _read_all(f)
+
+
+def parquet_schema(questions):
+    """Parquet 列类型：单选为字符串，多选保留为字符串列表"""
+    fields = [
+        pa.field("id", pa.int64()),
+        pa.field("submit_time", pa.string()),
+        pa.field("created_at", pa.string()),
+        pa.field("config_version", pa.string()),
+    ]
+    for q in questions:
+        value_type = pa.list_(pa.string()) if q['type'] == 'multi' else pa.string()
+        fields.append(pa.field(q['id'], value_type))
+    return pa.schema(fields)
+
+
+def write_parquet(chunks, questions):
+    """每个分块写成一个 row group（zstd 压缩），返回文件内容 bytes"""
+    schema = parquet_schema(questions)
+    f = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    with pq.ParquetWriter(f, schema, compression="zstd") as parquet_writer:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            parquet_writer.write_table(table)
+    return _read_all(f)
+
+
+WRITERS = {
+    "CSV": write_csv,
+    "Excel": write_xlsx,
+    "Parquet": write_parquet,
+}
+
+
+def export_responses(backend, questions, fmt, submit_from=None, submit_to=None):
+    """按格式导出答卷（可按提交时间筛选），返回文件内容 bytes（可直接作为 st.download_button 的数据）"""
+    chunks = iter_response_chunks(backend, questions, submit_from=submit_from, submit_to=submit_to)
+    return WRITERS[fmt](chunks, questions)
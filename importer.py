@@ -0,0 +1,230 @@
+"""批量导入答卷：流式读取 CSV / XLSX，按题目映射列，去重后分批写入 SQLite
+
+用法：
+    python importer.py survey_data.csv
+    python importer.py responses.xlsx --chunk-size 10000 --db survey_data.db
+
+列映射：
+- 表头中有题目 id 或题目文本时按列名匹配，submit_time 列为提交时间；
+- 否则按旧版扁平格式处理：第一列为提交时间，其后各列依次对应 survey_config.json 中的题目
+  （旧版 survey_data.csv 的表头只有 submit_time,name,original_content 三列，数据行却有 14 列）。
+多选题按 ";" 拆分。与库中已有答卷或文件中前面的行完全相同（提交时间与全部答案）的行会被跳过。
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+import config
+import storage
+
+# 每个事务写入的答卷数
+DEFAULT_CHUNK_SIZE = 5000
+
+SUBMIT_TIME_COLUMN = "submit_time"
+
+# 存储使用的提交时间格式（时间汇总按其前缀分桶）
+SUBMIT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 可识别的提交时间写法
+SUBMIT_TIME_INPUT_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y/%m/%d %H:%M",
+    "%Y-%m-%d",
+    "%Y/%m/%d",
+)
+
+# 旧版 CSV 中多选答案的分隔符
+MULTI_DELIMITER = ";"
+
+
+def _cell_text(value):
+    """把 Excel 单元格的值转为文本"""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime(SUBMIT_TIME_FORMAT)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def iter_csv_rows(path):
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        yield from csv.reader(f)
+
+
+def iter_xlsx_rows(path):
+    """以 openpyxl 只读模式逐行读取第一个工作表"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield [_cell_text(value) for value in row]
+    finally:
+        workbook.close()
+
+
+READERS = {
+    ".csv": iter_csv_rows,
+    ".xlsx": iter_xlsx_rows,
+}
+
+
+def parse_submit_time(text):
+    """统一为 YYYY-MM-DD HH:MM:SS，无法识别时返回 None"""
+    text = text.strip()
+    for fmt in SUBMIT_TIME_INPUT_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime(SUBMIT_TIME_FORMAT)
+        except ValueError:
+            continue
+    return None
+
+
+class ColumnMapping:
+    """文件列与题目的对应关系
+
+    positional 为 True 时按旧版格式逐列对应题目，此时数据行的列数必须与题目数一致。
+    """
+
+    def __init__(self, header, questions):
+        by_key = {}
+        for q in questions:
+            by_key[q['id']] = q
+            by_key[q['text']] = q
+        names = [str(name).strip() for name in header]
+        self.columns = [(i, by_key[name]) for i, name in enumerate(names) if name in by_key]
+        self.positional = not self.columns
+        if self.positional:
+            self.submit_index = 0
+            self.columns = list(enumerate(questions, start=1))
+            self.width = len(questions) + 1
+        else:
+            self.submit_index = names.index(SUBMIT_TIME_COLUMN) if SUBMIT_TIME_COLUMN in names else None
+            self.width = None
+        # 没有表头的文件：第一行就是数据
+        self.header_is_data = self.positional and bool(names) and parse_submit_time(names[0]) is not None
+
+    def parse(self, row):
+        """把一行转为答案字典，无效行返回 None"""
+        if self.width is not None and len(row) != self.width:
+            return None
+        if self.submit_index is None or self.submit_index >= len(row):
+            return None
+        submit_time = parse_submit_time(row[self.submit_index])
+        if submit_time is None:
+            return None
+        answers = {}
+        for i, q in self.columns:
+            value = row[i].strip() if i < len(row) else ""
+            if q['type'] == 'multi':
+                answers[q['id']] = [option.strip() for option in value.split(MULTI_DELIMITER) if option.strip()]
+            else:
+                answers[q['id']] = value or None
+        answers['submit_time'] = submit_time
+        return answers
+
+
+def fingerprint(answers):
+    """答卷去重键：提交时间与全部答案相同即视为同一份"""
+    payload = json.dumps(answers, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(payload).digest()
+
+
+def import_file(path, db_file=storage.DB_FILE, config_file=config.CONFIG_FILE,
+                chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """导入一个 CSV / XLSX 文件，返回统计字典
+
+    每 chunk_size 份答卷一个 IMMEDIATE 事务；progress(stats) 在每个事务提交后调用。
+    """
+    reader = READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise ValueError(f"不支持的文件类型：{path}（支持 {', '.join(READERS)}）")
+    survey = config.read_config(config_file)
+    if not survey["questions"]:
+        raise config.ConfigError(f"{config_file} 中没有题目，无法映射列")
+
+    start = time.perf_counter()
+    stats = {"read": 0, "imported": 0, "duplicates": 0, "invalid": 0, "seconds": 0.0}
+    conn = storage.connect(db_file)
+    try:
+        storage.init_schema(conn)
+        with conn:
+            conn.execute(storage.SQL_INSERT_CONFIG_VERSION, (survey["version"], survey["questions_json"]))
+        seen = {fingerprint(answers) for answers in storage.iter_stored_answers(conn)}
+
+        def flush(batch):
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                stats["imported"] += storage.write_responses(conn, batch)
+            stats["seconds"] = time.perf_counter() - start
+            if progress is not None:
+                progress(stats)
+
+        rows = reader(path)
+        header = next(rows, None)
+        if header is None:
+            return stats
+        mapping = ColumnMapping(header, survey["questions"])
+        if mapping.header_is_data:
+            rows = _prepend(header, rows)
+
+        batch = []
+        for row in rows:
+            if not any(cell.strip() for cell in row):
+                continue
+            stats["read"] += 1
+            answers = mapping.parse(row)
+            if answers is None:
+                stats["invalid"] += 1
+                continue
+            key = fingerprint(answers)
+            if key in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(key)
+            batch.append((answers, answers['submit_time'], survey["version"]))
+            if len(batch) >= chunk_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    finally:
+        conn.close()
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def _prepend(first, rows):
+    yield first
+    yield from rows
+
+
+def _format_stats(stats):
+    rate = stats["imported"] / stats["seconds"] if stats["seconds"] else 0
+    return (f"读取 {stats['read']} 行，导入 {stats['imported']}，重复跳过 {stats['duplicates']}，"
+            f"无效 {stats['invalid']}，用时 {stats['seconds']:.2f} 秒（{rate:.0f} 份/秒）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="CSV 或 XLSX 文件")
+    parser.add_argument("--db", default=storage.DB_FILE, help="数据库文件")
+    parser.add_argument("--config", default=config.CONFIG_FILE, help="问卷配置文件")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每个事务写入的答卷数")
+    args = parser.parse_args()
+
+    stats = import_file(args.path, args.db, args.config, args.chunk_size,
+                        progress=lambda s: print("  " + _format_stats(s)))
+    print(_format_stats(stats))
+
+
+if __name__ == "__main__":
+    main()
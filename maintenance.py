@@ -0,0 +1,93 @@
+"""已删除答卷的后台清理：定期物理删除超过保留期的墓碑，并增量回收数据库空间
+
+页面进程内每个存储后端一个后台线程（get_maintenance）；SQLite 库也可以在命令行单独执行一次（如放进 cron）：
+    python maintenance.py                         # 清理 survey_data.db
+    python maintenance.py --db surveys/demo.db --retention-hours 24
+    python maintenance.py --convert               # 旧库一次性转为增量回收模式（整库 VACUUM，期间提交会等待）
+
+清理分块进行、每块一个短事务，增量回收每步只归还少量页，提交的写入不会被长时间阻塞。
+"""
+import argparse
+import atexit
+import threading
+import time
+
+import streamlit as st
+
+import backends
+import storage
+
+# 两次清理的间隔（秒）
+MAINTENANCE_INTERVAL = 3600
+
+# 进程启动后第一次清理前的等待（秒），避开启动时的建表与迁移
+MAINTENANCE_START_DELAY = 60
+
+
+def run_once(backend, retention_hours=storage.DELETE_RETENTION_HOURS):
+    """清理一次，返回 (物理删除的答卷数, 回收的页数)；PostgreSQL 的空间由 autovacuum 回收，页数为 0"""
+    purged = backend.purge_deleted(retention_hours)
+    reclaimed = 0
+    if purged and backend.name == backends.BACKEND_SQLITE:
+        reclaimed = storage.incremental_vacuum(backend.db_file)
+    return purged, reclaimed
+
+
+class MaintenanceWorker:
+    """按固定间隔清理一个存储后端的后台线程"""
+
+    def __init__(self, backend, interval=MAINTENANCE_INTERVAL, retention_hours=storage.DELETE_RETENTION_HOURS,
+                 start_delay=MAINTENANCE_START_DELAY):
+        self.backend = backend
+        self.interval = interval
+        self.retention_hours = retention_hours
+        self.start_delay = start_delay
+        self.last_run = None
+        self.last_result = None
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="survey-maintenance", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        delay = self.start_delay
+        while not self._stop.wait(delay):
+            delay = self.interval
+            try:
+                self.last_result = run_once(self.backend, self.retention_hours)
+                self.error = None
+            except Exception as e:
+                # 清理失败不影响提交与查看，记下错误，下个周期再试
+                self.error = str(e)
+            self.last_run = time.time()
+
+    def stop(self):
+        self._stop.set()
+
+
+@st.cache_resource
+def get_maintenance(settings, _backend):
+    """每个进程、每个存储后端（settings 为 backends.backend_settings 的结果）只启动一个清理线程"""
+    worker = MaintenanceWorker(_backend)
+    atexit.register(worker.stop)
+    return worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=storage.DB_FILE, help="数据库文件")
+    parser.add_argument("--retention-hours", type=int, default=storage.DELETE_RETENTION_HOURS,
+                        help="已删除答卷的保留时长（小时），期间可撤销")
+    parser.add_argument("--convert", action="store_true", help="把旧库转为增量回收模式（整库 VACUUM）")
+    args = parser.parse_args()
+
+    if args.convert:
+        converted = storage.convert_to_incremental(args.db)
+        print("已转为增量回收模式" if converted else "转换失败：数据库仍不是增量回收模式")
+    purged, reclaimed = run_once(backends.SQLiteBackend(args.db), args.retention_hours)
+    print(f"物理删除 {purged} 份已删除答卷，回收 {reclaimed} 页")
+    storage.get_pool(args.db).close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Prometheus 文本格式的运行指标：计数器、直方图、仪表，由旁路 HTTP 端口提供抓取
+
+不依赖 prometheus_client：指标种类与输出格式只实现本应用用到的部分
+（text/plain; version=0.0.4）。本地可用 curl http://localhost:9108/metrics 查看。
+"""
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 默认监听地址与端口（可在 app_config 中用 metrics_port 修改，0 为不启动）
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9108
+
+# 延迟直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """指标基类：按标签值元组保存各序列"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 的标签应为 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key):
+        return list(zip(self.labelnames, key))
+
+    def samples(self):
+        """返回 [(样本名, 标签列表, 值)]"""
+        raise NotImplementedError
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for sample_name, labels, value in self.samples():
+            lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """只增不减的计数器"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        return [(self.name, self._labels(key), value) for key, value in items]
+
+
+class Histogram(Metric):
+    """累积桶直方图，附带 _sum 与 _count"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        if not items and not self.labelnames:
+            items = [((), ([0] * len(self.buckets), 0.0, 0))]
+        result = []
+        for key, (counts, total, count) in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                result.append((f"{self.name}_bucket", labels + [("le", _format_value(bound))], cumulative))
+            result.append((f"{self.name}_bucket", labels + [("le", "+Inf")], count))
+            result.append((f"{self.name}_sum", labels, total))
+            result.append((f"{self.name}_count", labels, count))
+        return result
+
+
+class Gauge(Metric):
+    """抓取时由回调读取当前值的仪表；带标签时每组标签值登记一个回调"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, read=None, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._reads = {}
+        if read is not None:
+            self.set_function(read)
+
+    def set_function(self, read, **labels):
+        """登记（或替换）一组标签值的读取回调"""
+        key = self._key(labels)
+        with self._lock:
+            self._reads[key] = read
+
+    def remove(self, **labels):
+        """去掉给定标签取值的全部序列（只需给出部分标签）"""
+        indexes = [(self.labelnames.index(name), str(value)) for name, value in labels.items()]
+        with self._lock:
+            for key in [key for key in self._reads if all(key[i] == value for i, value in indexes)]:
+                del self._reads[key]
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._reads.items())
+        result = []
+        for key, read in items:
+            try:
+                value = read()
+            except Exception:
+                # 读取失败（如数据库尚未创建）时不输出该序列
+                continue
+            result.append((self.name, self._labels(key), value))
+        return result
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def expose(self):
+        """生成完整的文本格式输出"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.expose() for metric in metrics) + "\n"
+
+
+# 进程级指标表
+REGISTRY = Registry()
+
+SUBMISSIONS = REGISTRY.register(Counter(
+    "survey_submissions_total", "问卷提交次数（按结果区分）", ("result",)))
+DELETES = REGISTRY.register(Counter(
+    "survey_deleted_responses_total", "管理员删除的答卷数"))
+RESTORES = REGISTRY.register(Counter(
+    "survey_restored_responses_total", "管理员撤销删除恢复的答卷数"))
+VALIDATION_ERRORS = REGISTRY.register(Counter(
+    "survey_validation_errors_total", "作答校验未通过次数（按步骤区分）", ("step",)))
+SAVE_LATENCY = REGISTRY.register(Histogram(
+    "survey_save_seconds", "save_to_database 耗时（提交到确认落盘）"))
+LOAD_LATENCY = REGISTRY.register(Histogram(
+    "survey_load_seconds", "答卷读取耗时（按读取方式区分）", ("kind",)))
+
+
+RESPONSE_ROWS = REGISTRY.register(Gauge(
+    "survey_responses", "存储中的答卷数（不含已删除）", labelnames=("survey", "backend")))
+STORAGE_SIZE = REGISTRY.register(Gauge(
+    "survey_db_size_bytes", "存储占用：SQLite 为数据库文件（含 -wal），PostgreSQL 为答卷相关表",
+    labelnames=("survey", "backend")))
+
+
+# 默认问卷（不带 ?survey= 参数）在 survey 标签中的取值
+DEFAULT_SURVEY_LABEL = "default"
+
+
+def register_database_gauges(survey, backend):
+    """登记一份问卷存储后端的仪表（答卷数、存储占用），按 survey / backend 标签区分；
+    survey 为问卷名称（默认问卷为 None），同一问卷换了后端时替换原来的读取回调"""
+    labels = {"survey": survey or DEFAULT_SURVEY_LABEL, "backend": backend.name}
+    for gauge, read in ((RESPONSE_ROWS, backend.response_count), (STORAGE_SIZE, backend.storage_size)):
+        gauge.remove(survey=labels["survey"])
+        gauge.set_function(read, **labels)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.expose().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 抓取请求不写入 Streamlit 日志
+        pass
+
+
+def start_server(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """在后台线程启动 /metrics 端点，返回 server（server.server_address 为实际地址）"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,105 @@
+"""热点路径计时：进程内按名称汇总耗时（墙钟时间与当前线程 CPU 时间），以及单次重跑的 cProfile 采样"""
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# 每个计时项保留的最近样本数
+MAX_SAMPLES = 500
+
+
+class TimingRegistry:
+    """线程安全的耗时样本表，各会话线程共享"""
+
+    def __init__(self, max_samples=MAX_SAMPLES):
+        self.max_samples = max_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, wall, cpu):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.max_samples)
+            samples.append((wall, cpu))
+
+    def stats(self):
+        """返回 {name: {count, wall_mean_ms, wall_p50_ms, wall_p95_ms, cpu_mean_ms}}"""
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+        result = {}
+        for name, samples in snapshot.items():
+            walls = sorted(wall for wall, _ in samples)
+            cpus = [cpu for _, cpu in samples]
+            count = len(samples)
+            result[name] = {
+                "count": count,
+                "wall_mean_ms": sum(walls) / count * 1000,
+                "wall_p50_ms": walls[count // 2] * 1000,
+                "wall_p95_ms": walls[min(count - 1, int(count * 0.95))] * 1000,
+                "cpu_mean_ms": sum(cpus) / count * 1000,
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+
+# 进程级计时表
+REGISTRY = TimingRegistry()
+
+
+class Timer:
+    """手动开始/结束的计时器，用于无法包进 with 块的代码段"""
+
+    def __init__(self, name, registry=REGISTRY):
+        self.name = name
+        self.registry = registry
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+
+    def stop(self):
+        self.registry.record(
+            self.name,
+            time.perf_counter() - self._wall,
+            time.thread_time() - self._cpu,
+        )
+
+
+@contextmanager
+def timed(name, registry=REGISTRY):
+    """记录 with 块的耗时"""
+    timer = Timer(name, registry)
+    try:
+        yield
+    finally:
+        timer.stop()
+
+
+# 性能页展示的 cProfile 函数条数
+PROFILE_TOP = 30
+
+
+def start_profile():
+    """开始对当前线程做 cProfile 采样"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def finish_profile(profiler, top=PROFILE_TOP):
+    """结束采样，返回 (.prof 文件内容, 按累计耗时排序的文本摘要)
+
+    .prof 与 cProfile.Profile.dump_stats 的格式相同，可用 snakeviz / pstats 打开。
+    """
+    profiler.disable()
+    profiler.create_stats()
+    data = marshal.dumps(profiler.stats)
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(top)
+    return data, stream.getvalue()
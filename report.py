@@ -0,0 +1,77 @@
+"""文本分析报告：由聚合计数生成，逐题文本块按 (题目, 计数) 记忆化，百分比按总数另算"""
+from datetime import datetime
+from functools import lru_cache
+
+SEPARATOR = "=" * 60
+RULE = "-" * 60
+
+# 按分类输出的章节：(分类, 标题)，分类见 config.CATEGORIES
+CATEGORY_SECTIONS = (
+    ("teaching", "📚 教学方向分析"),
+    ("paper", "📝 论文/写作方向分析"),
+    ("grant", "📋 课题申报方向分析"),
+)
+
+DECISION_TITLE = "🎯 关键决策分析"
+
+# 记忆化的题目文本块数量上限
+BLOCK_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=BLOCK_CACHE_SIZE)
+def render_question(text, unit, counts):
+    """一道题的文本块（不含百分比）；counts 为 ((选项, 次数), ...)，计数不变时直接复用
+
+    总样本数每次提交都会变，不放进缓存键：返回 (标题, ((行前缀, 次数), ...))，
+    由 format_question 按当前总数补上百分比。
+    """
+    header = f"\n{text}\n{RULE}"
+    return header, tuple((f"  {option}: {count}{unit} (", count) for option, count in counts)
+
+
+def format_question(text, unit, counts, total):
+    """一道题的完整文本块：缓存的文本 + 按总数计算的百分比"""
+    header, lines = render_question(text, unit, counts)
+    return "\n".join([header] + [f"{prefix}{count / total * 100:.1f}%)" for prefix, count in lines])
+
+
+def _section(title, questions, option_counts, total, unit=None, leading="\n\n"):
+    """一个章节：标题 + 各题文本块；unit 为 None 时单选记“人”、多选记“次”"""
+    lines = [leading + SEPARATOR, title, SEPARATOR + "\n"]
+    for q in questions:
+        counts = option_counts.get(q['id'])
+        if counts is None:
+            continue
+        question_unit = unit or ("人" if q['type'] == 'single' else "次")
+        lines.append(format_question(q['text'], question_unit, tuple(counts.items()), total))
+    return lines
+
+
+def build_report(survey, option_counts, total, generated_at=None):
+    """根据编译后的问卷与聚合计数生成完整报告文本
+
+    只有计数变化了的题目会重新格式化，其余题目的文本块来自缓存，只按新的总数重算百分比。
+    """
+    if generated_at is None:
+        generated_at = datetime.now()
+    report = [
+        SEPARATOR,
+        "📊 问卷数据分析报告",
+        SEPARATOR,
+        f"\n总样本数：{total} 份",
+        f"生成时间：{generated_at.strftime('%Y-%m-%d %H:%M:%S')}\n",
+    ]
+
+    for i, (category, title) in enumerate(CATEGORY_SECTIONS):
+        questions = survey["categories"][category]
+        if questions:
+            report.extend(_section(title, questions, option_counts, total, leading="\n" if i == 0 else "\n\n"))
+
+    # 关键决策题均为单选，按人数统计
+    if survey["decision_questions"]:
+        report.extend(_section(DECISION_TITLE, survey["decision_questions"], option_counts, total, unit="人"))
+
+    report.append("\n" + SEPARATOR)
+    report.append("报告生成完成")
+    report.append(SEPARATOR)
+    return "\n".join(report)
@@ -0,0 +1,1090 @@
+"""问卷数据存储层：进程内共享的 SQLite 连接池（WAL 模式）"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import perf
+
+# 默认数据库文件路径
+DB_FILE = "survey_data.db"
+
+# 连接池大小：Streamlit 每个会话一个脚本线程，写入由 SQLite 串行化，
+# 读连接多一些可以让查看数据页面与提交互不阻塞
+POOL_SIZE = 8
+
+# 进程内所有连接池合计的连接数上限：托管多份问卷时各数据库的连接池共享这一额度
+MAX_TOTAL_CONNECTIONS = 32
+
+# 额度用尽时重新尝试获取连接的间隔（秒）
+BUDGET_RETRY_INTERVAL = 0.05
+
+# 等待写锁的最长时间（毫秒）
+BUSY_TIMEOUT_MS = 5000
+
+# 每个连接打开时设置的 PRAGMA
+# WAL：读写互不阻塞；synchronous=NORMAL 在 WAL 下仍保证崩溃一致性，只省掉每次提交的 fsync
+# auto_vacuum=INCREMENTAL 只对尚未建表的新库生效（须在建表前设置），清理已删除答卷后可分步回收空间
+CONNECTION_PRAGMAS = [
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+]
+
+# 预编译语句（sqlite3 按 SQL 文本缓存已编译语句，固定文本即可复用）
+SQL_CREATE_RESPONSES = '''CREATE TABLE IF NOT EXISTS survey_responses
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  submit_time TEXT NOT NULL,
+                  answers TEXT NOT NULL,
+                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                  config_version TEXT,
+                  test_run TEXT,
+                  delete_batch INTEGER)'''
+
+# 问卷配置版本存档：每份答卷通过 config_version 关联到作答时的题目
+SQL_CREATE_CONFIG_VERSIONS = '''CREATE TABLE IF NOT EXISTS config_versions
+                 (version TEXT PRIMARY KEY,
+                  questions TEXT NOT NULL,
+                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)'''
+
+SQL_INSERT_CONFIG_VERSION = '''INSERT OR IGNORE INTO config_versions (version, questions)
+                 VALUES (?, ?)'''
+
+SQL_SELECT_CONFIG_VERSION = 'SELECT questions FROM config_versions WHERE version = ?'
+
+# 翻页索引：按 (created_at, id) 降序做 keyset 分页
+SQL_CREATE_RESPONSES_CREATED_INDEX = '''CREATE INDEX IF NOT EXISTS idx_survey_responses_created
+                 ON survey_responses (created_at, id)'''
+
+# 提交时间索引：按提交时间筛选、取最新提交时使用
+SQL_CREATE_RESPONSES_SUBMIT_INDEX = '''CREATE INDEX IF NOT EXISTS idx_survey_responses_submit
+                 ON survey_responses (submit_time)'''
+
+SQL_INSERT_RESPONSE = '''INSERT INTO survey_responses (submit_time, answers, config_version, test_run)
+                 VALUES (?, ?, ?, ?)'''
+
+# 批量写入时预先分配 id：AUTOINCREMENT 不复用已删除的 id，取序列与现有最大 id 中较大者
+SQL_LAST_RESPONSE_ID = '''SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'survey_responses'), 0),
+                            COALESCE((SELECT MAX(id) FROM survey_responses), 0))'''
+
+SQL_INSERT_RESPONSE_WITH_ID = '''INSERT INTO survey_responses (id, submit_time, answers, config_version, test_run)
+                 VALUES (?, ?, ?, ?, ?)'''
+
+# 聚合计数表：每题每个选项被选择的次数，与原始答案在同一事务中维护
+SQL_CREATE_OPTION_COUNTS = '''CREATE TABLE IF NOT EXISTS option_counts
+                 (question_id TEXT NOT NULL,
+                  option TEXT NOT NULL,
+                  count INTEGER NOT NULL DEFAULT 0,
+                  PRIMARY KEY (question_id, option)) WITHOUT ROWID'''
+
+# 全局计数器（如总提交数），避免 COUNT(*) 全表扫描
+SQL_CREATE_COUNTERS = '''CREATE TABLE IF NOT EXISTS survey_counters
+                 (name TEXT PRIMARY KEY,
+                  value INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID'''
+
+SQL_ADD_OPTION_COUNT = '''INSERT INTO option_counts (question_id, option, count)
+                 VALUES (?, ?, ?)
+                 ON CONFLICT (question_id, option) DO UPDATE SET count = count + excluded.count'''
+
+SQL_PRUNE_OPTION_COUNTS = 'DELETE FROM option_counts WHERE count <= 0'
+
+SQL_SELECT_OPTION_COUNTS = '''SELECT question_id, option, count
+                 FROM option_counts
+                 ORDER BY question_id, count DESC'''
+
+SQL_ADD_COUNTER = '''INSERT INTO survey_counters (name, value)
+                 VALUES (?, ?)
+                 ON CONFLICT (name) DO UPDATE SET value = value + excluded.value'''
+
+SQL_SELECT_COUNTER = 'SELECT value FROM survey_counters WHERE name = ?'
+
+# 规范化答案表：每份答卷每题每个选中选项一行，题目/选项上有索引，
+# 按题查询无需反序列化 JSON
+SQL_CREATE_RESPONSE_ANSWERS = '''CREATE TABLE IF NOT EXISTS response_answers
+                 (response_id INTEGER NOT NULL,
+                  question_id TEXT NOT NULL,
+                  position INTEGER NOT NULL,
+                  option TEXT NOT NULL,
+                  PRIMARY KEY (response_id, question_id, position)) WITHOUT ROWID'''
+
+SQL_CREATE_ANSWERS_INDEX = '''CREATE INDEX IF NOT EXISTS idx_response_answers_question_option
+                 ON response_answers (question_id, option)'''
+
+SQL_INSERT_ANSWER = '''INSERT INTO response_answers (response_id, question_id, position, option)
+                 VALUES (?, ?, ?, ?)'''
+
+SQL_DELETE_ANSWERS = 'DELETE FROM response_answers WHERE response_id = ?'
+
+# 时间汇总表：提交量按小时/按天、选项次数按天，与原始答案在同一事务中维护，
+# 时间趋势页面只查询汇总表，不扫描答卷
+ROLLUP_HOUR = "hour"
+ROLLUP_DAY = "day"
+
+# submit_time 为 "YYYY-MM-DD HH:MM:SS"，截取前缀即为所在小时/日期
+SQL_HOUR_BUCKET = "substr(submit_time, 1, 13) || ':00'"
+SQL_DAY_BUCKET = "substr(submit_time, 1, 10)"
+
+SQL_CREATE_SUBMISSION_ROLLUPS = '''CREATE TABLE IF NOT EXISTS submission_rollups
+                 (granularity TEXT NOT NULL,
+                  bucket TEXT NOT NULL,
+                  count INTEGER NOT NULL DEFAULT 0,
+                  PRIMARY KEY (granularity, bucket)) WITHOUT ROWID'''
+
+SQL_CREATE_OPTION_DAILY_COUNTS = '''CREATE TABLE IF NOT EXISTS option_daily_counts
+                 (day TEXT NOT NULL,
+                  question_id TEXT NOT NULL,
+                  option TEXT NOT NULL,
+                  count INTEGER NOT NULL DEFAULT 0,
+                  PRIMARY KEY (question_id, day, option)) WITHOUT ROWID'''
+
+# 按一份答卷增减时间汇总（参数：增量, id, 增量, id），删除时须在删除答卷之前执行
+SQL_ADD_SUBMISSION_ROLLUPS = f'''INSERT INTO submission_rollups (granularity, bucket, count)
+                 SELECT '{ROLLUP_HOUR}', {SQL_HOUR_BUCKET}, ? FROM survey_responses WHERE id = ?
+                 UNION ALL
+                 SELECT '{ROLLUP_DAY}', {SQL_DAY_BUCKET}, ? FROM survey_responses WHERE id = ?
+                 ON CONFLICT (granularity, bucket) DO UPDATE SET count = count + excluded.count'''
+
+# 按一份答卷的规范化行增减每日选项次数（参数：增量, id）
+SQL_ADD_OPTION_DAILY_COUNTS = f'''INSERT INTO option_daily_counts (day, question_id, option, count)
+                 SELECT {SQL_DAY_BUCKET.replace("submit_time", "r.submit_time")}, a.question_id, a.option, ? * COUNT(*)
+                 FROM response_answers a
+                 JOIN survey_responses r ON r.id = a.response_id
+                 WHERE a.response_id = ?
+                 GROUP BY a.question_id, a.option
+                 ON CONFLICT (question_id, day, option) DO UPDATE SET count = count + excluded.count'''
+
+SQL_ADD_SUBMISSION_ROLLUP = '''INSERT INTO submission_rollups (granularity, bucket, count)
+                 VALUES (?, ?, ?)
+                 ON CONFLICT (granularity, bucket) DO UPDATE SET count = count + excluded.count'''
+
+SQL_ADD_OPTION_DAILY_COUNT = '''INSERT INTO option_daily_counts (day, question_id, option, count)
+                 VALUES (?, ?, ?, ?)
+                 ON CONFLICT (question_id, day, option) DO UPDATE SET count = count + excluded.count'''
+
+SQL_PRUNE_ROLLUPS = (
+    'DELETE FROM submission_rollups WHERE count <= 0',
+    'DELETE FROM option_daily_counts WHERE count <= 0',
+)
+
+# 软删除：删除只给答卷打上 delete_batch 标记（墓碑），读取一律只看 delete_batch IS NULL 的答卷；
+# 聚合与时间汇总在打标记的同一事务中按整批扣减，撤销时加回。超过保留期的批次由后台
+# 清理任务（maintenance.py）分块物理删除并增量回收空间
+SQL_LIVE = "delete_batch IS NULL"
+SQL_TOMBSTONE = "delete_batch IS NOT NULL"
+
+# 每次删除操作一行：筛选条件的说明、删除条数与时间，撤销 / 清理都按批次进行
+SQL_CREATE_DELETE_BATCHES = '''CREATE TABLE IF NOT EXISTS delete_batches
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  description TEXT NOT NULL,
+                  count INTEGER NOT NULL DEFAULT 0,
+                  deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)'''
+
+# 墓碑只占答卷的一小部分，部分索引让“排除已删除答卷”的子查询只扫描墓碑
+SQL_CREATE_RESPONSES_DELETED_INDEX = '''CREATE INDEX IF NOT EXISTS idx_survey_responses_deleted
+                 ON survey_responses (delete_batch) WHERE delete_batch IS NOT NULL'''
+
+# 测试批次标记：正式答卷为 NULL
+SQL_CREATE_RESPONSES_TEST_RUN_INDEX = '''CREATE INDEX IF NOT EXISTS idx_survey_responses_test_run
+                 ON survey_responses (test_run) WHERE test_run IS NOT NULL'''
+
+SQL_BATCH_RESPONSES = 'SELECT id FROM survey_responses WHERE delete_batch = ?'
+
+# 一批答卷的每日选项次数先汇总到临时表，每日计数与总计数都由它得出，答案行只扫描一遍
+SQL_CREATE_BATCH_OPTION_DAYS = '''CREATE TEMP TABLE IF NOT EXISTS batch_option_days
+                 (day TEXT, question_id TEXT, option TEXT, count INTEGER)'''
+
+SQL_FILL_BATCH_OPTION_DAYS = f'''INSERT INTO temp.batch_option_days (day, question_id, option, count)
+                 SELECT {SQL_DAY_BUCKET.replace("submit_time", "r.submit_time")}, a.question_id, a.option, COUNT(*)
+                 FROM survey_responses r
+                 JOIN response_answers a ON a.response_id = r.id
+                 WHERE r.delete_batch = ?
+                 GROUP BY 1, 2, 3'''
+
+# 按一批答卷增减聚合计数与时间汇总（参数：增量[, 批次 id]）
+SQL_ADD_BATCH_OPTION_COUNTS = '''INSERT INTO option_counts (question_id, option, count)
+                 SELECT question_id, option, ? * SUM(count)
+                 FROM temp.batch_option_days
+                 WHERE true
+                 GROUP BY question_id, option
+                 ON CONFLICT (question_id, option) DO UPDATE SET count = count + excluded.count'''
+
+SQL_ADD_BATCH_SUBMISSION_ROLLUPS = f'''INSERT INTO submission_rollups (granularity, bucket, count)
+                 SELECT '{ROLLUP_HOUR}', {SQL_HOUR_BUCKET}, ? * COUNT(*) FROM survey_responses WHERE delete_batch = ? GROUP BY 2
+                 UNION ALL
+                 SELECT '{ROLLUP_DAY}', {SQL_DAY_BUCKET}, ? * COUNT(*) FROM survey_responses WHERE delete_batch = ? GROUP BY 2
+                 ON CONFLICT (granularity, bucket) DO UPDATE SET count = count + excluded.count'''
+
+SQL_ADD_BATCH_OPTION_DAILY_COUNTS = '''INSERT INTO option_daily_counts (day, question_id, option, count)
+                 SELECT day, question_id, option, ? * count
+                 FROM temp.batch_option_days
+                 WHERE true
+                 ON CONFLICT (question_id, day, option) DO UPDATE SET count = count + excluded.count'''
+
+# 已删除答卷的保留时长（小时），期间可以撤销，之后由后台清理任务物理删除
+DELETE_RETENTION_HOURS = 168
+
+# 每个清理事务物理删除的答卷数：事务短，提交的写入最多只需等待这一小块
+PURGE_CHUNK_SIZE = 500
+
+# 增量回收：每步归还的页数（4 KB 页约 4 MB，单步只占写锁几十毫秒）与步间暂停（秒）
+VACUUM_STEP_PAGES = 1024
+VACUUM_STEP_PAUSE = 0.05
+
+# PRAGMA auto_vacuum 的取值：0 NONE，1 FULL，2 INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+
+# 筛选条件 test_run 取此值时匹配任意测试答卷
+ANY_TEST_RUN = True
+
+MIGRATION_TIME_ROLLUPS = "time_rollups"
+
+# 作答草稿：按 URL 中的续答令牌保存进度，掉线后可继续作答
+SQL_CREATE_DRAFTS = '''CREATE TABLE IF NOT EXISTS survey_drafts
+                 (token TEXT PRIMARY KEY,
+                  config_version TEXT,
+                  current_question INTEGER NOT NULL DEFAULT 0,
+                  answers TEXT NOT NULL,
+                  other_inputs TEXT NOT NULL,
+                  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)'''
+
+SQL_CREATE_DRAFTS_INDEX = '''CREATE INDEX IF NOT EXISTS idx_survey_drafts_updated
+                 ON survey_drafts (updated_at)'''
+
+SQL_UPSERT_DRAFT = '''INSERT INTO survey_drafts
+                 (token, config_version, current_question, answers, other_inputs, updated_at)
+                 VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                 ON CONFLICT (token) DO UPDATE SET
+                   config_version = excluded.config_version,
+                   current_question = excluded.current_question,
+                   answers = excluded.answers,
+                   other_inputs = excluded.other_inputs,
+                   updated_at = excluded.updated_at'''
+
+SQL_SELECT_DRAFT = '''SELECT config_version, current_question, answers, other_inputs
+                 FROM survey_drafts
+                 WHERE token = ? AND updated_at >= datetime('now', ?)'''
+
+SQL_DELETE_DRAFT = 'DELETE FROM survey_drafts WHERE token = ?'
+
+SQL_PURGE_DRAFTS = "DELETE FROM survey_drafts WHERE updated_at < datetime('now', ?)"
+
+# 草稿保留时长（小时），超过后视为放弃作答
+DRAFT_TTL_HOURS = 72
+
+# 数据迁移进度：按 id 分块推进，中断后从 last_id 继续
+SQL_CREATE_MIGRATIONS = '''CREATE TABLE IF NOT EXISTS schema_migrations
+                 (name TEXT PRIMARY KEY,
+                  last_id INTEGER NOT NULL DEFAULT 0,
+                  done INTEGER NOT NULL DEFAULT 0)'''
+
+MIGRATION_NORMALIZE = "normalize_answers"
+
+# 每个迁移事务处理的答卷数
+MIGRATION_CHUNK_SIZE = 500
+
+# 多选题在 SQL 透视结果中的分隔符（单元分隔符 char(31)，不会出现在选项文本中）
+MULTI_SEPARATOR = "\x1f"
+
+# 多选题各选项前缀的定宽作答顺序与其后的分隔符（记录分隔符 char(30)）：
+# group_concat 不保证拼接顺序（聚合内 ORDER BY 需 SQLite 3.44+），拆分后按前缀排序还原
+POSITION_WIDTH = 5
+POSITION_SEPARATOR = "\x1e"
+
+# 计数器名称
+COUNTER_RESPONSES = "responses"
+# 数据版本号：每次写入/删除加一，读缓存据此判断是否失效
+COUNTER_DATA_VERSION = "data_version"
+
+# 答案字典中不属于题目的字段
+NON_QUESTION_KEYS = {"submit_time"}
+
+
+def connect(db_file):
+    """打开一个已设置好 PRAGMA 的连接，可跨线程传递（同一时刻只能一个线程使用）"""
+    with perf.timed("db_open"):
+        conn = sqlite3.connect(
+            db_file,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+    return conn
+
+
+class ConnectionBudget:
+    """多个连接池共享的连接数上限
+
+    额度用尽时关闭其它池中的一个空闲连接，把名额让给发起请求的池；
+    都没有空闲连接时由调用方稍后重试。
+    """
+
+    def __init__(self, limit=MAX_TOTAL_CONNECTIONS):
+        self.limit = limit
+        self._used = 0
+        self._pools = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def register(self, pool):
+        with self._lock:
+            self._pools.add(pool)
+
+    def reserve(self, requester):
+        """为 requester 预留一个连接名额，成功返回 True"""
+        with self._lock:
+            if self._used < self.limit:
+                self._used += 1
+                return True
+            for pool in list(self._pools):
+                if pool is not requester and pool._close_idle():
+                    # 名额直接转给 requester，占用数不变
+                    return True
+            return False
+
+    def release(self, count=1):
+        with self._lock:
+            self._used -= count
+
+    def stats(self):
+        with self._lock:
+            return {"limit": self.limit, "used": self._used, "pools": len(self._pools)}
+
+
+# 进程级连接额度
+BUDGET = ConnectionBudget()
+
+
+class ConnectionPool:
+    """线程安全的 SQLite 连接池，按需创建连接，最多 size 个
+
+    budget 不为 None 时，新建连接还需占用共享额度（见 ConnectionBudget）。
+    """
+
+    def __init__(self, db_file, size=POOL_SIZE, budget=None):
+        self.db_file = db_file
+        self.size = size
+        self.budget = budget
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+        if budget is not None:
+            budget.register(self)
+
+    def _acquire(self):
+        deadline = time.monotonic() + BUSY_TIMEOUT_MS / 1000
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                if self.budget is None or self.budget.reserve(self):
+                    try:
+                        return connect(self.db_file)
+                    except Exception:
+                        self._forget(1)
+                        raise
+                with self._lock:
+                    self._created -= 1
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise queue.Empty
+            # 本池没有空闲连接且无法新建：等归还，额度用尽时隔一会儿再试
+            try:
+                return self._idle.get(timeout=remaining if self.budget is None
+                                      else min(remaining, BUDGET_RETRY_INTERVAL))
+            except queue.Empty:
+                continue
+
+    def _forget(self, count):
+        """count 个连接已关闭（或未能打开），归还计数与共享额度"""
+        with self._lock:
+            self._created -= count
+        if self.budget is not None:
+            self.budget.release(count)
+
+    def _close_idle(self):
+        """关闭一个空闲连接（由共享额度在其它池需要名额时调用），名额不归还给额度"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return False
+        conn.close()
+        with self._lock:
+            self._created -= 1
+        return True
+
+    @contextmanager
+    def connection(self):
+        """借出一个连接，用完归还；未提交的事务会被回滚。借出期间计入 db_query 耗时"""
+        conn = self._acquire()
+        timer = perf.Timer("db_query")
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+            timer.stop()
+
+    def close_all(self):
+        """关闭所有空闲连接"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            self._forget(1)
+
+
+def init_schema(conn):
+    """创建表结构（幂等），迁移旧 JSON 答案，聚合表首次创建时按已有数据回填"""
+    # IMMEDIATE 事务：多个连接同时初始化时串行执行，而不是在升级写锁时互相报错
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(SQL_CREATE_RESPONSES)
+        conn.execute(SQL_CREATE_RESPONSES_CREATED_INDEX)
+        conn.execute(SQL_CREATE_RESPONSES_SUBMIT_INDEX)
+        conn.execute(SQL_CREATE_RESPONSE_ANSWERS)
+        conn.execute(SQL_CREATE_ANSWERS_INDEX)
+        conn.execute(SQL_CREATE_OPTION_COUNTS)
+        conn.execute(SQL_CREATE_SUBMISSION_ROLLUPS)
+        conn.execute(SQL_CREATE_OPTION_DAILY_COUNTS)
+        conn.execute(SQL_CREATE_COUNTERS)
+        conn.execute(SQL_CREATE_MIGRATIONS)
+        conn.execute(SQL_CREATE_CONFIG_VERSIONS)
+        conn.execute(SQL_CREATE_DRAFTS)
+        conn.execute(SQL_CREATE_DRAFTS_INDEX)
+        conn.execute(SQL_CREATE_DELETE_BATCHES)
+        # 旧库补上后来加入的列
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(survey_responses)')}
+        for column, column_type in (('config_version', 'TEXT'), ('test_run', 'TEXT'), ('delete_batch', 'INTEGER')):
+            if column not in columns:
+                conn.execute(f'ALTER TABLE survey_responses ADD COLUMN {column} {column_type}')
+        conn.execute(SQL_CREATE_RESPONSES_DELETED_INDEX)
+        conn.execute(SQL_CREATE_RESPONSES_TEST_RUN_INDEX)
+    migrate_normalized_answers(conn)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute(SQL_SELECT_COUNTER, (COUNTER_RESPONSES,)).fetchone() is None:
+            rebuild_aggregates(conn)
+        # 时间汇总表晚于聚合表加入，旧库按已有答卷回填一次
+        done = conn.execute(
+            'SELECT done FROM schema_migrations WHERE name = ?', (MIGRATION_TIME_ROLLUPS,)
+        ).fetchone()
+        if not (done and done[0]):
+            rebuild_time_rollups(conn)
+            conn.execute(
+                'INSERT OR REPLACE INTO schema_migrations (name, done) VALUES (?, 1)',
+                (MIGRATION_TIME_ROLLUPS,)
+            )
+
+
+def _answer_rows(response_id, answers):
+    """把一份答案展开为规范化行 (response_id, question_id, position, option)"""
+    return [
+        (response_id, question_id, position, option)
+        for question_id, value in answers.items()
+        if question_id not in NON_QUESTION_KEYS
+        for position, option in enumerate(answer_options(value))
+    ]
+
+
+def migrate_normalized_answers(conn, chunk_size=MIGRATION_CHUNK_SIZE):
+    """把 survey_responses.answers 中的 JSON 拆成 response_answers 行
+
+    每块答卷与迁移进度在同一事务中提交，进程中途退出后重新调用即可从断点继续。
+    """
+    while True:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                'SELECT last_id, done FROM schema_migrations WHERE name = ?',
+                (MIGRATION_NORMALIZE,)
+            ).fetchone()
+            if row is None:
+                conn.execute('INSERT INTO schema_migrations (name) VALUES (?)', (MIGRATION_NORMALIZE,))
+                last_id, done = 0, 0
+            else:
+                last_id, done = row
+            if done:
+                return
+            rows = conn.execute(
+                'SELECT id, answers FROM survey_responses WHERE id > ? ORDER BY id LIMIT ?',
+                (last_id, chunk_size)
+            ).fetchall()
+            for response_id, answers_json in rows:
+                conn.execute(SQL_DELETE_ANSWERS, (response_id,))
+                conn.executemany(SQL_INSERT_ANSWER, _answer_rows(response_id, json.loads(answers_json)))
+            if rows:
+                conn.execute(
+                    'UPDATE schema_migrations SET last_id = ? WHERE name = ?',
+                    (rows[-1][0], MIGRATION_NORMALIZE)
+                )
+            else:
+                conn.execute(
+                    'UPDATE schema_migrations SET done = 1 WHERE name = ?',
+                    (MIGRATION_NORMALIZE,)
+                )
+
+
+def answer_options(value):
+    """把一个答案拆成被选中的选项列表：多选为列表，单选为字符串"""
+    if isinstance(value, list):
+        return [str(opt) for opt in value if opt]
+    if isinstance(value, str) and value:
+        return [value]
+    return []
+
+
+def _apply_answer_counts(conn, answers):
+    """按一份新答案累加聚合计数"""
+    conn.executemany(SQL_ADD_OPTION_COUNT, [
+        (question_id, option, 1)
+        for question_id, value in answers.items()
+        if question_id not in NON_QUESTION_KEYS
+        for option in answer_options(value)
+    ])
+    conn.execute(SQL_ADD_COUNTER, (COUNTER_RESPONSES, 1))
+
+
+def _apply_time_rollups(conn, response_id, delta):
+    """按一份答卷增减时间汇总：写入后 delta=1，删除前 delta=-1"""
+    conn.execute(SQL_ADD_SUBMISSION_ROLLUPS, (delta, response_id, delta, response_id))
+    conn.execute(SQL_ADD_OPTION_DAILY_COUNTS, (delta, response_id))
+
+
+def rebuild_aggregates(conn):
+    """根据规范化答案表重新计算聚合表（在调用方事务中执行）"""
+    conn.execute('DELETE FROM option_counts')
+    conn.execute(f'''INSERT INTO option_counts (question_id, option, count)
+                     SELECT question_id, option, COUNT(*)
+                     FROM response_answers
+                     WHERE response_id NOT IN (SELECT id FROM survey_responses WHERE {SQL_TOMBSTONE})
+                     GROUP BY question_id, option''')
+    conn.execute('DELETE FROM survey_counters WHERE name = ?', (COUNTER_RESPONSES,))
+    conn.execute(f'''INSERT INTO survey_counters (name, value)
+                     SELECT ?, COUNT(*) FROM survey_responses WHERE {SQL_LIVE}''', (COUNTER_RESPONSES,))
+
+
+def rebuild_time_rollups(conn):
+    """根据答卷重新计算时间汇总表（在调用方事务中执行）"""
+    conn.execute('DELETE FROM submission_rollups')
+    conn.execute(f'''INSERT INTO submission_rollups (granularity, bucket, count)
+                     SELECT '{ROLLUP_HOUR}', {SQL_HOUR_BUCKET}, COUNT(*) FROM survey_responses WHERE {SQL_LIVE} GROUP BY 2
+                     UNION ALL
+                     SELECT '{ROLLUP_DAY}', {SQL_DAY_BUCKET}, COUNT(*) FROM survey_responses WHERE {SQL_LIVE} GROUP BY 2''')
+    conn.execute('DELETE FROM option_daily_counts')
+    conn.execute(f'''INSERT INTO option_daily_counts (day, question_id, option, count)
+                     SELECT {SQL_DAY_BUCKET.replace("submit_time", "r.submit_time")}, a.question_id, a.option, COUNT(*)
+                     FROM response_answers a
+                     JOIN survey_responses r ON r.id = a.response_id
+                     WHERE r.{SQL_LIVE}
+                     GROUP BY 1, 2, 3''')
+
+
+@st.cache_resource
+def get_pool(db_file=DB_FILE):
+    """每个进程、每个数据库文件只创建一个连接池，各池共享进程级连接额度"""
+    pool = ConnectionPool(db_file, budget=BUDGET)
+    with pool.connection() as conn:
+        init_schema(conn)
+    return pool
+
+
+def write_response(conn, answers, submit_time, config_version=None, test_run=None):
+    """在调用方的事务中写入一条问卷答案，返回新记录 id
+
+    config_version 为作答时使用的问卷配置版本，test_run 为测试批次标记（正式答卷为 None）。
+    """
+    # 将答案字典转换为JSON字符串存储
+    answers_json = json.dumps(answers, ensure_ascii=False)
+    response_id = conn.execute(SQL_INSERT_RESPONSE, (submit_time, answers_json, config_version, test_run)).lastrowid
+    conn.executemany(SQL_INSERT_ANSWER, _answer_rows(response_id, answers))
+    _apply_answer_counts(conn, answers)
+    _apply_time_rollups(conn, response_id, 1)
+    conn.execute(SQL_ADD_COUNTER, (COUNTER_DATA_VERSION, 1))
+    return response_id
+
+
+def hour_bucket(submit_time):
+    """与 SQL_HOUR_BUCKET 相同的小时桶"""
+    return submit_time[:13] + ":00"
+
+
+def day_bucket(submit_time):
+    """与 SQL_DAY_BUCKET 相同的日期桶"""
+    return submit_time[:10]
+
+
+def write_responses(conn, rows):
+    """在调用方的（IMMEDIATE）事务中批量写入答卷，返回写入条数
+
+    rows 为 [(answers, submit_time, config_version), ...]，可再带第四项测试批次标记。id 预先分配，
+    答卷、规范化答案与各汇总表的增量都在 Python 中合并后用 executemany 一次写入。
+    """
+    base = conn.execute(SQL_LAST_RESPONSE_ID).fetchone()[0]
+    response_rows = []
+    answer_rows = []
+    option_counts = Counter()
+    rollups = Counter()
+    daily_counts = Counter()
+    for response_id, (answers, submit_time, config_version, *test_run) in enumerate(rows, start=base + 1):
+        response_rows.append((
+            response_id, submit_time, json.dumps(answers, ensure_ascii=False), config_version,
+            test_run[0] if test_run else None
+        ))
+        normalized = _answer_rows(response_id, answers)
+        answer_rows.extend(normalized)
+        day = day_bucket(submit_time)
+        rollups[(ROLLUP_HOUR, hour_bucket(submit_time))] += 1
+        rollups[(ROLLUP_DAY, day)] += 1
+        for _, question_id, _, option in normalized:
+            option_counts[(question_id, option)] += 1
+            daily_counts[(day, question_id, option)] += 1
+    if not response_rows:
+        return 0
+    conn.executemany(SQL_INSERT_RESPONSE_WITH_ID, response_rows)
+    conn.executemany(SQL_INSERT_ANSWER, answer_rows)
+    conn.executemany(SQL_ADD_OPTION_COUNT, [key + (count,) for key, count in option_counts.items()])
+    conn.executemany(SQL_ADD_SUBMISSION_ROLLUP, [key + (count,) for key, count in rollups.items()])
+    conn.executemany(SQL_ADD_OPTION_DAILY_COUNT, [key + (count,) for key, count in daily_counts.items()])
+    conn.execute(SQL_ADD_COUNTER, (COUNTER_RESPONSES, len(response_rows)))
+    conn.execute(SQL_ADD_COUNTER, (COUNTER_DATA_VERSION, 1))
+    return len(response_rows)
+
+
+def iter_stored_answers(conn, batch_size=MIGRATION_CHUNK_SIZE):
+    """逐批读出已存答卷的答案字典（用于导入去重，已删除的答卷不算）"""
+    cursor = conn.execute(f'SELECT answers FROM survey_responses WHERE {SQL_LIVE}')
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        for (answers_json,) in rows:
+            yield json.loads(answers_json)
+
+
+def insert_response(db_file, answers, submit_time, config_version=None, test_run=None):
+    """插入一条问卷答案（单独一个事务），返回新记录 id"""
+    with get_pool(db_file).connection() as conn:
+        with conn:
+            return write_response(conn, answers, submit_time, config_version, test_run)
+
+
+def record_config_version(db_file, version, questions_json):
+    """存档一个问卷配置版本（已存在则忽略）"""
+    with get_pool(db_file).connection() as conn:
+        with conn:
+            conn.execute(SQL_INSERT_CONFIG_VERSION, (version, questions_json))
+
+
+def fetch_config_version(db_file, version):
+    """读取存档的问卷配置版本（题目 JSON 文本），不存在时返回 None"""
+    with get_pool(db_file).connection() as conn:
+        row = conn.execute(SQL_SELECT_CONFIG_VERSION, (version,)).fetchone()
+    return row[0] if row else None
+
+
+def _hours_ago(hours):
+    return f"-{int(hours)} hours"
+
+
+def save_draft(db_file, token, config_version, current_question, answers, other_inputs):
+    """保存（覆盖）一个作答草稿"""
+    with get_pool(db_file).connection() as conn:
+        with conn:
+            conn.execute(SQL_UPSERT_DRAFT, (
+                token, config_version, current_question,
+                json.dumps(answers, ensure_ascii=False),
+                json.dumps(other_inputs, ensure_ascii=False),
+            ))
+
+
+def load_draft(db_file, token, ttl_hours=DRAFT_TTL_HOURS):
+    """读取未过期的草稿，返回 dict，不存在时返回 None"""
+    with get_pool(db_file).connection() as conn:
+        row = conn.execute(SQL_SELECT_DRAFT, (token, _hours_ago(ttl_hours))).fetchone()
+    if row is None:
+        return None
+    with perf.timed("json_decode"):
+        return {
+            "config_version": row[0],
+            "current_question": row[1],
+            "answers": json.loads(row[2]),
+            "other_inputs": json.loads(row[3]),
+        }
+
+
+def delete_draft(db_file, token):
+    """提交后删除草稿"""
+    with get_pool(db_file).connection() as conn:
+        with conn:
+            conn.execute(SQL_DELETE_DRAFT, (token,))
+
+
+def purge_expired_drafts(db_file, ttl_hours=DRAFT_TTL_HOURS):
+    """清理过期草稿（走 updated_at 索引），返回清理条数"""
+    with get_pool(db_file).connection() as conn:
+        with conn:
+            return conn.execute(SQL_PURGE_DRAFTS, (_hours_ago(ttl_hours),)).rowcount
+
+
+def _quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _response_filter(after=None, submit_from=None, submit_to=None, question_id=None, option=None,
+                     test_run=None, record_ids=None):
+    """构造 survey_responses 的 WHERE 子句与参数（只含未删除的答卷）
+
+    after 为上一页最后一行的 (created_at, id) 游标，按 (created_at, id) 降序翻页；
+    submit_from / submit_to 为提交时间闭区间（"YYYY-MM-DD HH:MM:SS" 字符串）；
+    question_id + option 筛选该题选了该选项的答卷（走 (question_id, option) 索引）；
+    test_run 为测试批次标记，ANY_TEST_RUN 表示任意测试答卷；
+    record_ids 为 id 列表，整体作为一个 JSON 参数传入，没有参数个数上限。
+    """
+    clauses = [SQL_LIVE]
+    params = []
+    if after is not None:
+        clauses.append("(created_at, id) < (?, ?)")
+        params.extend(after)
+    if submit_from is not None:
+        clauses.append("submit_time >= ?")
+        params.append(submit_from)
+    if submit_to is not None:
+        clauses.append("submit_time <= ?")
+        params.append(submit_to)
+    if (question_id is None) != (option is None):
+        raise ValueError("按答案筛选需要同时给出题目与选项")
+    if question_id is not None:
+        clauses.append("id IN (SELECT response_id FROM response_answers WHERE question_id = ? AND option = ?)")
+        params.extend((question_id, option))
+    if test_run is ANY_TEST_RUN:
+        clauses.append("test_run IS NOT NULL")
+    elif test_run is not None:
+        clauses.append("test_run = ?")
+        params.append(test_run)
+    if record_ids is not None:
+        clauses.append("id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps([int(rid) for rid in record_ids]))
+    return "WHERE " + " AND ".join(clauses), params
+
+
+def _ordered_options(value):
+    """拆分 fetch_responses_frame 拼接的多选答案，按作答顺序返回选项列表"""
+    parts = value.split(MULTI_SEPARATOR)
+    parts.sort()
+    return [part[POSITION_WIDTH + 1:] for part in parts]
+
+
+def fetch_responses_frame(db_file, questions, after=None, limit=None,
+                          submit_from=None, submit_to=None):
+    """在 SQL 中按题透视规范化答案，返回每份答卷一行的 DataFrame
+
+    questions 为题目配置列表；单选题列为字符串，多选题列为选项列表。
+    先在 (created_at, id) 索引上筛出本页答卷，再只为这些答卷透视答案，
+    因此分页查询的耗时与总行数无关。
+    """
+    columns = []
+    params = []
+    for q in questions:
+        if q['type'] == 'multi':
+            columns.append(
+                f"group_concat(printf('%0{POSITION_WIDTH}d', a.position) || char(30) || a.option, char(31)) "
+                f"FILTER (WHERE a.question_id = ?) "
+                f"AS {_quote_identifier(q['id'])}"
+            )
+        else:
+            columns.append(
+                f"MAX(CASE WHEN a.question_id = ? THEN a.option END) AS {_quote_identifier(q['id'])}"
+            )
+        params.append(q['id'])
+    where, filter_params = _response_filter(after, submit_from, submit_to)
+    limit_sql = "LIMIT ?" if limit is not None else ""
+    params.extend(filter_params)
+    if limit is not None:
+        params.append(limit)
+    select_list = ",\n                        ".join(["r.id", "r.submit_time", "r.created_at", "r.config_version"] + columns)
+    sql = f'''SELECT {select_list}
+                 FROM (SELECT id, submit_time, created_at, config_version
+                       FROM survey_responses
+                       {where}
+                       ORDER BY created_at DESC, id DESC
+                       {limit_sql}) r
+                 LEFT JOIN response_answers a ON a.response_id = r.id
+                 GROUP BY r.id
+                 ORDER BY r.created_at DESC, r.id DESC'''
+    with get_pool(db_file).connection() as conn:
+        df = pd.read_sql_query(sql, conn, params=params)
+    with perf.timed("dataframe_build"):
+        for q in questions:
+            if q['type'] == 'multi':
+                df[q['id']] = [
+                    _ordered_options(value) if isinstance(value, str) else []
+                    for value in df[q['id']]
+                ]
+    return df
+
+
+def fetch_response_ids(db_file, **filters):
+    """按筛选条件（见 _response_filter）查出答卷 id 列表"""
+    where, params = _response_filter(**filters)
+    with get_pool(db_file).connection() as conn:
+        rows = conn.execute(f'SELECT id FROM survey_responses {where} ORDER BY id', params).fetchall()
+    return [row[0] for row in rows]
+
+
+def count_responses(db_file, **filters):
+    """符合筛选条件（见 _response_filter）的答卷数，用于删除前预览"""
+    where, params = _response_filter(**filters)
+    with get_pool(db_file).connection() as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM survey_responses {where}', params).fetchone()[0]
+
+
+def fetch_test_runs(db_file):
+    """现有答卷中出现过的测试批次标记（走部分索引）"""
+    with get_pool(db_file).connection() as conn:
+        rows = conn.execute(f'''SELECT DISTINCT test_run FROM survey_responses
+                                WHERE test_run IS NOT NULL AND {SQL_LIVE}
+                                ORDER BY test_run''').fetchall()
+    return [row[0] for row in rows]
+
+
+def fetch_answer_groups(db_file):
+    """按 (题目, 选项) 分组读取选择了该选项的答卷 id，供交叉分析编码
+
+    在 (question_id, option) 覆盖索引上分组并用 group_concat 拼接 id，
+    传回 Python 的只有几十行，而不是逐条答案。
+    返回 (全部答卷 id 升序数组, [(question_id, option, id 数组), ...])。
+    """
+    with get_pool(db_file).connection() as conn:
+        response_ids = np.array(
+            [row[0] for row in conn.execute(f'SELECT id FROM survey_responses WHERE {SQL_LIVE} ORDER BY id')],
+            dtype=np.int64
+        )
+        # 已删除答卷的答案行在清理前仍在表中，分组里会带上它们的 id；
+        # 它们不在 response_ids 中，编码时（analytics.encode_responses）会被忽略，这里不逐行排除
+        groups = [
+            (question_id, option, np.fromstring(ids, dtype=np.int64, sep=','))
+            for question_id, option, ids in conn.execute('''SELECT question_id, option, group_concat(response_id)
+                                                            FROM response_answers
+                                                            GROUP BY question_id, option''')
+        ]
+    return response_ids, groups
+
+
+def fetch_latest_submit_time(db_file):
+    """最新的提交时间（沿 submit_time 索引倒序找第一份未删除的答卷）"""
+    with get_pool(db_file).connection() as conn:
+        row = conn.execute(
+            f'SELECT submit_time FROM survey_responses WHERE {SQL_LIVE} ORDER BY submit_time DESC LIMIT 1'
+        ).fetchone()
+    return row[0] if row else None
+
+
+def fetch_submission_series(db_file, granularity=ROLLUP_DAY, start=None, end=None):
+    """按小时或按天的提交量，返回 DataFrame[bucket, count]（只含有提交的时段，按时间升序）
+
+    start / end 为桶的闭区间（与 bucket 同格式的字符串）。
+    """
+    where, params = ["granularity = ?"], [granularity]
+    if start is not None:
+        where.append("bucket >= ?")
+        params.append(start)
+    if end is not None:
+        where.append("bucket <= ?")
+        params.append(end)
+    with get_pool(db_file).connection() as conn:
+        return pd.read_sql_query(
+            f'SELECT bucket, count FROM submission_rollups WHERE {" AND ".join(where)} ORDER BY bucket',
+            conn, params=params
+        )
+
+
+def fetch_option_trend(db_file, question_id, start=None, end=None):
+    """一道题每天各选项的选择次数，返回 DataFrame[day, option, count]（按日期升序）"""
+    where, params = ["question_id = ?"], [question_id]
+    if start is not None:
+        where.append("day >= ?")
+        params.append(start)
+    if end is not None:
+        where.append("day <= ?")
+        params.append(end)
+    with get_pool(db_file).connection() as conn:
+        return pd.read_sql_query(
+            f'SELECT day, option, count FROM option_daily_counts WHERE {" AND ".join(where)} ORDER BY day',
+            conn, params=params
+        )
+
+
+def fetch_option_counts(db_file):
+    """读取聚合计数，返回 {question_id: {option: count}}，每题内按次数降序"""
+    counts = {}
+    with get_pool(db_file).connection() as conn:
+        for question_id, option, count in conn.execute(SQL_SELECT_OPTION_COUNTS):
+            counts.setdefault(question_id, {})[option] = count
+    return counts
+
+
+def fetch_counter(db_file, name):
+    """读取一个全局计数器，不存在时为 0"""
+    with get_pool(db_file).connection() as conn:
+        row = conn.execute(SQL_SELECT_COUNTER, (name,)).fetchone()
+    return row[0] if row else 0
+
+
+def fetch_response_count(db_file):
+    """读取总提交数"""
+    return fetch_counter(db_file, COUNTER_RESPONSES)
+
+
+def fetch_data_version(db_file):
+    """读取数据版本号（主键点查，开销可忽略）"""
+    return fetch_counter(db_file, COUNTER_DATA_VERSION)
+
+
+def _apply_batch_aggregates(conn, batch_id, delta):
+    """按一批答卷整体增减聚合计数与时间汇总：删除时 delta=-1，撤销时 delta=1"""
+    conn.execute(SQL_CREATE_BATCH_OPTION_DAYS)
+    conn.execute('DELETE FROM temp.batch_option_days')
+    conn.execute(SQL_FILL_BATCH_OPTION_DAYS, (batch_id,))
+    conn.execute(SQL_ADD_BATCH_OPTION_DAILY_COUNTS, (delta,))
+    conn.execute(SQL_ADD_BATCH_OPTION_COUNTS, (delta,))
+    conn.execute(SQL_ADD_BATCH_SUBMISSION_ROLLUPS, (delta, batch_id, delta, batch_id))
+    conn.execute(SQL_PRUNE_OPTION_COUNTS)
+    for sql in SQL_PRUNE_ROLLUPS:
+        conn.execute(sql)
+
+
+def delete_responses(db_file, record_ids=None, description="", **filters):
+    """软删除符合条件的答卷（按 id 列表和 / 或筛选条件，见 _response_filter），返回 (批次 id, 删除条数)
+
+    一条 UPDATE 给答卷打上批次标记，聚合计数与时间汇总按整批在 SQL 中扣减，
+    不逐条执行，也不改写答卷所在的页；没有符合条件的答卷时返回 (None, 0)。
+    """
+    if record_ids is None and all(value is None for value in filters.values()):
+        raise ValueError("删除答卷需要 id 列表或至少一个筛选条件")
+    where, params = _response_filter(record_ids=record_ids, **filters)
+    with get_pool(db_file).connection() as conn:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            batch_id = conn.execute(
+                'INSERT INTO delete_batches (description) VALUES (?)', (description,)
+            ).lastrowid
+            deleted = conn.execute(
+                f'UPDATE survey_responses SET delete_batch = ? {where}', [batch_id] + params
+            ).rowcount
+            if deleted == 0:
+                conn.execute('DELETE FROM delete_batches WHERE id = ?', (batch_id,))
+                return None, 0
+            conn.execute('UPDATE delete_batches SET count = ? WHERE id = ?', (deleted, batch_id))
+            _apply_batch_aggregates(conn, batch_id, -1)
+            conn.execute(SQL_ADD_COUNTER, (COUNTER_RESPONSES, -deleted))
+            conn.execute(SQL_ADD_COUNTER, (COUNTER_DATA_VERSION, 1))
+    return batch_id, deleted
+
+
+def restore_responses(db_file, batch_id):
+    """撤销一次删除（批次尚未被清理时），返回恢复条数"""
+    with get_pool(db_file).connection() as conn:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            _apply_batch_aggregates(conn, batch_id, 1)
+            restored = conn.execute(
+                'UPDATE survey_responses SET delete_batch = NULL WHERE delete_batch = ?', (batch_id,)
+            ).rowcount
+            conn.execute('DELETE FROM delete_batches WHERE id = ?', (batch_id,))
+            if restored:
+                conn.execute(SQL_ADD_COUNTER, (COUNTER_RESPONSES, restored))
+                conn.execute(SQL_ADD_COUNTER, (COUNTER_DATA_VERSION, 1))
+    return restored
+
+
+def fetch_delete_batches(db_file):
+    """尚未清理（可撤销）的删除批次，最近的在前"""
+    with get_pool(db_file).connection() as conn:
+        rows = conn.execute(
+            'SELECT id, description, count, deleted_at FROM delete_batches ORDER BY id DESC'
+        ).fetchall()
+    return [
+        {"id": batch_id, "description": description, "count": count, "deleted_at": deleted_at}
+        for batch_id, description, count, deleted_at in rows
+    ]
+
+
+def purge_deleted_responses(db_file, retention_hours=DELETE_RETENTION_HOURS, chunk_size=PURGE_CHUNK_SIZE):
+    """物理删除超过保留期的已删除答卷，返回删除条数
+
+    聚合在软删除时已经扣减过，这里只删除答卷与规范化答案行，不改变数据版本；
+    每块 chunk_size 份一个短事务，写入队列在两块之间即可拿到写锁。
+    """
+    purged = 0
+    pool = get_pool(db_file)
+    with pool.connection() as conn:
+        batch_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM delete_batches WHERE deleted_at < datetime('now', ?)", (_hours_ago(retention_hours),)
+        )]
+    for batch_id in batch_ids:
+        while True:
+            with pool.connection() as conn:
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    ids = json.dumps([row[0] for row in conn.execute(
+                        f'{SQL_BATCH_RESPONSES} LIMIT ?', (batch_id, chunk_size)
+                    )])
+                    conn.execute('DELETE FROM response_answers WHERE response_id IN (SELECT value FROM json_each(?))', (ids,))
+                    count = conn.execute('DELETE FROM survey_responses WHERE id IN (SELECT value FROM json_each(?))', (ids,)).rowcount
+                    if count == 0:
+                        conn.execute('DELETE FROM delete_batches WHERE id = ?', (batch_id,))
+            purged += count
+            if count == 0:
+                break
+    return purged
+
+
+def incremental_vacuum(db_file, pages=VACUUM_STEP_PAGES, pause=VACUUM_STEP_PAUSE):
+    """把空闲页分步归还给文件系统，返回回收的页数
+
+    只对 auto_vacuum=INCREMENTAL 的库有效（新建的库默认如此，旧库需先执行一次 convert_to_incremental）；
+    每步一个短写事务，步间暂停让出写锁，不会像整库 VACUUM 那样长时间阻塞提交。
+    """
+    reclaimed = 0
+    with get_pool(db_file).connection() as conn:
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            return 0
+        while True:
+            free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if free == 0:
+                break
+            # incremental_vacuum 每回收一页需要执行一步，execute 只执行第一步，executescript 才会执行完
+            conn.executescript(f'PRAGMA incremental_vacuum({min(int(pages), free)});')
+            reclaimed += free - conn.execute('PRAGMA freelist_count').fetchone()[0]
+            time.sleep(pause)
+        conn.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchall()
+    return reclaimed
+
+
+def convert_to_incremental(db_file):
+    """把旧库（auto_vacuum=NONE）转为增量回收模式：需要一次整库 VACUUM，期间提交会等待"""
+    with get_pool(db_file).connection() as conn:
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('VACUUM')
+        return conn.execute('PRAGMA auto_vacuum').fetchone()[0] == AUTO_VACUUM_INCREMENTAL
@@ -0,0 +1,52 @@
+"""多问卷托管：按 URL 参数 ?survey=<名称> 选择问卷，每份问卷有独立的配置文件与数据库
+
+surveys/<名称>.json 为问卷配置（格式同 survey_config.json，各自的标题、密码、缓存上限），
+答卷写入 surveys/<名称>.db。不带参数时使用根目录的 survey_config.json 与 survey_data.db，
+单问卷部署不受影响。同一进程内各问卷共享连接额度（storage.BUDGET）与读缓存（按问卷分区）。
+"""
+import os
+import re
+
+import backends
+import config
+import storage
+
+# URL 中选择问卷的参数名
+SURVEY_PARAM = "survey"
+
+# 托管问卷的配置与数据库所在目录
+SURVEY_DIR = "surveys"
+
+# 问卷名称的最大长度：加上 schema 前缀后不能超过 PostgreSQL 标识符上限（名称只含 ASCII，字符数即字节数）
+SLUG_MAX_LENGTH = backends.PG_IDENTIFIER_MAX - len(backends.PG_SCHEMA_PREFIX)
+
+# 问卷名称：只允许字母、数字、下划线和短横线，避免拼出目录外的路径
+SLUG_PATTERN = re.compile(rf"[A-Za-z0-9_-]{{1,{SLUG_MAX_LENGTH}}}")
+
+
+class Tenant:
+    """一份托管的问卷：名称（默认问卷为 None）、配置文件与数据库文件"""
+
+    def __init__(self, slug, config_file, db_file):
+        self.slug = slug
+        self.config_file = config_file
+        self.db_file = db_file
+
+    def __repr__(self):
+        return f"Tenant({self.slug!r}, {self.config_file!r}, {self.db_file!r})"
+
+
+DEFAULT_TENANT = Tenant(None, config.CONFIG_FILE, storage.DB_FILE)
+
+
+def resolve(slug, survey_dir=SURVEY_DIR):
+    """按 URL 参数找到问卷；未指定时为默认问卷，名称不合法或配置文件不存在时返回 None"""
+    if not slug:
+        return DEFAULT_TENANT
+    if not SLUG_PATTERN.fullmatch(slug):
+        return None
+    config_file = os.path.join(survey_dir, f"{slug}.json")
+    if not os.path.isfile(config_file):
+        return None
+    return Tenant(slug, config_file, os.path.join(survey_dir, f"{slug}.db"))
+
@@ -0,0 +1,42 @@
+"""测试公共夹具：把仓库根目录加入导入路径，提供问卷题目与临时 SQLite 库"""
+import json
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import storage  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def questions():
+    with open(os.path.join(ROOT, "survey_config.json"), "r", encoding="utf-8") as f:
+        return json.load(f)["questions"]
+
+
+def make_answers(questions, rng, day=1):
+    """按题目随机生成一份答案（多选 0~3 项），提交时间落在 2026-01-<day>"""
+    answers = {}
+    for q in questions:
+        if q['type'] == 'single':
+            answers[q['id']] = rng.choice(q['options'])
+        else:
+            answers[q['id']] = rng.sample(q['options'], rng.randint(0, min(3, len(q['options']))))
+    answers['submit_time'] = f"2026-01-{day:02d} {rng.randint(0, 23):02d}:00:00"
+    return answers
+
+
+@pytest.fixture
+def rng():
+    return random.Random(0)
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "survey.db")
+    yield path
+    storage.get_pool(path).close_all()
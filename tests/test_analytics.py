@@ -0,0 +1,89 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analytics
+
+# scipy.stats.chi2_contingency(table, correction=False) 的结果：(chi2, 自由度, p 值)
+CHI_SQUARE_CASES = [
+    ([[10, 20], [30, 40]], 0.7936507936507936, 1, 0.37299848361348686),
+    ([[12, 5, 9], [3, 18, 7]], 12.94150441949355, 2, 0.001548060828412087),
+    ([[20, 15, 30], [25, 25, 10], [5, 30, 40]], 33.66849816849817, 4, 8.714316789704772e-07),
+    ([[120, 3], [2, 95]], 200.22225992834507, 1, 1.8677981382982862e-45),
+    ([[5, 8, 2, 9, 4], [7, 3, 6, 2, 8], [9, 9, 1, 4, 3], [2, 6, 8, 7, 5]], 23.66188626443397, 12, 0.02260431920637559),
+]
+
+# scipy.special.gammaincc(a, x)：覆盖级数（x < a + 1）与连分式两个分支
+UPPER_GAMMA_CASES = [
+    (0.5, 0.1, 0.6547208460185768),
+    (0.5, 3.0, 0.014305878435429641),
+    (1, 1, 0.36787944117144245),
+    (2.5, 0.7, 0.924313272801667),
+    (3, 10, 0.0027693957155115775),
+    (10, 5, 0.9681719426937951),
+    (10, 25, 0.0002214766382487835),
+    (50, 45, 0.7531979655998298),
+    (0.5, 30, 9.485737571073857e-15),
+]
+
+
+@pytest.mark.parametrize("table, statistic, dof, p_value", CHI_SQUARE_CASES)
+def test_chi_square_matches_scipy(table, statistic, dof, p_value):
+    result = analytics.chi_square(pd.DataFrame(table))
+    assert result[0] == pytest.approx(statistic, rel=1e-12)
+    assert result[1] == dof
+    assert result[2] == pytest.approx(p_value, rel=1e-9)
+
+
+@pytest.mark.parametrize("a, x, expected", UPPER_GAMMA_CASES)
+def test_upper_gamma_matches_scipy(a, x, expected):
+    assert analytics._upper_gamma_regularized(a, x) == pytest.approx(expected, rel=1e-9)
+
+
+def test_upper_gamma_at_zero():
+    assert analytics._upper_gamma_regularized(2, 0) == 1.0
+
+
+def test_zero_rows_and_columns_are_ignored():
+    table = [[12, 0, 5, 9], [0, 0, 0, 0], [3, 0, 18, 7]]
+    assert analytics.chi_square(table) == pytest.approx(analytics.chi_square([[12, 5, 9], [3, 18, 7]]))
+
+
+@pytest.mark.parametrize("table", [
+    [[4, 7, 1]],                 # 1 × N
+    [[4], [7], [1]],             # N × 1
+    [[0, 0], [0, 0]],            # 全零
+    [[5, 0], [3, 0]],            # 去掉全零列后只剩一列
+    np.zeros((0, 3)),            # 没有答卷
+])
+def test_degenerate_tables(table):
+    statistic, dof, p_value = analytics.chi_square(table)
+    assert math.isnan(statistic) and math.isnan(p_value)
+    assert dof == 0
+
+
+def test_crosstab_counts_multi_select_in_every_cell():
+    questions = [
+        {'id': 'role', 'type': 'single', 'options': ['教学', '科研']},
+        {'id': 'wish', 'type': 'multi', 'options': ['课件', '批改', '答疑']},
+    ]
+    response_ids = np.array([1, 2, 3, 4])
+    groups = [
+        ('role', '教学', np.array([1, 2])),
+        ('role', '科研', np.array([3, 4])),
+        ('wish', '课件', np.array([1, 2, 3])),
+        ('wish', '答疑', np.array([2, 4])),
+        ('wish', '其它：自动排课', np.array([4])),
+        ('wish', '批改', np.array([9])),  # 已删除的答卷不在 response_ids 中
+    ]
+    encoded = analytics.encode_responses(response_ids, groups, questions)
+    table = analytics.crosstab(encoded, 'role', 'wish')
+    assert list(table.columns) == ['课件', '批改', '答疑', analytics.OTHER_LABEL]
+    assert table.loc['教学'].tolist() == [2, 0, 1, 0]
+    assert table.loc['科研'].tolist() == [1, 0, 1, 1]
+
+    mask = analytics.filter_mask(encoded, 'wish', ['答疑'])
+    assert analytics.crosstab(encoded, 'role', 'wish', mask).loc['教学'].tolist() == [1, 0, 1, 0]
+    assert analytics.crosstab_percentages(table, "row").loc['科研'].tolist() == pytest.approx([100 / 3, 0, 100 / 3, 100 / 3])
@@ -0,0 +1,149 @@
+"""React 前端与接入接口的约定：constants.ts 中的题目与选项必须能通过 api.py 的校验"""
+import os
+import re
+import shutil
+
+import pytest
+
+pytest.importorskip("starlette")
+
+import api  # noqa: E402
+import config  # noqa: E402
+import metrics  # noqa: E402
+import surveys  # noqa: E402
+import writer  # noqa: E402
+from conftest import ROOT  # noqa: E402
+
+CONSTANTS_FILE = os.path.join(ROOT, "教学效率调研小助手", "constants.ts")
+
+QUESTION_PATTERN = re.compile(r"id: '(\w+)',.*?type: '(\w+)',\s*options: \[(.*?)\]", re.S)
+
+
+def client_questions():
+    """从 constants.ts 取出 [(题目 id, 题型, 选项列表)]"""
+    with open(CONSTANTS_FILE, "r", encoding="utf-8") as f:
+        source = f.read()
+    return [(question_id, kind, re.findall(r'"([^"]*)"', options))
+            for question_id, kind, options in QUESTION_PATTERN.findall(source)]
+
+
+@pytest.fixture(scope="module")
+def survey():
+    return config.read_config(os.path.join(ROOT, config.CONFIG_FILE))
+
+
+def test_client_questions_match_config(survey):
+    questions = client_questions()
+    assert [q[0] for q in questions] == [q['id'] for q in survey["questions"]]
+    for question_id, kind, options in questions:
+        configured = survey["by_id"][question_id]
+        assert kind == configured['type']
+        missing = [option for option in options if option not in configured['options']]
+        assert not missing, f"{question_id} 的选项不在配置中：{missing}"
+
+
+@pytest.mark.parametrize("pick", [0, -1])
+def test_client_submission_is_accepted(survey, pick):
+    """按 App.tsx 的 toSubmission 组装请求体：{answers: {题目 id: 答案}}"""
+    answers = {question_id: ([options[pick]] if kind == 'multi' else options[pick])
+               for question_id, kind, options in client_questions()}
+    normalized, errors = api._validate(survey, {"answers": answers})
+    assert errors == []
+    assert normalized == answers
+
+
+@pytest.fixture
+def tenant(tmp_path, db_file, monkeypatch):
+    """默认问卷指向临时目录中的配置副本与数据库"""
+    config_file = str(tmp_path / config.CONFIG_FILE)
+    shutil.copy(os.path.join(ROOT, config.CONFIG_FILE), config_file)
+    tenant = surveys.Tenant(None, config_file, db_file)
+    monkeypatch.setattr(surveys, "DEFAULT_TENANT", tenant)
+    monkeypatch.setattr(api, "_services", {})
+    yield tenant
+    writer.get_writer(db_file).close()
+    for gauge in (metrics.RESPONSE_ROWS, metrics.STORAGE_SIZE):
+        gauge.remove(survey=metrics.DEFAULT_SURVEY_LABEL)
+
+
+def make_client(tenant, middleware=None):
+    pytest.importorskip("httpx")
+    from starlette.applications import Starlette
+    from starlette.testclient import TestClient
+
+    if middleware is None:
+        return TestClient(api.app)
+    return TestClient(Starlette(routes=api.app.routes, middleware=middleware, lifespan=api._lifespan))
+
+
+@pytest.fixture
+def client(tenant):
+    with make_client(tenant) as client:
+        yield client
+
+
+def submission(survey, pick=0):
+    return {"answers": {q['id']: [q['options'][pick]] if q['type'] == 'multi' else q['options'][pick]
+                        for q in survey["questions"]}}
+
+
+def test_post_responses_and_metrics(client, survey):
+    response = client.post("/responses", json=[submission(survey, 0), submission(survey, -1)])
+    assert response.status_code == 201
+    body = response.json()
+    assert len(body["ids"]) == 2
+    assert body["config_version"] == survey["version"]
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'survey_responses{survey="default",backend="sqlite"} 2' in response.text
+    assert 'survey_submissions_total{result="success"}' in response.text
+
+
+def test_invalid_items_are_reported_one_by_one(client, survey):
+    first = survey["questions"][0]
+    bad = submission(survey)
+    bad["answers"][first['id']] = "不存在的选项"
+    response = client.post("/responses", json={"responses": [submission(survey), bad, {"answers": {}}]})
+    assert response.status_code == 422
+    errors = response.json()["errors"]
+    assert [error["index"] for error in errors] == [1, 2]
+    assert all(error["errors"] for error in errors)
+    # 整批不写入
+    assert 'survey_responses{survey="default",backend="sqlite"} 0' in client.get("/metrics").text
+
+
+def test_commit_timeout_returns_504(client, survey, monkeypatch):
+    def timeout(future, timeout=None):
+        raise writer.CommitTimeoutError()
+
+    monkeypatch.setattr(writer, "wait_result", timeout)
+    response = client.post("/responses", json=submission(survey))
+    assert response.status_code == 504
+    assert response.json()["error"] == str(writer.CommitTimeoutError())
+
+
+def test_cors_preflight(tenant, monkeypatch):
+    origin = "http://localhost:3000"
+    monkeypatch.setenv(api.CORS_ORIGINS_ENV, f"{origin}, http://example.com")
+    with make_client(tenant, api._middleware()) as client:
+        response = client.options("/responses", headers={
+            "Origin": origin,
+            "Access-Control-Request-Method": "POST",
+            "Access-Control-Request-Headers": "Content-Type",
+        })
+        assert response.status_code == 200
+        assert response.headers["access-control-allow-origin"] == origin
+
+        response = client.options("/responses", headers={
+            "Origin": "http://evil.example",
+            "Access-Control-Request-Method": "POST",
+        })
+        assert response.status_code == 400
+        assert "access-control-allow-origin" not in response.headers
+
+
+def test_no_cors_without_origins(monkeypatch):
+    monkeypatch.delenv(api.CORS_ORIGINS_ENV, raising=False)
+    assert api._middleware() == []
@@ -0,0 +1,254 @@
+"""存储后端的同一组测试，分别在 SQLite 与 PostgreSQL 上运行
+
+PostgreSQL 用例需要环境变量 SURVEY_TEST_DATABASE_URL 指向一个可建 schema 的库，
+每个用例在独立的 schema 中运行、结束后删除；未设置或未安装 psycopg 时跳过。
+"""
+import os
+import uuid
+from collections import Counter
+
+import pytest
+
+import backends
+import storage
+from conftest import make_answers
+
+PG_DSN_ENV = "SURVEY_TEST_DATABASE_URL"
+
+SIZE = 40
+
+
+def pg_dsn():
+    dsn = os.environ.get(PG_DSN_ENV)
+    if not dsn:
+        pytest.skip(f"未设置 {PG_DSN_ENV}")
+    pytest.importorskip("psycopg_pool")
+    return dsn
+
+
+def open_pg(dsn, schema):
+    return backends.PostgresBackend(dsn, schema)
+
+
+def drop_pg(backend):
+    with backend.pool.connection() as conn:
+        conn.execute(f'DROP SCHEMA IF EXISTS "{backend.schema}" CASCADE')
+    backend.close()
+
+
+@pytest.fixture(params=[backends.BACKEND_SQLITE, backends.BACKEND_POSTGRES])
+def backend(request, db_file):
+    if request.param == backends.BACKEND_SQLITE:
+        yield backends.SQLiteBackend(db_file)
+        return
+    backend = open_pg(pg_dsn(), f"test_{uuid.uuid4().hex[:12]}")
+    yield backend
+    drop_pg(backend)
+
+
+def run_label(i):
+    if i % 5 == 0:
+        return "run-a"
+    if i % 7 == 0:
+        return "run-b"
+    return None
+
+
+@pytest.fixture
+def seeded(backend, questions, rng):
+    """写入 SIZE 份答卷（一份经 save，其余经 save_many），返回 {id: (answers, test_run)}"""
+    rows = []
+    for i in range(SIZE):
+        answers = make_answers(questions, rng, day=1 + i % 4)
+        rows.append((answers, answers['submit_time'], "v1", run_label(i)))
+    first_id = backend.save(*rows[0])
+    ids = [first_id] + backend.save_many(rows[1:])
+    assert len(set(ids)) == SIZE
+    return {record_id: (row[0], row[3]) for record_id, row in zip(ids, rows)}
+
+
+def expected_counts(responses):
+    counts = Counter()
+    for answers, _ in responses:
+        for question_id, value in answers.items():
+            if question_id not in storage.NON_QUESTION_KEYS:
+                counts.update((question_id, option) for option in storage.answer_options(value))
+    result = {}
+    for (question_id, option), count in counts.items():
+        result.setdefault(question_id, {})[option] = count
+    return result
+
+
+def assert_aggregates(backend, responses):
+    counts = backend.option_counts()
+    assert counts == expected_counts(responses)
+    for options in counts.values():
+        values = list(options.values())
+        assert values == sorted(values, reverse=True), "每题内应按次数降序"
+    assert backend.response_count() == len(responses)
+
+
+def test_save_updates_aggregates(backend, seeded):
+    assert_aggregates(backend, seeded.values())
+    assert backend.latest_submit_time() == max(answers['submit_time'] for answers, _ in seeded.values())
+    assert backend.test_runs() == ["run-a", "run-b"]
+    version = backend.data_version()
+    backend.save({}, "2026-02-01 00:00:00")
+    assert backend.data_version() > version
+
+
+def test_fetch_frame_pages_cover_every_row_once(backend, seeded, questions):
+    seen = []
+    after = None
+    while True:
+        page = backend.fetch_frame(questions, after=after, limit=7)
+        if page.empty:
+            break
+        keys = list(zip(page['created_at'], page['id']))
+        assert keys == sorted(keys, reverse=True)
+        seen.extend(page['id'])
+        last = page.iloc[-1]
+        after = (last['created_at'], int(last['id']))
+    assert sorted(seen) == sorted(seeded)
+    assert len(seen) == len(set(seen))
+
+    whole = backend.fetch_frame(questions)
+    row = whole[whole['id'] == min(seeded)].iloc[0]
+    answers, _ = seeded[min(seeded)]
+    for q in questions:
+        expected = storage.answer_options(answers[q['id']])
+        assert (row[q['id']] if q['type'] == 'multi' else [row[q['id']]]) == expected
+
+
+def test_fetch_frame_submit_range(backend, seeded, questions):
+    frame = backend.fetch_frame(questions, submit_from="2026-01-02 00:00:00", submit_to="2026-01-02 23:59:59")
+    expected = {rid for rid, (answers, _) in seeded.items() if answers['submit_time'].startswith("2026-01-02")}
+    assert set(frame['id']) == expected
+
+
+def filter_cases(seeded, questions):
+    """[(名称, 筛选条件, 期望匹配的 id 集合)]：每种筛选条件一个"""
+    single = next(q for q in questions if q['type'] == 'single')
+    multi = next(q for q in questions if q['type'] == 'multi')
+    first_answers, _ = seeded[min(seeded)]
+    single_option = first_answers[single['id']]
+    multi_option = next(
+        (answers[multi['id']][0] for answers, _ in seeded.values() if answers[multi['id']]), None
+    )
+    some_ids = sorted(seeded)[::3]
+    return [
+        ("date", {"submit_from": "2026-01-03 00:00:00", "submit_to": "2026-01-04 23:59:59"},
+         {rid for rid, (a, _) in seeded.items() if a['submit_time'] >= "2026-01-03"}),
+        ("single_answer", {"question_id": single['id'], "option": single_option},
+         {rid for rid, (a, _) in seeded.items() if a[single['id']] == single_option}),
+        ("multi_answer", {"question_id": multi['id'], "option": multi_option},
+         {rid for rid, (a, _) in seeded.items() if multi_option in a[multi['id']]}),
+        ("test_run", {"test_run": "run-b"}, {rid for rid, (_, run) in seeded.items() if run == "run-b"}),
+        ("any_test_run", {"test_run": storage.ANY_TEST_RUN}, {rid for rid, (_, run) in seeded.items() if run}),
+        ("record_ids", {"record_ids": some_ids}, set(some_ids)),
+    ]
+
+
+@pytest.mark.parametrize("case", ["date", "single_answer", "multi_answer", "test_run", "any_test_run", "record_ids"])
+def test_count_delete_restore_by_filter(backend, seeded, questions, case):
+    _, filters, expected = next(c for c in filter_cases(seeded, questions) if c[0] == case)
+    assert expected, "测试数据应覆盖该筛选条件"
+    assert backend.count(**filters) == len(expected)
+    assert set(backend.fetch_ids(**filters)) == expected
+
+    record_ids = filters.pop("record_ids", None)
+    batch_id, deleted = backend.delete(record_ids, description=case, **filters)
+    assert deleted == len(expected)
+    remaining = {rid: value for rid, value in seeded.items() if rid not in expected}
+    assert_aggregates(backend, remaining.values())
+    assert set(backend.fetch_ids()) == set(remaining)
+    assert backend.count(**filters, record_ids=record_ids) == 0
+    assert [(b["id"], b["count"], b["description"]) for b in backend.delete_batches()] == [(batch_id, deleted, case)]
+
+    assert backend.restore(batch_id) == deleted
+    assert_aggregates(backend, seeded.values())
+    assert backend.delete_batches() == []
+
+
+def test_delete_guards(backend, seeded, questions):
+    with pytest.raises(ValueError):
+        backend.delete()
+    with pytest.raises(ValueError):
+        backend.count(question_id=questions[0]['id'])
+    assert backend.delete(record_ids=[]) == (None, 0)
+    assert backend.delete(test_run="no-such-run") == (None, 0)
+    assert backend.response_count() == SIZE
+
+
+def backdate_batches(backend, hours):
+    """把全部删除批次的时间提前 hours 小时（模拟保留期已过）"""
+    if backend.name == backends.BACKEND_SQLITE:
+        with storage.get_pool(backend.db_file).connection() as conn:
+            with conn:
+                conn.execute("UPDATE delete_batches SET deleted_at = datetime(deleted_at, ?)", (f"-{hours} hours",))
+    else:
+        with backend.pool.connection() as conn:
+            conn.execute('''UPDATE delete_batches SET deleted_at = to_char(
+                                deleted_at::timestamp - make_interval(hours => %s), 'YYYY-MM-DD HH24:MI:SS')''',
+                         (hours,))
+
+
+def test_purge_only_expired_batches(backend, seeded):
+    ids = sorted(seeded)
+    _, old = backend.delete(ids[:5])
+    backdate_batches(backend, 10)
+    recent_batch, _ = backend.delete(ids[5:8])
+    assert backend.purge_deleted(retention_hours=5) == old
+    assert [batch["id"] for batch in backend.delete_batches()] == [recent_batch]
+    assert backend.restore(recent_batch) == 3
+    assert backend.response_count() == SIZE - old
+    assert_aggregates(backend, [value for rid, value in seeded.items() if rid not in ids[:5]])
+
+
+def test_postgres_surveys_are_isolated(questions, rng):
+    dsn = pg_dsn()
+    settings = [backends.backend_settings({"storage": {"backend": "postgres", "dsn": dsn}}, survey=name)
+                for name in (f"a{uuid.uuid4().hex[:8]}", f"b{uuid.uuid4().hex[:8]}")]
+    assert settings[0] != settings[1]
+    first, second = (backends.open_backend(*setting) for setting in settings)
+    try:
+        answers = make_answers(questions, rng)
+        first.save(answers, answers['submit_time'])
+        assert first.response_count() == 1
+        assert second.response_count() == 0
+        assert second.option_counts() == {}
+        assert second.delete(test_run=storage.ANY_TEST_RUN) == (None, 0)
+        assert second.fetch_frame(questions).empty
+    finally:
+        drop_pg(first)
+        drop_pg(second)
+
+
+def test_multi_answers_keep_their_order(backend, questions):
+    multi = next(q for q in questions if q['type'] == 'multi')
+    chosen = list(reversed(multi['options']))
+    answers = {q['id']: (chosen if q is multi else [] if q['type'] == 'multi' else q['options'][0])
+               for q in questions}
+    answers['submit_time'] = "2026-01-01 00:00:00"
+    backend.save(answers, answers['submit_time'])
+    assert backend.fetch_frame(questions).iloc[0][multi['id']] == chosen
+
+
+def test_ordered_options_sorts_by_position():
+    # group_concat 的拼接顺序不受保证：打乱后仍按作答顺序（含两位数序号）还原
+    parts = [f"{position:0{storage.POSITION_WIDTH}d}{storage.POSITION_SEPARATOR}{option}"
+             for position, option in [(10, "丙"), (2, "乙"), (0, "甲")]]
+    assert storage._ordered_options(storage.MULTI_SEPARATOR.join(parts)) == ["甲", "乙", "丙"]
+
+
+def test_backend_interface_is_abstract():
+    assert backends.StorageBackend.__abstractmethods__
+    for backend_class in (backends.SQLiteBackend, backends.PostgresBackend):
+        assert not backend_class.__abstractmethods__, backend_class
+
+    class Incomplete(backends.StorageBackend):
+        def save(self, answers, submit_time, config_version=None, test_run=None):
+            return 1
+
+    with pytest.raises(TypeError, match="fetch_frame"):
+        Incomplete()
@@ -0,0 +1,41 @@
+"""基准套件的 pytest 入口：默认在 1k 规模上把每一项跑一遍（保证套件本身可用），
+设置 SURVEY_BENCHMARK=1 时按默认重复次数计时并与 benchmarks/baseline.json 比较，有退步即失败。
+"""
+import os
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import bench_suite  # noqa: E402
+
+BENCHMARK_ENV = "SURVEY_BENCHMARK"
+
+SIZE = 1000
+
+CASES = ("save", "load", "delete", "report", "encode", "crosstab")
+
+
+def checking():
+    return bool(os.environ.get(BENCHMARK_ENV))
+
+
+@pytest.fixture(scope="module")
+def results():
+    return bench_suite.run([SIZE], repeat=bench_suite.DEFAULT_REPEAT if checking() else 1)
+
+
+def test_every_case_is_timed(results):
+    assert sorted(results) == sorted(f"{case}@{SIZE}" for case in CASES)
+    assert all(timing.median > 0 for timing in results.values())
+
+
+def test_no_regression_against_baseline(results):
+    if not checking():
+        pytest.skip(f"未设置 {BENCHMARK_ENV}")
+    baseline = bench_suite.load_baseline()
+    assert all(name in baseline for name in results), "基线缺少 1k 规模的项目，先运行 bench_suite.py --save"
+    assert bench_suite.compare(results, baseline, bench_suite.DEFAULT_TOLERANCE) == []
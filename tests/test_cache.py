@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+import cache
+
+
+class Clock:
+    """可手动拨动的 time.monotonic"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def block(kb):
+    """占用 kb KB 的缓存值（estimate_size 按 nbytes 计）"""
+    return np.zeros(kb * 1024, dtype=np.uint8)
+
+
+class Loader:
+    """记录调用次数的 loader"""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_hit_until_version_changes(clock):
+    store = cache.VersionedCache()
+    load = Loader("v1")
+    assert store.get_or_load("k", 1, load) == "v1"
+    assert store.get_or_load("k", 1, load) == "v1"
+    assert load.calls == 1
+
+    load.value = "v2"
+    assert store.get_or_load("k", 2, load) == "v2"
+    assert load.calls == 2
+    assert store.stats()["hits"] == 1
+    assert store.stats()["misses"] == 2
+
+
+def test_entries_expire_after_ttl(clock):
+    store = cache.VersionedCache(ttl=10)
+    load = Loader("value")
+    store.get_or_load("k", 1, load)
+    clock.now += 9.9
+    store.get_or_load("k", 1, load)
+    assert load.calls == 1
+    clock.now += 0.2
+    store.get_or_load("k", 1, load)
+    assert load.calls == 2
+
+
+def test_max_bytes_evicts_least_recently_used(clock):
+    store = cache.VersionedCache(max_bytes=30 * 1024)
+    for key in ("a", "b", "c"):
+        store.put(key, 1, block(10))
+    # 读一次 a，使 b 成为最久未用
+    store.get_or_load("a", 1, Loader(None))
+    store.put("d", 1, block(10))
+    assert store.stats()["entries"] == 3
+    assert store.stats()["bytes"] == 30 * 1024
+    load = Loader(block(1))
+    store.get_or_load("b", 1, load)
+    assert load.calls == 1, "b 应已被淘汰"
+
+    # 单个超过上限的值不缓存
+    store.put("huge", 1, block(40))
+    assert store.get_or_load("huge", 1, Loader("reloaded")) == "reloaded"
+
+
+def test_partition_limit_only_evicts_its_own_entries(clock):
+    store = cache.VersionedCache(max_bytes=100 * 1024)
+    store.set_partition_limit("small", 15 * 1024)
+    store.put("other", 1, block(10), partition="big")
+    store.put("s1", 1, block(10), partition="small")
+    store.put("s2", 1, block(10), partition="small")
+    assert store.stats()["partitions"] == {"big": 10 * 1024, "small": 10 * 1024}
+    load = Loader("reloaded")
+    assert store.get_or_load("s1", 1, load, partition="small") == "reloaded"
+    assert store.get_or_load("other", 1, Loader(None)) is not None
+
+
+def test_invalidate_by_key_partition_and_all(clock):
+    store = cache.VersionedCache()
+    store.put("a1", 1, "a1", partition="a")
+    store.put("a2", 1, "a2", partition="a")
+    store.put("b1", 1, "b1", partition="b")
+
+    store.invalidate(partition="a")
+    assert store.get_or_load("a1", 1, Loader("reloaded")) == "reloaded"
+    assert store.get_or_load("a2", 1, Loader("reloaded")) == "reloaded"
+    assert store.get_or_load("b1", 1, Loader("reloaded")) == "b1"
+
+    store.invalidate(key="b1")
+    assert store.get_or_load("b1", 1, Loader("reloaded")) == "reloaded"
+
+    store.invalidate()
+    assert store.stats()["entries"] == 0
+    assert store.stats()["bytes"] == 0
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+import analytics
+import compact
+import storage
+from conftest import make_answers
+
+
+def in_config_order(q, value):
+    """还原后的多选答案按配置顺序排列，配置外的取值在后"""
+    if q['type'] != 'multi':
+        return value
+    index = {option: i for i, option in enumerate(q['options'])}
+    return sorted(value, key=lambda option: index.get(option, len(index)))
+
+
+def chosen(q, value, label):
+    """答案是否计入 label 一列（配置外的取值都计入 OTHER_LABEL）"""
+    values = value if q['type'] == 'multi' else [] if value is None else [value]
+    if label == analytics.OTHER_LABEL:
+        return any(option not in q['options'] for option in values)
+    return label in values
+
+
+def test_roundtrip_through_storage(db_file, questions, rng):
+    expected = []
+    for i in range(300):
+        answers = make_answers(questions, rng, day=1 + i % 28)
+        if i % 7 == 0:
+            # 配置外的取值（“其它”填写内容）与未作答
+            q = questions[i % len(questions)]
+            answers[q['id']] = answers[q['id']] + [f"其它：第{i}份"] if q['type'] == 'multi' else f"其它：第{i}份"
+        if i % 11 == 0:
+            q = questions[-1]
+            answers[q['id']] = [] if q['type'] == 'multi' else None
+        storage.insert_response(db_file, answers, answers['submit_time'])
+        expected.append(answers)
+    deleted = storage.fetch_response_ids(db_file)[:10]
+    storage.delete_responses(db_file, record_ids=deleted)
+
+    response_ids, groups = storage.fetch_answer_groups(db_file)
+    encoded = analytics.encode_responses(response_ids, groups, questions)
+    live = expected[10:]
+    for q in questions:
+        compact_question, labels = encoded[q['id']]
+        assert len(compact_question) == len(live)
+        assert compact_question.values() == [in_config_order(q, answers[q['id']]) for answers in live]
+        matrix = compact_question.columns()
+        assert matrix.shape == (len(labels), len(live))
+        for index, label in enumerate(labels):
+            selected = [chosen(q, answers[q['id']], label) for answers in live]
+            assert (compact_question.column(index) == selected).all()
+            assert (matrix[index] == selected).all()
+        # 比逐格一个字节的布尔矩阵小
+        assert compact_question.nbytes < matrix.nbytes
+
+
+def test_many_options_span_several_bytes():
+    options = [f"选项{i}" for i in range(20)]
+    question = {'id': 'q', 'type': 'multi', 'options': options}
+    response_ids = np.arange(1, 6, dtype=np.int64)
+    groups = [(option, np.array([1 + i % 5, 5])) for i, option in enumerate(options)] + [("其它：x", np.array([3]))]
+    compact_question = compact.CompactQuestion.from_groups(question, response_ids, groups)
+    assert compact_question.bits.shape == (5, 3)
+    values = compact_question.values()
+    assert values[4] == options
+    assert values[2] == [option for i, option in enumerate(options) if i % 5 == 2] + ["其它：x"]
+    assert compact_question.columns().sum(axis=1).tolist() == [2 if i % 5 != 4 else 1 for i in range(20)] + [1]
+
+
+@pytest.mark.parametrize("count, dtype", [(3, np.int8), (127, np.int8), (128, np.int16), (40000, np.int32)])
+def test_single_codes_use_the_smallest_integer_type(count, dtype):
+    question = {'id': 'q', 'type': 'single', 'options': [str(i) for i in range(count)]}
+    response_ids = np.array([1, 2, 3], dtype=np.int64)
+    compact_question = compact.CompactQuestion.from_groups(
+        question, response_ids, [(str(count - 1), np.array([1])), ("配置外", np.array([2, 99]))]
+    )
+    assert compact_question.codes.dtype == dtype
+    assert compact_question.values() == [str(count - 1), "配置外", None]
@@ -0,0 +1,52 @@
+import json
+import os
+
+import config
+import storage
+
+
+def write_config(path, questions):
+    path.write_text(json.dumps({"questions": questions}, ensure_ascii=False), encoding="utf-8")
+
+
+def archiving_watcher(config_file, db_file):
+    """与 app.get_config_watcher 相同的接线：切换时存档，内存中没有的版本从存档取回"""
+    return config.ConfigWatcher(
+        str(config_file),
+        interval=3600,
+        on_change=lambda compiled: storage.record_config_version(
+            db_file, compiled["version"], compiled["questions_json"]
+        ),
+        load_version=lambda version: storage.fetch_config_version(db_file, version),
+    )
+
+
+def test_pinned_version_survives_restart(tmp_path, db_file, questions):
+    config_file = tmp_path / "survey_config.json"
+    write_config(config_file, list(questions))
+    old = archiving_watcher(config_file, db_file).current
+
+    extra = {"id": "new_multi", "text": "新增多选题", "type": "multi", "options": ["甲", "乙"]}
+    write_config(config_file, [questions[0], extra] + list(questions[1:]))
+    restarted = archiving_watcher(config_file, db_file)
+    assert restarted.current["version"] != old["version"]
+
+    pinned = restarted.get(old["version"])
+    assert pinned is not None
+    assert [q["id"] for q in pinned["questions"]] == [q["id"] for q in old["questions"]]
+    assert restarted.get("unknown") is None
+
+
+def test_evicted_version_is_recompiled(tmp_path, db_file, questions, monkeypatch):
+    monkeypatch.setattr(config, "MAX_VERSIONS", 1)
+    config_file = tmp_path / "survey_config.json"
+    write_config(config_file, list(questions))
+    watcher = archiving_watcher(config_file, db_file)
+    first = watcher.current["version"]
+    write_config(config_file, list(questions[:-1]))
+    # 保证修改时间变化（有的文件系统时间精度较粗）
+    mtime_ns = os.stat(config_file).st_mtime_ns + 10 ** 9
+    os.utime(config_file, ns=(mtime_ns, mtime_ns))
+    assert watcher.check()
+    assert first not in watcher._versions
+    assert watcher.get(first)["version"] == first
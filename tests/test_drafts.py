@@ -0,0 +1,110 @@
+import os
+import shutil
+
+import pytest
+
+import storage
+from conftest import ROOT
+
+
+def backdate_drafts(db_file, hours):
+    with storage.get_pool(db_file).connection() as conn:
+        with conn:
+            conn.execute("UPDATE survey_drafts SET updated_at = datetime(updated_at, ?)", (f"-{hours} hours",))
+
+
+def test_save_load_overwrite_delete(db_file):
+    assert storage.load_draft(db_file, "t1") is None
+    storage.save_draft(db_file, "t1", "v1", 2, {"q1": "甲", "q2": ["乙", "丙"]}, {"q3": "其它内容"})
+    assert storage.load_draft(db_file, "t1") == {
+        "config_version": "v1",
+        "current_question": 2,
+        "answers": {"q1": "甲", "q2": ["乙", "丙"]},
+        "other_inputs": {"q3": "其它内容"},
+    }
+
+    storage.save_draft(db_file, "t1", "v1", 3, {"q1": "丁"}, {})
+    draft = storage.load_draft(db_file, "t1")
+    assert draft["current_question"] == 3
+    assert draft["answers"] == {"q1": "丁"}
+
+    storage.save_draft(db_file, "t2", "v1", 0, {}, {})
+    storage.delete_draft(db_file, "t1")
+    assert storage.load_draft(db_file, "t1") is None
+    assert storage.load_draft(db_file, "t2") is not None
+
+
+def test_expired_drafts_are_hidden_and_purged(db_file):
+    storage.save_draft(db_file, "old", "v1", 1, {}, {})
+    storage.save_draft(db_file, "new", "v1", 1, {}, {})
+    backdate_drafts(db_file, storage.DRAFT_TTL_HOURS + 1)
+    storage.save_draft(db_file, "new", "v1", 2, {}, {})
+
+    assert storage.load_draft(db_file, "old") is None
+    assert storage.purge_expired_drafts(db_file) == 1
+    assert storage.load_draft(db_file, "new")["current_question"] == 2
+
+
+@pytest.fixture(scope="module")
+def app_dir(tmp_path_factory):
+    """页面测试在临时目录中运行：数据库与配置都用相对路径"""
+    pytest.importorskip("streamlit.testing.v1")
+    workdir = tmp_path_factory.mktemp("app")
+    shutil.copy(os.path.join(ROOT, "survey_config.json"), workdir)
+    previous = os.getcwd()
+    os.chdir(workdir)
+    yield workdir
+    os.chdir(previous)
+    storage.get_pool(storage.DB_FILE).close_all()
+
+
+def run_app(query_params=None):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    for key, value in (query_params or {}).items():
+        at.query_params[key] = value
+    at.run()
+    assert not at.exception, at.exception
+    return at
+
+
+def answer_current(at, questions):
+    """回答当前题（单选选第一项，多选勾第一项）"""
+    index = int(at.session_state["current_question"])
+    if questions[index]['type'] == 'single':
+        at.radio[0].set_value(questions[index]['options'][0]).run()
+    else:
+        at.checkbox[0].check().run()
+    assert not at.exception, at.exception
+
+
+def click(at, label):
+    next(button for button in at.button if button.label == label).click().run()
+    assert not at.exception, at.exception
+
+
+def test_progress_resumes_and_draft_is_deleted_on_submit(app_dir, questions):
+    at = run_app()
+    token = at.query_params["resume"]
+    # 较早版本的 AppTest 以列表形式给出查询参数
+    token = token[0] if isinstance(token, list) else token
+    assert token
+    for _ in range(2):
+        answer_current(at, questions)
+        click(at, "下一题")
+
+    # 换一个会话带同一令牌打开：从第 3 题继续，前两题的答案还在
+    draft = storage.load_draft(storage.DB_FILE, token)
+    assert draft["current_question"] == 2
+    resumed = run_app({"resume": token})
+    assert resumed.session_state["current_question"] == 2
+    assert resumed.session_state["answers"][questions[0]['id']] == questions[0]['options'][0]
+    assert any("问题 3/" in markdown.value for markdown in resumed.markdown)
+
+    for _ in range(len(questions) - 2):
+        answer_current(resumed, questions)
+        click(resumed, "提交" if resumed.session_state["current_question"] == len(questions) - 1 else "下一题")
+    assert resumed.session_state["submitted"]
+    assert storage.load_draft(storage.DB_FILE, token) is None
+    assert "resume" not in resumed.query_params
@@ -0,0 +1,58 @@
+import io
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+import backends
+import export
+import storage
+from conftest import make_answers
+
+
+@pytest.fixture
+def backend(db_file, questions, rng):
+    for i in range(30):
+        answers = make_answers(questions, rng, day=1 + i % 3)
+        storage.insert_response(db_file, answers, answers['submit_time'])
+    return backends.SQLiteBackend(db_file)
+
+
+def download_bytes(data):
+    """按 st.download_button 处理延迟数据的方式转换"""
+    content, _ = convert_data_to_bytes_and_infer_mime(
+        data, unsupported_error=TypeError(f"不支持的导出数据类型：{type(data)}")
+    )
+    return content
+
+
+@pytest.mark.parametrize("fmt", list(export.EXPORT_FORMATS))
+def test_export_feeds_download_button(backend, questions, fmt):
+    content = download_bytes(export.export_responses(backend, questions, fmt))
+    if fmt == "CSV":
+        assert content.startswith(b"\xef\xbb\xbf")
+        frame = pd.read_csv(io.BytesIO(content), encoding="utf-8-sig")
+    elif fmt == "Excel":
+        sheet = load_workbook(io.BytesIO(content), read_only=True)["survey_data"]
+        rows = list(sheet.values)
+        frame = pd.DataFrame(rows[1:], columns=rows[0])
+    else:
+        frame = pd.read_parquet(io.BytesIO(content))
+    assert len(frame) == 30
+    assert list(frame.columns[:4]) == ["id", "submit_time", "created_at", "config_version"]
+
+
+def test_export_spills_to_disk(backend, questions, monkeypatch):
+    # 超过内存上限落盘后仍然返回完整内容
+    monkeypatch.setattr(export, "SPOOL_MAX_SIZE", 64)
+    content = download_bytes(export.export_responses(backend, questions, "CSV"))
+    assert len(pd.read_csv(io.BytesIO(content), encoding="utf-8-sig")) == 30
+
+
+def test_export_filters_by_submit_time(backend, questions):
+    content = export.export_responses(backend, questions, "Parquet",
+                                      submit_from="2026-01-02 00:00:00", submit_to="2026-01-02 23:59:59")
+    frame = pd.read_parquet(io.BytesIO(content))
+    assert len(frame) == 10
+    assert frame["submit_time"].str.startswith("2026-01-02").all()
@@ -0,0 +1,96 @@
+import csv
+import os
+
+import pytest
+
+import config
+import importer
+import storage
+from conftest import ROOT, make_answers
+
+CONFIG_FILE = os.path.join(ROOT, config.CONFIG_FILE)
+
+
+def cell(q, answers):
+    value = answers[q['id']]
+    return importer.MULTI_DELIMITER.join(value) if q['type'] == 'multi' else value
+
+
+def write_legacy_csv(path, rows, questions):
+    """旧版扁平格式：表头只有三列，数据行为提交时间加各题答案"""
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(["submit_time", "name", "original_content"])
+        for answers in rows:
+            writer.writerow([answers['submit_time']] + [cell(q, answers) for q in questions])
+
+
+def write_xlsx(path, rows, questions):
+    """按题目 id 作表头，列顺序与配置相反，以验证按列名映射"""
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    ordered = list(reversed(questions))
+    sheet.append([q['id'] for q in ordered] + [importer.SUBMIT_TIME_COLUMN])
+    for answers in rows:
+        sheet.append([cell(q, answers) for q in ordered] + [answers['submit_time']])
+    workbook.save(path)
+
+
+def test_column_mapping_by_header_and_position(questions):
+    by_name = importer.ColumnMapping([questions[1]['text'], "submit_time", questions[0]['id']], questions)
+    assert not by_name.positional
+    assert by_name.parse(["甲", "2026/01/02 08:30", "乙"]) == {
+        questions[1]['id']: ["甲"] if questions[1]['type'] == 'multi' else "甲",
+        questions[0]['id']: ["乙"] if questions[0]['type'] == 'multi' else "乙",
+        'submit_time': "2026-01-02 08:30:00",
+    }
+
+    legacy = importer.ColumnMapping(["submit_time", "name", "original_content"], questions)
+    assert legacy.positional and not legacy.header_is_data
+    assert legacy.parse(["2026-01-02 08:30:00", "只有一列"]) is None
+    assert legacy.parse(["不是时间"] + [""] * len(questions)) is None
+
+
+def test_legacy_csv_import_and_reimport_is_deduped(tmp_path, db_file, questions, rng):
+    rows = [make_answers(questions, rng, day=1 + i % 5) for i in range(30)]
+    path = str(tmp_path / "legacy.csv")
+    write_legacy_csv(path, rows + rows[:3], questions)
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(["2026-01-03 10:00:00", "列数不对"])
+
+    stats = importer.import_file(path, db_file, CONFIG_FILE, chunk_size=8)
+    assert (stats["read"], stats["imported"], stats["duplicates"], stats["invalid"]) == (34, 30, 3, 1)
+    assert storage.fetch_response_count(db_file) == 30
+    assert storage.count_responses(db_file) == 30
+
+    again = importer.import_file(path, db_file, CONFIG_FILE, chunk_size=8)
+    assert (again["imported"], again["duplicates"]) == (0, 33)
+    assert storage.fetch_response_count(db_file) == 30
+
+
+def test_xlsx_import_maps_columns_and_dedupes_against_csv(tmp_path, db_file, questions, rng):
+    rows = [make_answers(questions, rng, day=10) for _ in range(20)]
+    csv_path = str(tmp_path / "legacy.csv")
+    write_legacy_csv(csv_path, rows[:5], questions)
+    importer.import_file(csv_path, db_file, CONFIG_FILE)
+
+    # 前 5 份已经由 CSV 导入，XLSX 中只有后 15 份是新的
+    xlsx_path = str(tmp_path / "responses.xlsx")
+    write_xlsx(xlsx_path, rows, questions)
+    stats = importer.import_file(xlsx_path, db_file, CONFIG_FILE)
+    assert (stats["read"], stats["imported"], stats["duplicates"], stats["invalid"]) == (20, 15, 5, 0)
+    assert storage.fetch_response_count(db_file) == 20
+
+    conn = storage.connect(db_file)
+    try:
+        stored = list(storage.iter_stored_answers(conn))
+    finally:
+        conn.close()
+    assert len(stored) == 20
+    assert {importer.fingerprint(a) for a in stored} == {importer.fingerprint(a) for a in rows}
+
+
+def test_unsupported_file_type(tmp_path, db_file):
+    with pytest.raises(ValueError):
+        importer.import_file(str(tmp_path / "data.json"), db_file, CONFIG_FILE)
@@ -0,0 +1,86 @@
+import re
+import urllib.request
+
+import pytest
+
+import backends
+import metrics
+import storage
+from conftest import make_answers
+
+SAMPLE_PATTERN = re.compile(r'^([A-Za-z_:][A-Za-z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+LABEL_PATTERN = re.compile(r'([A-Za-z_][A-Za-z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_exposition(text):
+    """文本格式 -> {(样本名, frozenset(标签)): 值}，同时检查每个指标都有 HELP / TYPE"""
+    samples = {}
+    declared = set()
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            declared.add(line.split()[2])
+            continue
+        if not line or line.startswith("#"):
+            continue
+        match = SAMPLE_PATTERN.match(line)
+        assert match, f"无法解析的样本行：{line!r}"
+        name, labels, value = match.groups()
+        assert re.sub(r"_(bucket|sum|count)$", "", name) in declared | {name}
+        samples[(name, frozenset(LABEL_PATTERN.findall(labels or "")))] = float(value)
+    return samples
+
+
+@pytest.fixture
+def server():
+    server = metrics.start_server("127.0.0.1", 0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def scrape(server):
+    host, port = server.server_address[:2]
+    with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+        assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+        return parse_exposition(response.read().decode("utf-8"))
+
+
+def test_scrape_database_gauges_per_survey(server, db_file, tmp_path, questions, rng):
+    for _ in range(3):
+        answers = make_answers(questions, rng)
+        storage.insert_response(db_file, answers, answers['submit_time'])
+    other_db = str(tmp_path / "other.db")
+    storage.insert_response(other_db, make_answers(questions, rng), "2026-01-01 00:00:00")
+    metrics.register_database_gauges(None, backends.SQLiteBackend(db_file))
+    metrics.register_database_gauges("other", backends.SQLiteBackend(other_db))
+
+    samples = scrape(server)
+    default = frozenset({("survey", metrics.DEFAULT_SURVEY_LABEL), ("backend", "sqlite")})
+    other = frozenset({("survey", "other"), ("backend", "sqlite")})
+    assert samples[("survey_responses", default)] == 3
+    assert samples[("survey_responses", other)] == 1
+    assert samples[("survey_db_size_bytes", default)] > 0
+    storage.get_pool(other_db).close_all()
+
+
+def test_scrape_counters_and_histograms(server):
+    before = scrape(server).get(("survey_submissions_total", frozenset({("result", "success")})), 0)
+    metrics.SUBMISSIONS.inc(result="success")
+    metrics.SAVE_LATENCY.observe(0.003)
+    samples = scrape(server)
+    assert samples[("survey_submissions_total", frozenset({("result", "success")}))] == before + 1
+    buckets = sorted(
+        (float("inf") if dict(labels)["le"] == "+Inf" else float(dict(labels)["le"]), value)
+        for (name, labels), value in samples.items() if name == "survey_save_seconds_bucket"
+    )
+    counts = [value for _, value in buckets]
+    assert counts == sorted(counts)
+    assert counts[-1] == samples[("survey_save_seconds_count", frozenset())]
+
+
+def test_replacing_backend_drops_old_series():
+    gauge = metrics.Gauge("test_rows", "测试", labelnames=("survey", "backend"))
+    gauge.set_function(lambda: 1, survey="s", backend="sqlite")
+    gauge.remove(survey="s")
+    gauge.set_function(lambda: 2, survey="s", backend="postgres")
+    assert gauge.samples() == [("test_rows", [("survey", "s"), ("backend", "postgres")], 2)]
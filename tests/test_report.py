@@ -0,0 +1,50 @@
+import os
+from datetime import datetime
+
+import pytest
+
+import config
+import report
+from conftest import ROOT
+
+GENERATED_AT = datetime(2026, 1, 1, 8, 0, 0)
+
+
+@pytest.fixture
+def survey():
+    report.render_question.cache_clear()
+    return config.read_config(os.path.join(ROOT, config.CONFIG_FILE))
+
+
+def reported_counts(survey):
+    """报告中出现的每道题各给一组计数"""
+    return {q['id']: {option: i + 1 for i, option in enumerate(q['options'])} for q in survey["questions"]}
+
+
+def test_block_format(survey):
+    text = report.format_question("题目", "人", (("甲", 3), ("乙", 1)), 4)
+    assert text == f"\n题目\n{report.RULE}\n  甲: 3人 (75.0%)\n  乙: 1人 (25.0%)"
+
+
+def test_only_changed_questions_are_rerendered(survey):
+    option_counts = reported_counts(survey)
+    first = report.build_report(survey, option_counts, 100, GENERATED_AT)
+    rendered = report.render_question.cache_info().misses
+    assert rendered > 1
+
+    # 新提交只改了一道题的计数，总数随之变化：只有这道题重新渲染，其余题目仅重算百分比
+    changed = survey["categories"]["teaching"][0]
+    option_counts[changed['id']] = dict(option_counts[changed['id']])
+    first_option = changed['options'][0]
+    option_counts[changed['id']][first_option] += 1
+    second = report.build_report(survey, option_counts, 101, GENERATED_AT)
+    assert report.render_question.cache_info().misses == rendered + 1
+    assert "总样本数：101 份" in second
+    assert second != first
+
+    # 总数变了，未变题目的百分比也要跟着变
+    unchanged = survey["decision_questions"][0]
+    option = unchanged['options'][0]
+    count = option_counts[unchanged['id']][option]
+    assert f"  {option}: {count}人 ({count / 100 * 100:.1f}%)" in first
+    assert f"  {option}: {count}人 ({count / 101 * 100:.1f}%)" in second
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import backends
+import surveys
+
+
+@pytest.fixture
+def survey_dir(tmp_path):
+    for slug in ("math-2026", "a" * surveys.SLUG_MAX_LENGTH, "a" * (surveys.SLUG_MAX_LENGTH + 1)):
+        (tmp_path / f"{slug}.json").write_text("{}", encoding="utf-8")
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize("slug", [None, ""])
+def test_default_survey(slug, survey_dir):
+    assert surveys.resolve(slug, survey_dir) is surveys.DEFAULT_TENANT
+
+
+def test_valid_slug(survey_dir):
+    tenant = surveys.resolve("math-2026", survey_dir)
+    assert tenant.slug == "math-2026"
+    assert tenant.config_file == os.path.join(survey_dir, "math-2026.json")
+    assert tenant.db_file == os.path.join(survey_dir, "math-2026.db")
+
+
+@pytest.mark.parametrize("slug", ["../math-2026", "math 2026", "math.2026", "数学", "missing"])
+def test_invalid_or_unknown_slug(slug, survey_dir):
+    assert surveys.resolve(slug, survey_dir) is None
+
+
+def test_longest_slug_fits_postgres_schema_name(survey_dir, monkeypatch):
+    """最长的合法名称能拼出 schema 名；再长一个字符即被拒绝（即使配置文件存在）"""
+    longest = "a" * surveys.SLUG_MAX_LENGTH
+    tenant = surveys.resolve(longest, survey_dir)
+    assert tenant is not None
+    monkeypatch.setenv(backends.DSN_ENV, "postgresql://localhost/survey")
+    _, (_, schema) = backends.backend_settings({"storage": {"backend": backends.BACKEND_POSTGRES}},
+                                               tenant.db_file, tenant.slug)
+    assert len(schema) == backends.PG_IDENTIFIER_MAX
+
+    assert surveys.resolve(longest + "a", survey_dir) is None
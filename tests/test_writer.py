@@ -0,0 +1,103 @@
+from concurrent.futures import Future
+
+import pytest
+
+import storage
+import writer
+from conftest import make_answers
+
+
+class RecordingWriter(writer.SubmissionWriter):
+    """记录每次提交的批大小"""
+
+    def __init__(self, *args, **kwargs):
+        self.batches = []
+        super().__init__(*args, **kwargs)
+
+    def _write_batch(self, conn, batch):
+        self.batches.append(len(batch))
+        super()._write_batch(conn, batch)
+
+
+@pytest.fixture
+def make_writer(db_file):
+    writers = []
+
+    def make(cls=writer.SubmissionWriter, **kwargs):
+        submission_writer = cls(db_file, **kwargs)
+        writers.append(submission_writer)
+        return submission_writer
+
+    yield make
+    for submission_writer in writers:
+        submission_writer.close()
+
+
+def submit_all(submission_writer, answer_list):
+    return [submission_writer.submit(answers, answers['submit_time'], "v1") for answers in answer_list]
+
+
+def test_submissions_are_group_committed(make_writer, db_file, questions, rng):
+    # 攒批等待足够长，先入队的提交合并到同一批
+    submission_writer = make_writer(RecordingWriter, batch_delay=0.2, batch_size=8)
+    futures = submit_all(submission_writer, [make_answers(questions, rng) for _ in range(20)])
+    ids = [writer.wait_result(future) for future in futures]
+    assert len(set(ids)) == 20
+    assert max(submission_writer.batches) == 8
+    assert len(submission_writer.batches) < 20
+    assert storage.fetch_response_count(db_file) == 20
+
+
+def test_bad_submission_fails_alone(make_writer, db_file, questions, rng):
+    submission_writer = make_writer(RecordingWriter, batch_delay=0.2)
+    answer_list = [make_answers(questions, rng) for _ in range(5)]
+    answer_list[2] = dict(answer_list[2], broken=object())  # 无法序列化为 JSON
+    futures = submit_all(submission_writer, answer_list)
+
+    with pytest.raises(TypeError):
+        writer.wait_result(futures[2])
+    ids = [writer.wait_result(future) for i, future in enumerate(futures) if i != 2]
+    assert len(set(ids)) == 4
+    assert submission_writer.batches[0] == 5, "同一批失败后逐条重试"
+    assert storage.fetch_response_count(db_file) == 4
+    assert sum(storage.fetch_option_counts(db_file)[questions[0]['id']].values()) == 4
+
+
+def test_wait_result_timeout_is_commit_timeout():
+    with pytest.raises(writer.CommitTimeoutError) as excinfo:
+        writer.wait_result(Future(), timeout=0.01)
+    assert isinstance(excinfo.value, TimeoutError)
+    assert "可能已经保存" in str(excinfo.value)
+
+
+def test_close_drains_queue(make_writer, db_file, questions, rng):
+    submission_writer = make_writer(batch_delay=0.05)
+    futures = submit_all(submission_writer, [make_answers(questions, rng) for _ in range(50)])
+    submission_writer.close()
+    assert all(future.done() and future.exception() is None for future in futures)
+    assert storage.fetch_response_count(db_file) == 50
+    assert not submission_writer.alive
+    with pytest.raises(RuntimeError):
+        submission_writer.submit({}, "2026-01-01 00:00:00")
+
+
+def test_dead_writer_rejects_and_is_replaced(tmp_path, questions, rng):
+    missing = tmp_path / "missing"
+    db_file = str(missing / "survey.db")
+    dead = writer.get_writer(db_file)
+    dead._thread.join(5)
+    assert not dead.alive
+    assert dead.error is not None
+    with pytest.raises(RuntimeError, match="写入线程已退出"):
+        dead.submit({}, "2026-01-01 00:00:00")
+
+    missing.mkdir()
+    replacement = writer.get_writer(db_file)
+    try:
+        assert replacement is not dead
+        answers = make_answers(questions, rng)
+        assert writer.wait_result(replacement.submit(answers, answers['submit_time'])) == 1
+    finally:
+        replacement.close()
+        storage.get_pool(db_file).close_all()
+
@@ -0,0 +1,112 @@
+"""作答规则：“其它”选项的识别与答案规范化、整份答卷的校验（问卷页面与接入 API 共用）"""
+
+# 规范化后的“其它”答案前缀，如 "其它：在线答疑"
+OTHER_PREFIX = "其它："
+
+
+class ValidationError(ValueError):
+    """答卷不符合问卷配置；messages 为逐条的错误说明"""
+
+    def __init__(self, messages):
+        super().__init__("；".join(messages))
+        self.messages = list(messages)
+
+
+def is_other_option(option):
+    if not isinstance(option, str):
+        return False
+    return "______" in option or option.strip().startswith("其它")
+
+
+def other_answer(other_text):
+    """“其它”选项规范化后的答案"""
+    other_text = (other_text or "").strip()
+    return f"{OTHER_PREFIX}{other_text}" if other_text else OTHER_PREFIX
+
+
+def normalize_answer(question, raw_answer, other_text=""):
+    """将包含“其它”选项的答案替换为填写内容"""
+    if question['type'] == 'single':
+        if is_other_option(raw_answer):
+            return other_answer(other_text)
+        return raw_answer
+    if question['type'] == 'multi':
+        return [other_answer(other_text) if is_other_option(option) else option for option in raw_answer]
+    return raw_answer
+
+
+def missing_answers(questions, answers):
+    """未作答的单选题（题目文本列表）"""
+    return [q['text'] for q in questions if q['type'] == 'single' and answers.get(q['id']) is None]
+
+
+def _other_option(question):
+    """题目中的“其它”选项，没有则为 None"""
+    for option in question['options']:
+        if is_other_option(option):
+            return option
+    return None
+
+
+def _canonical_option(question, value, other_text):
+    """把一个选项值还原为配置中的选项，返回 (选项, 其它填写内容)；不合法时选项为 None
+
+    已规范化的 "其它：xxx" 也接受，填写内容取自前缀之后（other_inputs 中有则以其为准）。
+    """
+    if not isinstance(value, str):
+        return None, other_text
+    if value in question['option_set']:
+        return value, other_text
+    other_option = _other_option(question)
+    if other_option is not None and value.startswith(OTHER_PREFIX):
+        return other_option, other_text or value[len(OTHER_PREFIX):]
+    return None, other_text
+
+
+def validate_submission(survey, answers, other_inputs=None):
+    """按编译后的问卷校验一份答卷，返回规范化后的答案字典（不含 submit_time）
+
+    规则与问卷页面一致：单选题必答且只能选配置中的选项，多选题可不选；
+    “其它”选项替换为 other_inputs 中对应题目的填写内容。不合法时抛出 ValidationError。
+    """
+    if not isinstance(answers, dict):
+        raise ValidationError(["answers 应为对象"])
+    if other_inputs is None:
+        other_inputs = {}
+    if not isinstance(other_inputs, dict):
+        raise ValidationError(["other_inputs 应为对象"])
+
+    messages = [f"未知题目：{question_id}" for question_id in answers if question_id not in survey["by_id"]]
+    normalized = {}
+    for q in survey["questions"]:
+        value = answers.get(q['id'])
+        other_text = other_inputs.get(q['id'], "")
+        if not isinstance(other_text, str):
+            messages.append(f"{q['id']}：其它填写内容应为字符串")
+            continue
+        if q['type'] == 'single':
+            if value is None:
+                messages.append(f"{q['id']}：单选题必须作答")
+                continue
+            option, other_text = _canonical_option(q, value, other_text)
+            if option is None:
+                messages.append(f"{q['id']}：选项不存在：{value!r}")
+                continue
+            normalized[q['id']] = normalize_answer(q, option, other_text)
+        else:
+            if value is None:
+                value = []
+            if not isinstance(value, list):
+                messages.append(f"{q['id']}：多选题答案应为数组")
+                continue
+            selected = []
+            for item in value:
+                option, other_text = _canonical_option(q, item, other_text)
+                if option is None:
+                    messages.append(f"{q['id']}：选项不存在：{item!r}")
+                elif option not in selected:
+                    selected.append(option)
+            normalized[q['id']] = normalize_answer(q, selected, other_text)
+    if messages:
+        raise ValidationError(messages)
+    return normalized
@@ -0,0 +1,159 @@
+"""问卷提交的后台批量写入队列（write-behind + group commit）"""
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import streamlit as st
+
+import storage
+
+# 队列容量：超过后提交方会等待，避免内存无限增长
+QUEUE_MAXSIZE = 1024
+
+# 单批最多合并的提交数
+BATCH_SIZE = 64
+
+# 攒批等待时间（秒）：第一条到达后最多再等这么久
+BATCH_DELAY = 0.005
+
+# 提交方等待入队 / 等待落盘的超时（秒）
+SUBMIT_TIMEOUT = 10
+
+# 写线程提交时使用 FULL 同步：一次 fsync 由整批分摊，确认返回时数据已落盘
+WRITER_PRAGMAS = ["PRAGMA synchronous=FULL"]
+
+# 关闭标记
+_STOP = object()
+
+
+class CommitTimeoutError(TimeoutError):
+    """等待落盘确认超时：答卷仍在队列或事务中，之后可能已经写入，重试会产生重复答卷"""
+
+    def __init__(self):
+        super().__init__("写入确认超时，答卷可能已经保存，请勿重复提交，稍后在数据查看页核对")
+
+
+def wait_result(future, timeout=SUBMIT_TIMEOUT):
+    """等待一份提交落盘，返回记录 id；超时抛出 CommitTimeoutError"""
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        raise CommitTimeoutError() from None
+
+
+class SubmissionWriter:
+    """独占一个数据库连接的后台写线程，按批次合并提交"""
+
+    def __init__(self, db_file, batch_size=BATCH_SIZE, batch_delay=BATCH_DELAY,
+                 maxsize=QUEUE_MAXSIZE):
+        self.db_file = db_file
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._closed = False
+        self._stopping = False
+        # 写线程异常退出的原因（如建表时数据库被锁），之后的提交直接失败
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="survey-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, answers, submit_time, config_version=None, test_run=None):
+        """提交一份答案，返回 Future；落盘后其结果为新记录 id"""
+        if self._closed:
+            raise RuntimeError(f"写入线程已退出：{self.error}" if self.error else "写入队列已关闭")
+        future = Future()
+        self._queue.put((answers, submit_time, config_version, test_run, future), timeout=SUBMIT_TIMEOUT)
+        return future
+
+    def _collect(self, first):
+        """以 first 开头攒一批，达到批量上限或超过等待时间即返回"""
+        batch = [first]
+        deadline = time.monotonic() + self.batch_delay
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # 写完这一批后再退出
+                self._stopping = True
+                break
+            batch.append(item)
+        return batch
+
+    def _write_batch(self, conn, batch):
+        try:
+            ids = []
+            with conn:
+                for answers, submit_time, config_version, test_run, _ in batch:
+                    ids.append(storage.write_response(conn, answers, submit_time, config_version, test_run))
+        except Exception as e:
+            if len(batch) > 1 and not isinstance(e, sqlite3.OperationalError):
+                # 整批已回滚：逐条重试，只有出错的那份答卷失败，同批其他人的答卷照常写入
+                for item in batch:
+                    self._write_batch(conn, [item])
+                return
+            # 单条失败，或数据库本身出错（被锁、磁盘已满等），逐条重试也无济于事
+            for *_, future in batch:
+                future.set_exception(e)
+        else:
+            for record_id, (*_, future) in zip(ids, batch):
+                future.set_result(record_id)
+
+    @property
+    def alive(self):
+        """写线程仍在运行（get_writer 据此替换已退出的写线程）"""
+        return self._thread.is_alive() and not self._closed
+
+    def _run(self):
+        conn = None
+        try:
+            conn = storage.connect(self.db_file)
+            for pragma in WRITER_PRAGMAS:
+                conn.execute(pragma)
+            storage.init_schema(conn)
+            while not self._stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                self._write_batch(conn, self._collect(item))
+        except Exception as e:
+            self.error = e
+        finally:
+            self._closed = True
+            if conn is not None:
+                conn.close()
+            # 关闭后才入队的提交不会再被写入，明确告知提交方
+            reason = RuntimeError(f"写入线程已退出：{self.error}" if self.error else "写入队列已关闭")
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    item[-1].set_exception(reason)
+
+    def close(self, timeout=SUBMIT_TIMEOUT):
+        """停止接收新提交，写完队列中剩余的数据后退出"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+
+@st.cache_resource(validate=lambda writer: writer.alive)
+def get_writer(db_file=storage.DB_FILE):
+    """每个进程、每个数据库文件只启动一个写线程；进程退出前自动刷盘
+
+    写线程异常退出（如启动时数据库被锁）后，下一次调用会重新启动一个。
+    """
+    writer = SubmissionWriter(db_file)
+    atexit.register(writer.close)
+    return writer
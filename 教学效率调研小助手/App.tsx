@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import ChatInterface from './components/ChatInterface';
 import Dashboard from './components/Dashboard';
 import { SurveyRecord } from './types';
+import { QUESTIONS } from './constants';
 import { MessageCircle, Settings, BarChart2 } from 'lucide-react';
 
 // Seed data for demonstration
@@ -17,10 +18,10 @@ const SEED_DATA: SurveyRecord[] = [
     grant_pain: ["繁琐的格式调整与形式审查", "提炼创新点与研究价值"],
     grant_wish: ["形式审查与格式自动校对"],
     agent_form: "嵌入在PPT里的插件",
-    platform_pref: "N/A",
     concern: "生成内容胡编乱造（幻觉）",
     budget: "个人订阅（<30元/月）",
     dev_priority: "先做【教学辅助】（PPT/批改等）",
+    contact_opt: "看情况再说",
     created_at: new Date(Date.now() - 86400000).toISOString()
   },
   {
@@ -34,14 +35,37 @@ const SEED_DATA: SurveyRecord[] = [
     grant_pain: ["研究现状/国内外综述撰写"],
     grant_wish: ["基于简单的想法生成申报书初稿"],
     agent_form: "网页端平台（功能最全）",
-    platform_pref: "N/A",
     concern: "数据隐私/课题泄密",
     budget: "希望完全免费/使用学校采购版",
     dev_priority: "先做【课题申报】（本子撰写等）",
+    contact_opt: "愿意，非常期待",
     created_at: new Date(Date.now() - 43200000).toISOString()
   }
 ];
 
+// 本地记录 -> api.py 的请求体：只带配置中的题目 id，其余字段（id、created_at 等）不提交
+const toSubmission = (record: SurveyRecord) => ({
+  answers: Object.fromEntries(QUESTIONS.map((q) => [q.id, record[q.id as keyof SurveyRecord]])),
+});
+
+// 提交到接入接口；fetch 只在网络错误时 reject，4xx/5xx 要看 response.ok
+const submitToApi = async (record: SurveyRecord) => {
+  try {
+    const response = await fetch(`${process.env.SURVEY_API_URL}/responses`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(toSubmission(record)),
+    });
+    if (!response.ok) {
+      // 422 附带逐份的校验错误；504 表示答卷可能已经保存，不要重复提交
+      const detail = await response.text();
+      console.error(`Survey API rejected record ${record.id}: ${response.status}`, detail);
+    }
+  } catch (error) {
+    console.error('Failed to submit survey record', error);
+  }
+};
+
 const App: React.FC = () => {
   const [activeTab, setActiveTab] = useState<'chat' | 'dashboard'>('chat');
   const [surveyData, setSurveyData] = useState<SurveyRecord[]>([]);
@@ -62,6 +86,10 @@ const App: React.FC = () => {
     const updatedData = [...surveyData, record];
     setSurveyData(updatedData);
     localStorage.setItem('agent_survey_data_v3', JSON.stringify(updatedData));
+    // Also submit to the ingestion API (api.py) when SURVEY_API_URL is set
+    if (process.env.SURVEY_API_URL) {
+      submitToApi(record);
+    }
   };
 
   return (
@@ -26,7 +26,7 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ onSurveyComplete }) => {
   useEffect(() => {
     setTimeout(() => {
       addMessage('bot', BOT_CONFIG.intro);
-      setTimeout(() => nextQuestion(0), 1000);
+      setTimeout(() => nextQuestion(0, {}), 1000);
     }, 500);
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
@@ -41,9 +41,10 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ onSurveyComplete }) => {
     setMessages(prev => [...prev, newMessage]);
   };
 
-  const nextQuestion = (stepIndex: number) => {
+  // collected 由调用方传入：setAnswers 是异步的，此处闭包中的 answers 还没有刚答的那一题
+  const nextQuestion = (stepIndex: number, collected: Partial<SurveyRecord>) => {
     if (stepIndex >= QUESTIONS.length) {
-      finishSurvey();
+      finishSurvey(collected);
       return;
     }
 
@@ -56,7 +57,7 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ onSurveyComplete }) => {
     }, 600);
   };
 
-  const finishSurvey = () => {
+  const finishSurvey = (answers: Partial<SurveyRecord>) => {
     setIsTyping(true);
     setTimeout(() => {
       setIsTyping(false);
@@ -78,10 +79,10 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ onSurveyComplete }) => {
         grant_wish: (answers.grant_wish as unknown as string[]) || [],
         
         agent_form: answers.agent_form as string || '未填',
-        platform_pref: 'N/A', 
         concern: answers.concern as string || '未填',
         budget: answers.budget as string || '未填',
         dev_priority: answers.dev_priority as string || '未填',
+        contact_opt: answers.contact_opt as string || '未填',
         
         created_at: new Date().toISOString()
       };
@@ -95,7 +96,8 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ onSurveyComplete }) => {
     const currentQ = QUESTIONS[currentStep];
     const key = currentQ.id as keyof SurveyRecord;
 
-    setAnswers(prev => ({ ...prev, [key]: value }));
+    const collected = { ...answers, [key]: value };
+    setAnswers(collected);
 
     // User message bubble
     if (Array.isArray(value)) {
@@ -110,10 +112,10 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ onSurveyComplete }) => {
       setTimeout(() => {
         setIsTyping(false);
         addMessage('bot', currentQ.acknowledgment!);
-        nextQuestion(currentStep + 1);
+        nextQuestion(currentStep + 1, collected);
       }, 800);
     } else {
-      nextQuestion(currentStep + 1);
+      nextQuestion(currentStep + 1, collected);
     }
   };
 
@@ -7,6 +7,9 @@ export const BOT_CONFIG = {
   intro: "老师您好！我是小西。为了更好地通过AI赋能经管学院的教学与科研工作，想占用您2分钟了解您的真实需求。"
 };
 
+// 题目 id 与选项文字须与 survey_config.json 一致：完成的答卷会按 id 提交到 api.py，
+// 选项不在配置中时接口整份拒收（422）。配置里的“其它：______”需要填写内容，
+// 对话界面没有文本输入，因此不提供这几项。
 export const QUESTIONS: Question[] = [
   // --- 基础画像 ---
   {
@@ -31,7 +34,7 @@ export const QUESTIONS: Question[] = [
       "PPT课件制作/美化",
       "查找新颖的教学案例/素材",
       "批改作业/实验报告",
-      "出试卷/监考/登分",
+      "出试卷/登分",
       "学生答疑/考勤管理",
       "课程思政元素融入"
     ]
@@ -47,7 +50,8 @@ export const QUESTIONS: Question[] = [
       "24小时助教自动答疑",
       "自动出题与智能组卷",
       "课堂互动辅助(签到/提问)",
-      "学情分析与成绩预测"
+      "学情分析与成绩预测",
+      "了解就业趋势"
     ]
   },
 
@@ -101,8 +105,7 @@ export const QUESTIONS: Question[] = [
       "针对特定基金要求的逻辑优化建议",
       "自动补全研究背景与参考文献",
       "形式审查与格式自动校对",
-      "历年立项课题分析与参考",
-      "预算编制辅助"
+      "历年立项课题分析与参考"
     ]
   },
 
@@ -115,7 +118,8 @@ export const QUESTIONS: Question[] = [
       "嵌入在Word/WPS里的插件（边写边用）",
       "嵌入在PPT里的插件",
       "网页端平台（功能最全）",
-      "微信/手机端助手（随时可用）"
+      "微信/手机端助手（随时可用）",
+      "电脑应用"
     ]
   },
   {
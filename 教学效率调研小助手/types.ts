@@ -29,12 +29,13 @@ export interface SurveyRecord {
   
   // 产品偏好
   agent_form: string;      // Q9 产品形态
-  platform_pref: string;   // Q10 终端偏好
-  concern: string;         // Q11 核心顾虑
-  budget: string;          // Q12 预算
+  platform_pref?: string;  // 旧版终端偏好（已从问卷移除，仅保留在本地旧数据中）
+  concern: string;         // Q10 核心顾虑
+  budget: string;          // Q11 预算
   
   // 战略决策
-  dev_priority: string;    // Q13 研发优先级 (先做哪个?)
+  dev_priority: string;    // Q12 研发优先级 (先做哪个?)
+  contact_opt: string;     // Q13 内测意愿
   
   created_at: string;
 }